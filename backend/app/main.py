@@ -1,11 +1,43 @@
+from contextlib import asynccontextmanager
+from datetime import date
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from .routes import suggestions, time_budgets, holidays, auth, saved_plans
+from fastapi.responses import ORJSONResponse
+from .models.database import AsyncSessionLocal, async_engine
+from .routes import suggestions, time_budgets, holidays, auth, saved_plans, metrics
+from .services.holiday_store import holiday_store
+from .services.optimizer_executor import optimizer_executor
+from .services.password_hasher import password_hasher
+from .utils.compression import COMPRESSION, CompressionMiddleware
+from .utils.profiling import ProfilingMiddleware, RequestProfiler
+
+async def load_upcoming_holidays():
+    this_year = date.today().year
+    async with AsyncSessionLocal() as db:
+        # Loading through the store also warms it for the first requests
+        return [
+            (year, await holiday_store.holiday_dates(db, year))
+            for year in (this_year, this_year + 1)
+        ]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # In process mode, start the optimizer workers with this and next year's calendars built
+    await optimizer_executor.start(load_upcoming_holidays)
+    yield
+    optimizer_executor.shutdown()
+    password_hasher.shutdown()
+    # Close pooled connections; aiosqlite's connection threads would otherwise keep the
+    # process alive after shutdown
+    await async_engine.dispose()
 
 app = FastAPI(
     title="Vacation Planner",
     description="API for optimizing vacation schedules",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
 # Configure CORS
@@ -15,14 +47,26 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link"],  # Next page of the saved plans listing
 )
 
+# Compress larger responses (brotli when installed, else gzip) when COMPRESSION is on
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# Profile a sample of requests when PROFILING is on; added last so it wraps everything
+profiler = RequestProfiler.from_env()
+if profiler is not None:
+    app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
 # Include routers
 app.include_router(suggestions.router, prefix="/api")
 app.include_router(time_budgets.router, prefix="/api")
 app.include_router(holidays.router, prefix="/api")
 app.include_router(auth.router, prefix="/api")
 app.include_router(saved_plans.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
+app.include_router(metrics.prometheus_router)
 
 @app.get("/")
 def read_root():
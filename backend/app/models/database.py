@@ -1,8 +1,12 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.schema import CreateIndex
 import os
 
+from .pool import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_settings
+
 # Determine which database to use based on environment
 # This allows easy switching between SQLite (development) and PostgreSQL (production)
 ENVIRONMENT = os.environ.get("APP_ENV", "development")
@@ -16,26 +20,68 @@ if ENVIRONMENT == "production":
     DB_NAME = os.environ.get("DB_NAME", "vacation_planner")
     
     DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+    # Same database through the asyncpg driver, used by the async routes
+    ASYNC_DATABASE_URL = DATABASE_URL.replace("postgresql://", "postgresql+asyncpg://", 1)
 else:
     # Development SQLite configuration
     DATABASE_URL = "sqlite:///./vacation_planner.db"
+    ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./vacation_planner.db"
 
 # Create engine with appropriate settings
-if ENVIRONMENT == "development":
-    # SQLite-specific settings
+POOL_SETTINGS = pool_settings()
+
+if DATABASE_URL.startswith("sqlite"):
+    # SQLite-specific settings; a file database has no use for pre-ping or recycling
+    sqlite_pool = {k: POOL_SETTINGS[k] for k in ("pool_size", "max_overflow", "pool_timeout")}
     engine = create_engine(
-        DATABASE_URL, 
-        connect_args={"check_same_thread": False}  # Needed for SQLite
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},  # Needed for SQLite
+        poolclass=InstrumentedQueuePool,
+        **sqlite_pool,
     )
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **sqlite_pool
+    )
+
+    # WAL lets readers proceed while a write is in progress, which matters once the sync
+    # and async engines (and several requests) share the file
+    @event.listens_for(engine, "connect")
+    @event.listens_for(async_engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
+
 else:
     # PostgreSQL settings
-    engine = create_engine(DATABASE_URL)
+    engine = create_engine(DATABASE_URL, poolclass=InstrumentedQueuePool, **POOL_SETTINGS)
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, poolclass=InstrumentedAsyncQueuePool, **POOL_SETTINGS
+    )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async sessions for the request handlers; scripts and init_db keep using the sync engine.
+# Objects stay loaded after commit so responses can be serialized outside the session.
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def init_db():
     Base.metadata.create_all(bind=engine)
+    create_missing_indexes(engine)
+
+def create_missing_indexes(bind, tables=None):
+    """Add indexes introduced after their table was created.
+
+    create_all skips tables that already exist, indexes included. IF NOT EXISTS rather than
+    checkfirst, since reflection can't see expression indexes.
+    """
+    with bind.begin() as connection:
+        for table in tables or Base.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
 
 def get_db():
     db = SessionLocal()
@@ -43,3 +89,16 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def pool_status():
+    """Connection pool statistics for both engines."""
+    return {
+        "sync": engine.pool.status_dict(),
+        "async": async_engine.pool.status_dict(),
+    }
+
+
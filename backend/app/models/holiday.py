@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, Date, Enum, ForeignKey, Index, func, literal_column
 from .database import Base
 
 class Holiday(Base):
@@ -10,3 +10,23 @@ class Holiday(Base):
     year = Column(Integer, nullable=False)
     type = Column(Enum('public', 'employer', name='holiday_type'), nullable=False)
     employer_id = Column(Integer, nullable=True)
+    # Every calendar lookup filters on year, then narrows by country and employer
+    __table_args__ = (
+        Index("ix_holidays_year_country_employer", "year", "country", "employer_id"),
+        # Natural key for imports; NULLs never collide in a unique index, so public
+        # holidays (no employer) are keyed as employer 0
+        Index(
+            "uq_holidays_date_country_employer",
+            "date",
+            "country",
+            func.coalesce(employer_id, literal_column("0")),
+            unique=True,
+        ),
+    )
+
+# Conflict target matching uq_holidays_date_country_employer, for upserts
+HOLIDAY_KEY = (
+    Holiday.date,
+    Holiday.country,
+    func.coalesce(Holiday.employer_id, literal_column("0")),
+)
@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Dict
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from ..utils.settings import bool_setting, int_setting
+
+
+def pool_settings() -> Dict:
+    """Read and validate the connection pool settings from the environment.
+
+    Raises RuntimeError on bad values so a misconfigured deployment fails at startup
+    rather than under load. Size the pool per process: every uvicorn worker gets its own,
+    so the database sees up to workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW) connections.
+    """
+    return {
+        "pool_size": int_setting("DB_POOL_SIZE", 5, 1),
+        "max_overflow": int_setting("DB_MAX_OVERFLOW", 10, 0),
+        "pool_timeout": int_setting("DB_POOL_TIMEOUT", 30, 1),
+        # -1 disables recycling
+        "pool_recycle": int_setting("DB_POOL_RECYCLE", 1800, -1),
+        "pool_pre_ping": bool_setting("DB_POOL_PRE_PING", True),
+    }
+
+
+class PoolStats:
+    """Checkout counters for an instrumented pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, waited: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+
+class _InstrumentedPoolMixin:
+    """Times how long each checkout takes to get a connection, including opening one."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record_timeout()
+            raise
+        self.stats.record(time.perf_counter() - started)
+        return connection
+
+    def status_dict(self) -> Dict:
+        stats = self.stats
+        return {
+            "pool_size": self.size(),
+            "checked_out": self.checkedout(),
+            "checked_in": self.checkedin(),
+            "overflow": max(self.overflow(), 0),
+            "checkouts": stats.checkouts,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": stats.wait_seconds,
+            "wait_seconds_max": stats.max_wait_seconds,
+        }
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
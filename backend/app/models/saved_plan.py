@@ -1,7 +1,29 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON
-from sqlalchemy.sql import func
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, JSON, Index, func, literal
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
 from .database import Base
 
+def _now():
+    # Set here rather than by the database so ties between plans saved in one second are rare
+    return datetime.now(timezone.utc)
+
+class sortable_timestamp(FunctionElement):
+    """A timestamp as a value that orders correctly whatever its storage format."""
+    inherit_cache = True
+
+@compiles(sortable_timestamp)
+def _compile_sortable_timestamp(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+@compiles(sortable_timestamp, "sqlite")
+def _compile_sortable_timestamp_sqlite(element, compiler, **kw):
+    # SQLite keeps timestamps as text: CURRENT_TIMESTAMP writes whole seconds, SQLAlchemy
+    # writes microseconds, and '10:00:00' < '10:00:00.000000' as text. julianday() turns
+    # both into comparable numbers.
+    return f"julianday({compiler.process(element.clauses, **kw)})"
+
 class SavedPlan(Base):
     __tablename__ = "saved_plans"
 
@@ -11,6 +33,26 @@ class SavedPlan(Base):
     year = Column(Integer, nullable=False)
     schedule = Column(JSON, nullable=False)  # Store the vacation schedule as JSON
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    updated_at = Column(DateTime(timezone=True), default=_now, onupdate=_now)
     is_public = Column(Integer, default=0)  # 0 = private, 1 = public/shareable
-    share_token = Column(String, nullable=True, unique=True)  # For sharing with non-registered users 
\ No newline at end of file
+    share_token = Column(String, nullable=True, unique=True)  # For sharing with non-registered users
+    # The listing pages through a user's plans, most recently modified first
+    __table_args__ = (
+        Index(
+            "ix_saved_plans_user_last_modified",
+            "user_id",
+            sortable_timestamp(func.coalesce(updated_at, created_at)),
+            "id",
+        ),
+    )
+
+# When a plan was last modified; plans saved before updated_at was set on insert only
+# have created_at
+LAST_MODIFIED = func.coalesce(SavedPlan.updated_at, SavedPlan.created_at)
+
+# Sort key of the listing, matching ix_saved_plans_user_last_modified
+LAST_MODIFIED_KEY = sortable_timestamp(LAST_MODIFIED)
+
+def last_modified_key(value: datetime):
+    """The listing's sort key for a last-modified time, to compare against LAST_MODIFIED_KEY."""
+    return sortable_timestamp(literal(value, DateTime(timezone=True)))
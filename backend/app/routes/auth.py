@@ -1,22 +1,24 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from typing import Optional
+import time
+import uuid
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
-from ..models.database import get_db
+from ..models.database import get_async_db
 from ..models.user import User
+from ..services.auth_tokens import AuthenticatedUser, token_cache, token_revocations
+from ..services.password_hasher import HasherSaturated, password_hasher
 
 # Configuration
 SECRET_KEY = "YOUR_SECRET_KEY_HERE"  # In production, use environment variable
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token", auto_error=False)
 
 router = APIRouter(tags=["authentication"], prefix="/auth")
@@ -28,9 +30,6 @@ class Token(BaseModel):
     user_id: int
     email: str
 
-class TokenData(BaseModel):
-    email: Optional[str] = None
-
 class UserCreate(BaseModel):
     email: str
     password: str
@@ -40,18 +39,25 @@ class UserResponse(BaseModel):
     email: str
 
 # Helper functions
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
+def hasher_busy():
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many logins at once, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
 
-def authenticate_user(db, email: str, password: str):
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    user = await db.scalar(select(User).where(User.email == email))
     if not user:
         return False
-    if not verify_password(password, user.password_hash):
+    # bcrypt is deliberately slow; it runs on the hasher's own threads, off the event loop
+    valid, new_hash = await password_hasher.verify_and_update(password, user.password_hash)
+    if not valid:
         return False
+    if new_hash is not None:
+        # Stored with another work factor; the password is at hand, so upgrade it now
+        user.password_hash = new_hash
+        await db.commit()
     return user
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -60,11 +66,27 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
+    # iat and jti let a token be revoked before it expires
+    to_encode.update({"exp": expire, "iat": int(time.time()), "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def decode_access_token(token: str) -> dict:
+    """Verified claims of ``token``; raises JWTError if it is invalid, expired or revoked."""
+    claims = token_cache.get(token) if token_cache is not None else None
+    if claims is None:
+        claims = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if token_cache is not None:
+            token_cache.set(token, claims)
+    if token_revocations.is_revoked(claims):
+        raise JWTError("Token has been revoked")
+    return claims
+
+async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """The user a bearer token was issued to, or None without one.
+
+    Tokens carry the user's id and email, so a verified token resolves without a query.
+    """
     if token is None:
         return None
         
@@ -74,37 +96,45 @@ async def get_current_user(token: Optional[str] = Depends(oauth2_scheme), db: Se
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
+        claims = decode_access_token(token)
     except JWTError:
         raise credentials_exception
-    user = db.query(User).filter(User.email == token_data.email).first()
+    email = claims.get("sub")
+    if email is None:
+        raise credentials_exception
+    if "uid" in claims:
+        return AuthenticatedUser(id=claims["uid"], email=email)
+    # Issued before tokens carried the user id; look the user up until it expires
+    user = await db.scalar(select(User).where(User.email == email))
     if user is None:
         raise credentials_exception
-    return user
+    return AuthenticatedUser(id=user.id, email=user.email)
 
 # Routes
 @router.post("/register", response_model=UserResponse)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    hashed_password = get_password_hash(user.password)
+    try:
+        hashed_password = await password_hasher.hash(user.password)
+    except HasherSaturated:
+        raise hasher_busy()
     new_user = User(email=user.email, password_hash=hashed_password)
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     
     return new_user
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    try:
+        user = await authenticate_user(db, form_data.username, form_data.password)
+    except HasherSaturated:
+        raise hasher_busy()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -113,12 +143,26 @@ def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db:
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "uid": user.id}, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer", "user_id": user.id, "email": user.email}
 
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(token: Optional[str] = Depends(oauth2_scheme)):
+    if token is None:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        claims = decode_access_token(token)
+    except JWTError:
+        # Already unusable, so there is nothing to revoke
+        return None
+    # Tokens issued before they carried an id can't be singled out; they expire soon anyway
+    if "jti" in claims:
+        token_revocations.revoke(claims["jti"], claims["exp"])
+    return None
+
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: AuthenticatedUser = Depends(get_current_user)):
     if current_user is None:
         raise HTTPException(status_code=401, detail="Not authenticated")
-    return current_user 
\ No newline at end of file
+    return current_user._asdict() 
\ No newline at end of file
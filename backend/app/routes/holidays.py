@@ -1,8 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from ..models.database import get_db
 from ..models.holiday import Holiday
 from ..models.employer import Employer
+from ..services.holiday_store import DEFAULT_COUNTRY, holiday_filter, holiday_store
+from ..services.suggestion_cache import suggestion_cache
+from ..services.vacation_optimizer import refresh_candidate_tables
 from pydantic import BaseModel
 from datetime import date
 
@@ -13,10 +17,12 @@ class HolidayCreate(BaseModel):
     name: str
     employer_id: int
     year: int
-    country: str = "US"
+    country: str = DEFAULT_COUNTRY
 
 @router.post("/holidays")
-def add_holiday(holiday: HolidayCreate, db: Session = Depends(get_db)):
+def add_holiday(
+    holiday: HolidayCreate, background_tasks: BackgroundTasks, db: Session = Depends(get_db)
+):
     employer = db.query(Employer).filter(Employer.id == holiday.employer_id).first()
     if not employer:
         raise HTTPException(status_code=404, detail="Employer not found")
@@ -29,8 +35,24 @@ def add_holiday(holiday: HolidayCreate, db: Session = Depends(get_db)):
         employer_id=holiday.employer_id
     )
     db.add(new_holiday)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # uq_holidays_date_country_employer: the employer already has a holiday that day
+        db.rollback()
+        raise HTTPException(
+            status_code=409, detail="Holiday already exists for this date, country and employer"
+        )
     db.refresh(new_holiday)
+    # Stored calendars and cached suggestions were built from the old holidays
+    changed = holiday_store.invalidate(new_holiday.year)
+    suggestion_cache.invalidate()
+    # Rebuild the candidate tables of the calendars in use once the response is sent
+    calendars = [
+        (key[0], [row.date for row in db.query(Holiday.date).filter(*holiday_filter(*key))])
+        for key in changed
+    ]
+    background_tasks.add_task(refresh_candidate_tables, calendars)
     return new_holiday
 
 @router.get("/employers")
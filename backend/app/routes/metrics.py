@@ -0,0 +1,107 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from ..models.database import pool_status
+from ..services.holiday_store import holiday_store
+from ..services.instrumentation import metrics
+from ..services.optimizer_executor import optimizer_executor
+from ..services.password_hasher import password_hasher
+from ..services.shared_plan_cache import shared_plan_cache
+from ..services.suggestion_cache import suggestion_cache
+
+router = APIRouter(tags=["metrics"], prefix="/metrics")
+
+# Served at the root, where Prometheus scrapes by default
+prometheus_router = APIRouter(tags=["metrics"])
+
+
+@router.get("/db-pool")
+def get_db_pool_metrics():
+    """Connection pool usage per engine, for sizing pools against worker counts."""
+    return pool_status()
+
+
+@router.get("/optimizer")
+def get_optimizer_metrics():
+    """Optimizer executor mode and, in process mode, queue and timeout counters."""
+    return optimizer_executor.stats()
+
+
+@router.get("/password-hasher")
+def get_password_hasher_metrics():
+    """bcrypt work factor, hashing threads and queue, and rejected and rehashed counts."""
+    return password_hasher.stats()
+
+
+@router.get("/shared-plan-cache")
+def get_shared_plan_cache_metrics():
+    """Hits, misses and entries of the in-process cache of shared plan responses."""
+    return shared_plan_cache.stats()
+
+
+def _collect_app_metrics():
+    cache = suggestion_cache.stats()
+    yield "suggestion_cache_hits_total", "counter", "Suggestion cache hits.", [({}, cache["hits"])]
+    yield "suggestion_cache_misses_total", "counter", "Suggestion cache misses.", [
+        ({}, cache["misses"])
+    ]
+    yield "suggestion_cache_entries", "gauge", "Cached suggestion results.", [({}, cache["size"])]
+
+    shared = shared_plan_cache.stats()
+    for key in ("hits", "misses"):
+        yield f"shared_plan_cache_{key}_total", "counter", f"Shared plan cache {key}.", [
+            ({}, shared[key])
+        ]
+    yield "shared_plan_cache_entries", "gauge", "Cached shared plan responses.", [
+        ({}, shared["size"])
+    ]
+
+    holidays = holiday_store.stats()
+    yield "holiday_store_calendars", "gauge", "Holiday calendars held in memory.", [
+        ({}, holidays["calendars"])
+    ]
+    yield "holiday_store_loads_total", "counter", "Holiday calendars loaded from the database.", [
+        ({}, holidays["loads"])
+    ]
+    yield "holiday_store_version", "gauge", "Holiday changes seen by this process.", [
+        ({}, holidays["version"])
+    ]
+
+    pools = pool_status()
+    for key, name, kind, help_text in (
+        ("checked_out", "db_pool_checked_out", "gauge", "Connections currently checked out."),
+        ("checkouts", "db_pool_checkouts_total", "counter", "Connection checkouts."),
+        ("timeouts", "db_pool_timeouts_total", "counter", "Checkouts that timed out."),
+        ("wait_seconds_total", "db_pool_wait_seconds_total", "counter", "Time spent waiting."),
+    ):
+        yield name, kind, help_text, [
+            ({"engine": engine}, status[key]) for engine, status in pools.items()
+        ]
+
+    executor = optimizer_executor.stats()
+    if executor["mode"] == "process":
+        yield "optimizer_executor_in_flight", "gauge", "Optimizer jobs running or queued.", [
+            ({}, executor["in_flight"])
+        ]
+        for key in ("completed", "rejected", "timed_out"):
+            yield f"optimizer_executor_{key}_total", "counter", f"Optimizer jobs {key}.", [
+                ({}, executor[key])
+            ]
+
+    hasher = password_hasher.stats()
+    yield "password_hasher_in_flight", "gauge", "Password hashes running or queued.", [
+        ({}, hasher["in_flight"])
+    ]
+    for key in ("completed", "rejected", "rehashed"):
+        yield f"password_hasher_{key}_total", "counter", f"Password hashes {key}.", [
+            ({}, hasher[key])
+        ]
+
+
+metrics.register_collector(_collect_app_metrics)
+
+
+@prometheus_router.get("/metrics", response_class=PlainTextResponse)
+def get_prometheus_metrics():
+    """Optimizer phase timings and counters plus cache, pool and executor metrics."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
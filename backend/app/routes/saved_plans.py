@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Literal, Optional, Tuple
+from pydantic import BaseModel, ConfigDict
+import base64
+import binascii
+import json
 import uuid
 from datetime import datetime
 
-from ..models.database import get_db
-from ..models.saved_plan import SavedPlan
-from ..models.user import User
+from ..models.database import get_async_db
+from ..models.saved_plan import LAST_MODIFIED, LAST_MODIFIED_KEY, SavedPlan, last_modified_key
+from ..services.auth_tokens import AuthenticatedUser
+from ..services.shared_plan_cache import CachedPlan, shared_plan_cache
+from ..utils.http_caching import conditional_response, etag_for
+from ..utils.settings import int_setting
 from .auth import get_current_user
 
 router = APIRouter(tags=["saved_plans"], prefix="/saved-plans")
 
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Seconds browsers and proxies may reuse a shared plan before revalidating its ETag
+SHARED_PLAN_MAX_AGE = int_setting("SHARED_PLAN_MAX_AGE", 60, 0)
+
 # Models
 class SavedPlanBase(BaseModel):
     name: str
@@ -29,15 +42,53 @@ class SavedPlanResponse(SavedPlanBase):
     updated_at: Optional[datetime] = None
     share_token: Optional[str] = None
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+class SavedPlanListItem(BaseModel):
+    """A listed plan; only ``id`` and the requested fields are included."""
+    id: int
+    name: Optional[str] = None
+    year: Optional[int] = None
+    schedule: Optional[dict] = None
+    is_public: Optional[int] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    share_token: Optional[str] = None
+
+LISTED_FIELDS = tuple(SavedPlanResponse.model_fields)
+
+def encode_cursor(last_modified: datetime, plan_id: int) -> str:
+    payload = json.dumps([last_modified.isoformat(), plan_id]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_modified, plan_id = json.loads(payload)
+        return datetime.fromisoformat(last_modified), int(plan_id)
+    except (binascii.Error, ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def serialize_plan(plan: SavedPlan) -> CachedPlan:
+    body = SavedPlanResponse.model_validate(plan).model_dump_json().encode()
+    return CachedPlan(body, etag_for(body))
+
+def listed_fields(view: str, fields: Optional[str]) -> List[str]:
+    if fields is None:
+        return [f for f in LISTED_FIELDS if view == "full" or f != "schedule"]
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = sorted(set(requested) - set(LISTED_FIELDS))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["id"] + [f for f in LISTED_FIELDS if f in requested and f != "id"]
 
 # Routes
 @router.post("/", response_model=SavedPlanResponse)
-def create_saved_plan(
+async def create_saved_plan(
     plan: SavedPlanCreate, 
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     if current_user is None:
         raise HTTPException(status_code=401, detail="Authentication required")
@@ -52,28 +103,64 @@ def create_saved_plan(
     )
     
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await db.refresh(db_plan)
     
     return db_plan
 
-@router.get("/", response_model=List[SavedPlanResponse])
-def get_user_saved_plans(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+@router.get("/", response_model=List[SavedPlanListItem], response_model_exclude_unset=True)
+async def get_user_saved_plans(
+    request: Request,
+    response: Response,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    view: Literal["full", "summary"] = "full",
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
+    """One page of the user's plans, most recently modified first.
+
+    ``view=summary`` leaves out each plan's schedule (fetch it from ``GET /{plan_id}``) and
+    ``fields`` picks the fields to return; only those columns are read. When there are
+    more plans, the ``Link`` header points to the next page.
+    """
     if current_user is None:
         raise HTTPException(status_code=401, detail="Authentication required")
-    
-    return db.query(SavedPlan).filter(SavedPlan.user_id == current_user.id).all()
+
+    names = listed_fields(view, fields)
+    query = (
+        select(LAST_MODIFIED.label("last_modified"), *(getattr(SavedPlan, name) for name in names))
+        .where(SavedPlan.user_id == current_user.id)
+        .order_by(LAST_MODIFIED_KEY.desc(), SavedPlan.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor is not None:
+        last_modified, plan_id = decode_cursor(cursor)
+        key = last_modified_key(last_modified)
+        # (modified, id) < cursor, spelled so SQLite seeks the index to the cursor instead
+        # of scanning the user's newer plans
+        query = query.where(
+            LAST_MODIFIED_KEY <= key,
+            or_(LAST_MODIFIED_KEY < key, SavedPlan.id < plan_id),
+        )
+    rows = (await db.execute(query)).all()
+
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].last_modified, rows[-1].id)
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+    return [dict(zip(names, row[1:])) for row in rows]
 
 @router.get("/{plan_id}", response_model=SavedPlanResponse)
-def get_saved_plan(
+async def get_saved_plan(
     plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user)
 ):
-    plan = db.query(SavedPlan).filter(SavedPlan.id == plan_id).first()
+    plan = await db.get(SavedPlan, plan_id)
     
     if not plan:
         raise HTTPException(status_code=404, detail="Plan not found")
@@ -82,19 +169,21 @@ def get_saved_plan(
     if plan.is_public == 0 and (current_user is None or plan.user_id != current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized to view this plan")
     
-    return plan
+    # Private plans stay out of shared caches; clients revalidate with If-None-Match
+    body, etag = serialize_plan(plan)
+    return conditional_response(request, body, etag, "private, no-cache")
 
 @router.put("/{plan_id}", response_model=SavedPlanResponse)
-def update_saved_plan(
+async def update_saved_plan(
     plan_id: int,
     plan_update: SavedPlanCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     if current_user is None:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    db_plan = db.query(SavedPlan).filter(SavedPlan.id == plan_id).first()
+    db_plan = await db.get(SavedPlan, plan_id)
     
     if not db_plan:
         raise HTTPException(status_code=404, detail="Plan not found")
@@ -108,21 +197,22 @@ def update_saved_plan(
     db_plan.schedule = plan_update.schedule
     db_plan.is_public = plan_update.is_public
     
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    shared_plan_cache.invalidate(db_plan.share_token)
+    await db.refresh(db_plan)
     
     return db_plan
 
 @router.delete("/{plan_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_saved_plan(
+async def delete_saved_plan(
     plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     if current_user is None:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    db_plan = db.query(SavedPlan).filter(SavedPlan.id == plan_id).first()
+    db_plan = await db.get(SavedPlan, plan_id)
     
     if not db_plan:
         raise HTTPException(status_code=404, detail="Plan not found")
@@ -130,21 +220,22 @@ def delete_saved_plan(
     if db_plan.user_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this plan")
     
-    db.delete(db_plan)
-    db.commit()
+    await db.delete(db_plan)
+    await db.commit()
+    shared_plan_cache.invalidate(db_plan.share_token)
     
     return None
 
 @router.post("/{plan_id}/share", response_model=SavedPlanResponse)
-def create_share_link(
+async def create_share_link(
     plan_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: AuthenticatedUser = Depends(get_current_user)
 ):
     if current_user is None:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    db_plan = db.query(SavedPlan).filter(SavedPlan.id == plan_id).first()
+    db_plan = await db.get(SavedPlan, plan_id)
     
     if not db_plan:
         raise HTTPException(status_code=404, detail="Plan not found")
@@ -156,20 +247,28 @@ def create_share_link(
     if not db_plan.share_token:
         db_plan.share_token = str(uuid.uuid4())
         db_plan.is_public = 1  # Make the plan public when shared
-        db.commit()
-        db.refresh(db_plan)
+        await db.commit()
+        await db.refresh(db_plan)
     
     return db_plan
 
 @router.get("/shared/{share_token}", response_model=SavedPlanResponse)
-def get_shared_plan(
+async def get_shared_plan(
     share_token: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
     # This endpoint is public - no authentication required
-    plan = db.query(SavedPlan).filter(SavedPlan.share_token == share_token).first()
+    cached = shared_plan_cache.get(share_token)
+    if cached is None:
+        plan = await db.scalar(select(SavedPlan).where(SavedPlan.share_token == share_token))
+        
+        if not plan or plan.is_public == 0:
+            raise HTTPException(status_code=404, detail="Shared plan not found")
+        
+        cached = serialize_plan(plan)
+        shared_plan_cache.set(share_token, cached)
     
-    if not plan or plan.is_public == 0:
-        raise HTTPException(status_code=404, detail="Shared plan not found")
-    
-    return plan 
\ No newline at end of file
+    return conditional_response(
+        request, cached.body, cached.etag, f"public, max-age={SHARED_PLAN_MAX_AGE}"
+    )
@@ -1,28 +1,366 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+import asyncio
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
 
-from ..models.database import get_db
-from ..models.policy import Policy
-from ..models.time_budget import TimeBudget
-from ..services.vacation_optimizer import optimize_vacation
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.concurrency import iterate_in_threadpool
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.background import BackgroundTask
+
+from ..models.database import get_async_db
+from ..services.calendar import MAX_YEAR, MIN_YEAR
+from ..services.holiday_store import DEFAULT_COUNTRY, holiday_store
+from ..services.horizon_optimizer import (
+    MAX_HORIZON_MONTHS,
+    Horizon,
+    HorizonBudget,
+    best_horizon_plan,
+    iter_horizon_plans,
+)
+from ..services.instrumentation import OPTIMIZER_METRICS, metrics, server_timing
+from ..services.optimizer_executor import (
+    ExecutorSaturated,
+    OptimizerTimeout,
+    Reservation,
+    optimizer_executor,
+)
+from ..services.suggestion_cache import suggestion_cache
+from ..services.user_context import UserContext, load_user_context, load_user_contexts
+from ..services.vacation_optimizer import (
+    MAX_VACATIONS,
+    best_plan,
+    iter_plans,
+    parse_blackout_dates,
+)
 
 router = APIRouter()
 
+# Most users (or inline plans) accepted by one batch request
+MAX_BATCH_SIZE = 1000
 
-@router.get("/suggestions")
-def get_suggestions(
+
+class InlinePlanInput(BaseModel):
+    id: str
+    available_days: float = Field(ge=0)
+    blackout_dates: List[date] = []
+
+
+class BatchSuggestionsRequest(BaseModel):
+    year: int = Field(2025, ge=MIN_YEAR, le=MAX_YEAR)
+    user_ids: List[int] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    plans: List[InlinePlanInput] = Field(default_factory=list, max_length=MAX_BATCH_SIZE)
+    no_single_days: bool = False
+    max_vacations: Optional[int] = Field(None, ge=1, le=MAX_VACATIONS)
+    country: str = DEFAULT_COUNTRY
+    employer_id: Optional[int] = None
+
+
+def get_horizon(
+    start: Optional[date] = None,
+    horizon_months: Optional[int] = Query(None, ge=1, le=MAX_HORIZON_MONTHS),
+) -> Optional[Horizon]:
+    if horizon_months is None:
+        return None
+    start = start or date.today()
+    # Checked before building the horizon, whose end would not fit in a date near year 9999
+    if not MIN_YEAR <= start.year <= MAX_YEAR:
+        raise HTTPException(status_code=422, detail=f"start must be in {MIN_YEAR}-{MAX_YEAR}")
+    horizon = Horizon.of_months(start, horizon_months)
+    if horizon.end.year > MAX_YEAR:
+        raise HTTPException(status_code=422, detail=f"The horizon must end by {MAX_YEAR}")
+    return horizon
+
+
+async def get_user_context(
+    request: Request,
     user_id: int,
-    year: int = 2025,
+    year: int = Query(2025, ge=MIN_YEAR, le=MAX_YEAR),
+    country: str = DEFAULT_COUNTRY,
+    employer_id: Optional[int] = None,
+    horizon: Optional[Horizon] = Depends(get_horizon),
+    db: AsyncSession = Depends(get_async_db),
+) -> UserContext:
+    # FastAPI caches dependencies per request, so the context is loaded once however many
+    # dependants ask for it
+    started = time.perf_counter()
+    years = horizon.years if horizon is not None else [year]
+    holiday_dates = ()
+    for calendar_year in years:
+        holiday_dates += await holiday_store.holiday_dates(db, calendar_year, country, employer_id)
+    context = await load_user_context(db, user_id, years[0], holiday_dates, country, employer_id)
+    request.state.db_seconds = time.perf_counter() - started
+    if context is None:
+        # No time budget or policy means we don't know this user
+        raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
+    return context
+
+
+def _cache_key(
+    context: UserContext,
+    no_single_days: bool,
+    max_vacations: Optional[int],
+    horizon: Optional[Horizon] = None,
+) -> str:
+    # Users with the same inputs get the same plan, so results are keyed on the inputs alone
+    inputs = dict(
+        year=context.year,
+        country=context.country,
+        employer_id=context.employer_id,
+        blackout_dates=sorted(context.blackout_dates),
+        available_days=context.available_days,
+        no_single_days=no_single_days,
+        max_vacations=max_vacations,
+        today=date.today(),
+    )
+    if horizon is not None:
+        # Later years' budgets only matter when planning across them
+        inputs.update(
+            horizon=horizon, annual_days=context.annual_days, max_balance=context.max_balance
+        )
+    return suggestion_cache.key(**inputs)
+
+
+def _optimizer_job(
+    context: UserContext,
+    no_single_days: bool,
+    max_vacations: Optional[int],
+    horizon: Optional[Horizon] = None,
+):
+    """Return the optimizer's ``best_plan`` and ``iter_plans`` functions and their arguments,
+    for a single year or, given a ``horizon``, across it."""
+    blackout_dates = parse_blackout_dates(context.blackout_dates)
+    if horizon is None:
+        args = (
+            context.year,
+            context.holiday_dates,
+            blackout_dates,
+            context.available_days,
+            no_single_days,
+            max_vacations,
+        )
+        return best_plan, iter_plans, args
+
+    budget = HorizonBudget(context.available_days, context.annual_days, context.max_balance)
+    args = (horizon, context.holiday_dates, blackout_dates, budget, no_single_days, max_vacations)
+    return best_horizon_plan, iter_horizon_plans, args
+
+
+async def _plan(
+    context: UserContext,
+    no_single_days: bool,
+    max_vacations: Optional[int],
+    time_limit: Optional[float] = None,
+    debug: bool = False,
+    horizon: Optional[Horizon] = None,
+) -> Tuple[Dict, Optional[Dict]]:
+    """Return the plan and, on a cache miss with stats collected, the optimizer's stats."""
+    cache_key = _cache_key(context, no_single_days, max_vacations, horizon)
+    result = suggestion_cache.get(cache_key)
+    if result is not None:
+        return result, None
+
+    # The optimizer is CPU-bound; keep it off the event loop
+    best, _, args = _optimizer_job(context, no_single_days, max_vacations, horizon)
+    update = await optimizer_executor.run(
+        best,
+        *args,
+        time_limit,
+        OPTIMIZER_METRICS or debug,
+    )
+    # A plan cut short by the deadline may not be the best one; don't let it stick
+    if update.final:
+        suggestion_cache.set(cache_key, update.result)
+    if OPTIMIZER_METRICS:
+        metrics.observe(update.stats)
+    return update.result, update.stats
+
+
+def _debug_info(db_seconds: float, stats: Optional[Dict]) -> Dict:
+    phases = {"db": db_seconds, **(stats["phases"] if stats else {})}
+    return {
+        "cache": "miss" if stats else "hit",
+        "phases_ms": {name: seconds * 1000 for name, seconds in phases.items()},
+        "counters": stats["counters"] if stats else {},
+    }
+
+
+def _ndjson(line: Dict) -> bytes:
+    return orjson.dumps(line, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE)
+
+
+async def _stream_cached(result: Dict, debug_db_seconds: Optional[float] = None):
+    line = {**result, "final": True}
+    if debug_db_seconds is not None:
+        line["debug"] = _debug_info(debug_db_seconds, None)
+    yield _ndjson(line)
+
+
+async def _stream_plans(
+    context: UserContext,
+    no_single_days: bool,
+    max_vacations: Optional[int],
+    time_limit: Optional[float],
+    cache_key: str,
+    reservation: Reservation,
+    debug_db_seconds: Optional[float] = None,
+    horizon: Optional[Horizon] = None,
+):
+    # Generators can't be driven across processes, so streams always run on the app's
+    # thread pool, holding an executor slot and cut short at the executor's timeout
+    timeout = optimizer_executor.timeout
+    if timeout is not None:
+        time_limit = timeout if time_limit is None else min(time_limit, timeout)
+    _, iterate, args = _optimizer_job(context, no_single_days, max_vacations, horizon)
+    updates = iterate(
+        *args,
+        time_limit,
+        OPTIMIZER_METRICS or debug_db_seconds is not None,
+    )
+    update = None
+    try:
+        async for update in iterate_in_threadpool(updates):
+            if update.final:
+                suggestion_cache.set(cache_key, update.result)
+            line = {**update.result, "final": update.final}
+            if debug_db_seconds is not None:
+                line["debug"] = _debug_info(debug_db_seconds, update.stats)
+            yield _ndjson(line)
+    finally:
+        reservation.release()
+    if OPTIMIZER_METRICS and update is not None:
+        metrics.observe(update.stats)
+
+
+def _saturated() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="The optimizer is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+
+@router.get("/suggestions")
+async def get_suggestions(
+    request: Request,
     no_single_days: bool = False,
-    max_vacations: int = None,
-    db: Session = Depends(get_db),
+    max_vacations: Optional[int] = Query(None, ge=1, le=MAX_VACATIONS),
+    stream: bool = False,
+    deadline_ms: Optional[int] = Query(None, ge=1, le=60000),
+    debug: bool = False,
+    horizon: Optional[Horizon] = Depends(get_horizon),
+    context: UserContext = Depends(get_user_context),
 ):
-    # Check if user exists by looking for their time budget and policy
-    time_budget = db.query(TimeBudget).filter(TimeBudget.user_id == user_id).first()
-    policy = db.query(Policy).filter(Policy.user_id == user_id).first()
+    time_limit = None if deadline_ms is None else deadline_ms / 1000
+    db_seconds = request.state.db_seconds
+    if stream:
+        cache_key = _cache_key(context, no_single_days, max_vacations, horizon)
+        result = suggestion_cache.get(cache_key)
+        if result is not None:
+            return StreamingResponse(
+                _stream_cached(result, db_seconds if debug else None),
+                media_type="application/x-ndjson",
+            )
+        # Take the slot before the response starts, while a 503 can still be sent
+        try:
+            reservation = optimizer_executor.reserve()
+        except ExecutorSaturated:
+            raise _saturated()
+        return StreamingResponse(
+            _stream_plans(
+                context,
+                no_single_days,
+                max_vacations,
+                time_limit,
+                cache_key,
+                reservation,
+                db_seconds if debug else None,
+                horizon,
+            ),
+            media_type="application/x-ndjson",
+            # Also frees the slot if the client leaves before the stream starts
+            background=BackgroundTask(reservation.release),
+        )
+    try:
+        result, stats = await _plan(
+            context, no_single_days, max_vacations, time_limit, debug, horizon
+        )
+    except ExecutorSaturated:
+        raise _saturated()
+    except OptimizerTimeout:
+        raise HTTPException(status_code=504, detail="The optimizer took too long")
+
+    headers = None
+    if debug:
+        info = _debug_info(db_seconds, stats)
+        headers = {"Server-Timing": server_timing(info["phases_ms"])}
+        # Copy rather than touch the cached result
+        result = {**result, "debug": info}
+    # Results are plain JSON types already; rendering them directly skips jsonable_encoder
+    return ORJSONResponse(result, headers=headers)
+
+
+@router.post("/suggestions/batch")
+async def get_batch_suggestions(
+    request: BatchSuggestionsRequest, db: AsyncSession = Depends(get_async_db)
+):
+    """Plan for many users at once, streaming one NDJSON line per user as each finishes.
+
+    Every line carries the ``user_id`` (or the inline plan's ``id``) it belongs to and
+    either the usual ``schedule``/``warning`` or a ``status`` and ``error``.
+    """
+    year, country, employer_id = request.year, request.country, request.employer_id
+    holiday_dates = await holiday_store.holiday_dates(db, year, country, employer_id)
+    user_ids = list(dict.fromkeys(request.user_ids))
+    contexts = await load_user_contexts(db, user_ids, year, holiday_dates, country, employer_id)
+
+    jobs = [
+        ({"user_id": user_id}, contexts[user_id]) for user_id in user_ids if user_id in contexts
+    ]
+    for plan in request.plans:
+        context = UserContext(
+            user_id=None,
+            year=year,
+            available_days=plan.available_days,
+            blackout_dates=[d.isoformat() for d in plan.blackout_dates],
+            holiday_dates=holiday_dates,
+            country=country,
+            employer_id=employer_id,
+        )
+        jobs.append(({"id": plan.id}, context))
+    missing = [user_id for user_id in user_ids if user_id not in contexts]
+
+    async def run_job(label: Dict, context: UserContext) -> Dict:
+        # Keep at most one job per worker in flight so a batch never fills the queue alone
+        async with slots:
+            try:
+                result, _ = await _plan(context, request.no_single_days, request.max_vacations)
+                return {**label, **result}
+            except ExecutorSaturated:
+                return {**label, "status": 503, "error": "The optimizer is busy"}
+            except OptimizerTimeout:
+                return {**label, "status": 504, "error": "The optimizer took too long"}
+
+    async def stream():
+        for user_id in missing:
+            line = {"user_id": user_id, "status": 404, "error": f"User with ID {user_id} not found"}
+            yield _ndjson(line)
+        tasks = [asyncio.ensure_future(run_job(label, context)) for label, context in jobs]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield _ndjson(await finished)
+        finally:
+            # The client went away; don't keep planning for nobody
+            for task in tasks:
+                task.cancel()
+
+    slots = asyncio.Semaphore(optimizer_executor.workers)
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-    if not time_budget or not policy:
-        raise HTTPException(status_code=404, detail=f"User with ID {user_id} not found")
 
-    result = optimize_vacation(user_id, year, db, no_single_days, max_vacations)
-    return result
+@router.get("/suggestions/cache-stats")
+def get_suggestion_cache_stats():
+    return suggestion_cache.stats()
@@ -0,0 +1,87 @@
+import threading
+import time
+from typing import Callable, Dict, NamedTuple, Optional
+
+from ..utils.settings import float_setting, int_setting
+from .suggestion_cache import MemoryBackend
+
+# Verified tokens remembered, so repeat requests skip the signature check; 0 turns it off.
+# Entries never outlive their token, whatever the TTL.
+AUTH_TOKEN_CACHE_SIZE = int_setting("AUTH_TOKEN_CACHE_SIZE", 4096, 0)
+AUTH_TOKEN_CACHE_TTL = float_setting("AUTH_TOKEN_CACHE_TTL", 60.0, 0.0)
+
+
+class AuthenticatedUser(NamedTuple):
+    """The user a verified access token was issued to, read from its claims."""
+
+    id: int
+    email: str
+
+
+class TokenCache:
+    """Bounded LRU of verified token claims, keyed by the token itself."""
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.time):
+        self._backend = MemoryBackend(maxsize=maxsize, ttl=ttl)
+        self._clock = clock
+
+    def get(self, token: str) -> Optional[Dict]:
+        claims = self._backend.get(token)
+        if claims is not None and claims["exp"] <= self._clock():
+            return None
+        return claims
+
+    def set(self, token: str, claims: Dict) -> None:
+        self._backend.set(token, claims)
+
+    def clear(self) -> None:
+        self._backend.clear()
+
+    def __len__(self) -> int:
+        return len(self._backend)
+
+
+class TokenRevocations:
+    """Tokens revoked before they expire, checked on every authenticated request.
+
+    A token can be revoked by its ID (``jti``) or together with every other token issued
+    to a user until now. Revocations live in this process; deployments with several
+    processes can subclass this and keep them in a shared store instead.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.time):
+        self._clock = clock
+        self._tokens: Dict[str, float] = {}
+        self._users: Dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def revoke(self, token_id: str, expires_at: float) -> None:
+        """Revoke one token; it is forgotten once it would have expired anyway."""
+        now = self._clock()
+        with self._lock:
+            self._tokens[token_id] = expires_at
+            for expired in [t for t, expiry in self._tokens.items() if expiry <= now]:
+                del self._tokens[expired]
+
+    def revoke_user(self, user_id: int) -> None:
+        """Revoke every token issued to ``user_id`` so far, e.g. after a password change."""
+        with self._lock:
+            self._users[user_id] = self._clock()
+
+    def is_revoked(self, claims: Dict) -> bool:
+        with self._lock:
+            if claims.get("jti") in self._tokens:
+                return True
+            revoked_at = self._users.get(claims.get("uid"))
+        return revoked_at is not None and claims.get("iat", 0) <= revoked_at
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._users.clear()
+
+
+token_cache = (
+    TokenCache(AUTH_TOKEN_CACHE_SIZE, AUTH_TOKEN_CACHE_TTL) if AUTH_TOKEN_CACHE_SIZE else None
+)
+token_revocations = TokenRevocations()
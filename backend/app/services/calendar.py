@@ -0,0 +1,211 @@
+from array import array
+from datetime import date, timedelta
+from functools import lru_cache
+from itertools import accumulate, compress
+from typing import Iterable, List, Tuple
+
+# Day kinds, in the order generate_period has always classified them: a blackout date
+# counts as nothing, a holiday falling on a weekend counts as a weekend day.
+WORKDAY, WEEKEND, HOLIDAY, BLACKOUT = range(4)
+
+# Longest window, in calendar days, considered by scan_windows
+MAX_WINDOW_DAYS = 16
+
+# Padding around a year so windows that bridge into the neighbouring years (e.g. a
+# New Year's Day long weekend) still fall inside the year's calendar.
+YEAR_PADDING_DAYS = 31
+
+# Years that can be planned; padded calendars of years near date.min or date.max would
+# not fit in a date
+MIN_YEAR = 1900
+MAX_YEAR = 2200
+
+
+class Calendar:
+    """Per-day classification of a contiguous date range plus prefix sums.
+
+    The number of workdays, weekend days, holidays and blackout days in any window is
+    two array lookups, so scoring a candidate period never walks its days.
+    """
+
+    __slots__ = ("first", "last", "first_ordinal", "kinds", "prefix")
+
+    def __init__(self, first: date, last: date, holiday_dates: Iterable, blackout_dates: Iterable):
+        self.first = first
+        self.last = last
+        self.first_ordinal = first.toordinal()
+        size = last.toordinal() - self.first_ordinal + 1
+
+        kinds = array("b", bytes(size))
+        first_weekday = first.weekday()
+        for i in range(size):
+            if (first_weekday + i) % 7 >= 5:  # 5=Saturday, 6=Sunday
+                kinds[i] = WEEKEND
+        for d in holiday_dates:
+            i = d.toordinal() - self.first_ordinal
+            if 0 <= i < size and kinds[i] == WORKDAY:
+                kinds[i] = HOLIDAY
+        self._set_kinds(kinds, blackout_dates)
+
+    def _set_kinds(self, kinds: array, blackout_dates: Iterable) -> None:
+        for d in blackout_dates:
+            i = d.toordinal() - self.first_ordinal
+            if 0 <= i < len(kinds):
+                kinds[i] = BLACKOUT
+        self.kinds = kinds
+
+        # prefix[kind][i] is the number of days of that kind before index i
+        self.prefix = tuple(
+            array("i", accumulate((1 if k == kind else 0 for k in kinds), initial=0))
+            for kind in (WORKDAY, WEEKEND, HOLIDAY, BLACKOUT)
+        )
+
+    def with_blackouts(self, blackout_dates: Iterable) -> "Calendar":
+        """Return a copy with ``blackout_dates`` added, reusing this calendar's weekend and
+        holiday classification."""
+        calendar = Calendar.__new__(Calendar)
+        calendar.first = self.first
+        calendar.last = self.last
+        calendar.first_ordinal = self.first_ordinal
+        calendar._set_kinds(array("b", self.kinds), blackout_dates)
+        return calendar
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.first <= start and end <= self.last
+
+    def index(self, d: date) -> int:
+        return d.toordinal() - self.first_ordinal
+
+    def date_at(self, i: int) -> date:
+        return date.fromordinal(self.first_ordinal + i)
+
+    def count(self, kind: int, i: int, j: int) -> int:
+        """Number of days of ``kind`` in the index window [i, j]."""
+        prefix = self.prefix[kind]
+        return prefix[j + 1] - prefix[i]
+
+    def counts(self, start: date, end: date) -> Tuple[int, int, int]:
+        """Return ``(workdays, weekends, holidays)`` for the inclusive window [start, end]."""
+        i = start.toordinal() - self.first_ordinal
+        j = end.toordinal() - self.first_ordinal + 1
+        workdays, weekends, holidays = self.prefix[:3]
+        return (
+            workdays[j] - workdays[i],
+            weekends[j] - weekends[i],
+            holidays[j] - holidays[i],
+        )
+
+
+class WindowTable:
+    """Columnar table of candidate windows produced by :func:`scan_windows`.
+
+    Each column is a typed array indexed by row; ``start`` and ``end`` are date ordinals.
+    """
+
+    __slots__ = ("start", "end", "days_used", "total_days_off", "efficiency")
+
+    def __init__(self):
+        self.start = array("i")
+        self.end = array("i")
+        self.days_used = array("i")
+        self.total_days_off = array("i")
+        self.efficiency = array("d")
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def by_efficiency(self) -> List[int]:
+        """Row indexes, most efficient first (ties keep table order)."""
+        return sorted(range(len(self.start)), key=self.efficiency.__getitem__, reverse=True)
+
+
+def scan_windows(
+    calendar: Calendar,
+    earliest_end: date,
+    latest_start: date,
+    max_days,
+    no_single_days: bool = False,
+    max_length: int = MAX_WINDOW_DAYS,
+    maximal_only: bool = True,
+) -> WindowTable:
+    """Score every window of 1..``max_length`` days in one pass over the calendar.
+
+    Only windows worth taking are kept: they spend between one and ``max_days`` workdays,
+    contain no blackout date and are maximal, i.e. they already include the weekends and
+    holidays on either side (a window that could grow for free is dominated by the grown
+    one). Windows must end on or after ``earliest_end`` and start on or before
+    ``latest_start``. With ``maximal_only`` off, windows that could grow are kept too.
+    """
+    size = len(calendar.kinds)
+    workdays, _, _, blackouts = calendar.prefix
+    first_end = max(calendar.index(earliest_end), 0)
+    last_start = min(calendar.index(latest_start), size - 1)
+
+    # A window is maximal when the days just outside it can't be added for free.
+    kinds = calendar.kinds
+    if maximal_only:
+        closed = [True] + [k == WORKDAY or k == BLACKOUT for k in kinds] + [True]
+    else:
+        closed = [True] * (size + 2)
+
+    table = WindowTable()
+    for length in range(2 if no_single_days else 1, max_length + 1):
+        lo = max(first_end - length + 1, 0)
+        hi = min(last_start, size - length)
+        if lo > hi:
+            continue
+        starts = range(lo, hi + 1)
+        # Window [i, i + length - 1] needs prefix entries i and i + length
+        used = list(
+            map(int.__sub__, workdays[lo + length : hi + length + 1], workdays[lo : hi + 1])
+        )
+        blocked = map(
+            int.__sub__, blackouts[lo + length : hi + length + 1], blackouts[lo : hi + 1]
+        )
+        keep = [
+            0 < u <= max_days and not b and closed[i] and closed[i + length + 1]
+            for i, u, b in zip(starts, used, blocked)
+        ]
+        kept_starts = [calendar.first_ordinal + i for i in compress(starts, keep)]
+        kept_used = list(compress(used, keep))
+        table.start.extend(kept_starts)
+        table.end.extend(s + length - 1 for s in kept_starts)
+        table.days_used.extend(kept_used)
+        table.total_days_off.extend([length] * len(kept_used))
+        table.efficiency.extend(length / u for u in kept_used)
+    return table
+
+
+@lru_cache(maxsize=16)
+def _holiday_calendar(first: date, last: date, holiday_dates: frozenset) -> Calendar:
+    return Calendar(first, last, holiday_dates, ())
+
+
+@lru_cache(maxsize=128)
+def _cached_calendar(first: date, last: date, holiday_dates: frozenset, blackout_dates: frozenset):
+    # Users differ by their blackout dates only, so they all share the holiday calendar
+    base = _holiday_calendar(first, last, holiday_dates)
+    return base.with_blackouts(blackout_dates) if blackout_dates else base
+
+
+def get_calendar(first_year: int, last_year: int, holiday_dates, blackout_dates) -> Calendar:
+    """Return the shared calendar spanning ``first_year`` to ``last_year`` (padded).
+
+    Calendars are cached per (years, holiday set, blackout set), so every request with the
+    same inputs reuses one instance; calendars that differ only in blackout dates are
+    derived from one shared holiday calendar.
+    """
+    padding = timedelta(days=YEAR_PADDING_DAYS)
+    return _cached_calendar(
+        date(first_year, 1, 1) - padding,
+        date(last_year, 12, 31) + padding,
+        frozenset(holiday_dates),
+        frozenset(blackout_dates),
+    )
+
+
+def year_calendar(year: int, holiday_dates, blackout_dates) -> Calendar:
+    return get_calendar(year, year, holiday_dates, blackout_dates)
@@ -0,0 +1,105 @@
+from datetime import date
+from typing import Dict, Iterable, List
+
+import holidays
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Connection, Engine
+
+from ..models.database import Base, create_missing_indexes
+from ..models.holiday import HOLIDAY_KEY, Holiday
+
+
+def country_holiday_rows(country: str, years: Iterable[int]) -> List[Dict]:
+    """Public holidays of ``country`` in ``years`` from the ``holidays`` package, as rows.
+
+    Runs in worker processes, so it only takes and returns plain data.
+    """
+    calendar = holidays.country_holidays(country, years=list(years))
+    return [
+        {
+            "date": day,
+            "name": name,
+            "country": country,
+            "year": day.year,
+            "type": "public",
+            "employer_id": None,
+        }
+        for day, name in sorted(calendar.items())
+    ]
+
+
+def employer_holiday_rows(
+    employer_id: int, country: str, holidays_by_date: Dict[date, str]
+) -> List[Dict]:
+    return [
+        {
+            "date": day,
+            "name": name,
+            "country": country,
+            "year": day.year,
+            "type": "employer",
+            "employer_id": employer_id,
+        }
+        for day, name in sorted(holidays_by_date.items())
+    ]
+
+
+def upsert_holidays(connection: Connection, rows: List[Dict]) -> int:
+    """Insert holidays, renaming those already stored under the same (date, country, employer).
+
+    One ``INSERT ... ON CONFLICT DO UPDATE`` runs for all rows: batched into multi-row
+    VALUES on PostgreSQL and through the driver's executemany on SQLite. Returns the
+    number of rows written.
+    """
+    # A key may only appear once per statement on PostgreSQL; the last name wins
+    unique = {(row["date"], row["country"], row["employer_id"]): row for row in rows}
+    if not unique:
+        return 0
+
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        statement = postgresql.insert(Holiday)
+    elif dialect == "sqlite":
+        statement = sqlite.insert(Holiday)
+    else:
+        raise ValueError(f"Bulk holiday upserts are not supported on {dialect}")
+    statement = statement.on_conflict_do_update(
+        index_elements=list(HOLIDAY_KEY),
+        set_={"name": statement.excluded.name, "type": statement.excluded.type},
+    )
+    connection.execute(statement, list(unique.values()))
+    return len(unique)
+
+
+class DuplicateHolidays(Exception):
+    """Raised when stored holidays repeat a (date, country, employer) key."""
+
+    def __init__(self, count: int):
+        super().__init__(f"{count} holidays repeat another's date, country and employer")
+        self.count = count
+
+
+def prepare_holidays_table(engine: Engine, dedupe: bool = False) -> int:
+    """Make sure the holidays table and the unique index upserts rely on exist.
+
+    Rows added before the key was unique may repeat it, which would stop the index from
+    being created. With ``dedupe``, all but the first row of each (date, country, employer)
+    are deleted first; otherwise :class:`DuplicateHolidays` is raised and nothing changes.
+    Returns how many rows were deleted.
+    """
+    Base.metadata.create_all(bind=engine, tables=[Holiday.__table__])
+    keep = select(func.min(Holiday.id)).group_by(*HOLIDAY_KEY)
+    with engine.begin() as connection:
+        duplicates = select(func.count()).select_from(Holiday).where(Holiday.id.not_in(keep))
+        removed = connection.scalar(duplicates)
+        if removed and not dedupe:
+            raise DuplicateHolidays(removed)
+        if removed:
+            connection.execute(delete(Holiday).where(Holiday.id.not_in(keep)))
+    create_missing_indexes(engine, [Holiday.__table__])
+    return removed
+
+
+def supported_countries() -> List[str]:
+    return sorted(holidays.list_supported_countries())
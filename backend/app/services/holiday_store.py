@@ -0,0 +1,124 @@
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.holiday import Holiday
+from ..utils.settings import float_setting
+
+# Seconds a loaded calendar is served before it is reloaded. Other server processes only
+# see a POST /api/holidays once their copy expires; 0 keeps calendars until invalidated.
+HOLIDAY_STORE_TTL = float_setting("HOLIDAY_STORE_TTL", 300.0, 0.0)
+
+# Country of calendars asked for without one, matching the default of POST /api/holidays;
+# a calendar always belongs to one country, so a lookup never loads every country's holidays
+DEFAULT_COUNTRY = "US"
+
+# (year, country, employer_id); a None employer means "any"
+CalendarKey = Tuple[int, str, Optional[int]]
+
+
+def holiday_filter(year: int, country: str = DEFAULT_COUNTRY, employer_id: Optional[int] = None):
+    """WHERE clauses selecting the holidays of one calendar.
+
+    The year's holidays in ``country``. With an ``employer_id`` only holidays without an
+    employer and that employer's own count; without one, every holiday of the year in
+    that country does, as before calendars were told apart.
+    """
+    clauses = [Holiday.year == year, Holiday.country == country]
+    if employer_id is not None:
+        clauses.append(or_(Holiday.employer_id.is_(None), Holiday.employer_id == employer_id))
+    return clauses
+
+
+class HolidayStore:
+    """In-process holiday calendars, each loaded from the database once.
+
+    ``version`` counts the holiday changes this process has seen; :meth:`invalidate` bumps
+    it and drops the affected calendars. A load that overlapped an invalidation is returned
+    to its caller but not kept, so a stale calendar never sticks.
+    """
+
+    def __init__(self, ttl: float = 300, clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.version = 0
+        self.hits = 0
+        self.loads = 0
+        self._clock = clock
+        self._calendars: Dict[CalendarKey, Tuple[float, Tuple[date, ...]]] = {}
+        self._lock = threading.Lock()
+
+    def get(
+        self, year: int, country: str = DEFAULT_COUNTRY, employer_id: Optional[int] = None
+    ) -> Optional[Tuple[date, ...]]:
+        """Return a loaded calendar's dates, or None if it has to be loaded."""
+        key = (year, country, employer_id)
+        with self._lock:
+            entry = self._calendars.get(key)
+            if entry is None:
+                return None
+            loaded_at, dates = entry
+            if self.ttl and self._clock() - loaded_at >= self.ttl:
+                del self._calendars[key]
+                return None
+            self.hits += 1
+            return dates
+
+    async def holiday_dates(
+        self,
+        db: AsyncSession,
+        year: int,
+        country: str = DEFAULT_COUNTRY,
+        employer_id: Optional[int] = None,
+    ) -> Tuple[date, ...]:
+        """Return a calendar's holiday dates, loading them on first use."""
+        dates = self.get(year, country, employer_id)
+        if dates is not None:
+            return dates
+
+        version = self.version
+        statement = (
+            select(Holiday.date)
+            .where(*holiday_filter(year, country, employer_id))
+            .order_by(Holiday.date)
+        )
+        dates = tuple((await db.execute(statement)).scalars())
+        with self._lock:
+            self.loads += 1
+            if self.version == version:
+                self._calendars[(year, country, employer_id)] = (self._clock(), dates)
+        return dates
+
+    def invalidate(self, year: Optional[int] = None) -> List[CalendarKey]:
+        """Record a holiday change and drop the calendars of ``year`` (or of every year).
+
+        Returns the keys of the dropped calendars, i.e. the ones in use that changed.
+        """
+        with self._lock:
+            self.version += 1
+            keys = [key for key in self._calendars if year is None or key[0] == year]
+            for key in keys:
+                del self._calendars[key]
+        return keys
+
+    def clear(self) -> None:
+        """Drop every calendar and reset the counters."""
+        self.invalidate()
+        with self._lock:
+            self.hits = 0
+            self.loads = 0
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "calendars": len(self._calendars),
+                "hits": self.hits,
+                "loads": self.loads,
+                "version": self.version,
+            }
+
+
+holiday_store = HolidayStore(ttl=HOLIDAY_STORE_TTL)
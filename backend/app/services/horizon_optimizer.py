@@ -0,0 +1,464 @@
+import math
+import time
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional
+
+from ..utils.intervals import IntervalSet
+from .calendar import WORKDAY, Calendar, get_calendar, scan_windows
+from .instrumentation import DISABLED_STATS, OptimizerStats
+from .vacation_optimizer import (
+    _UNREACHABLE,
+    Period,
+    PlanUpdate,
+    _days_off,
+    _format_schedule,
+    _window_period,
+)
+
+# Balances carry over in half days, the smallest unit a balance can hold
+HALF_DAYS_PER_DAY = 2
+
+# Longest horizon accepted, in months
+MAX_HORIZON_MONTHS = 36
+
+
+class Horizon(NamedTuple):
+    """An inclusive date range to plan across, possibly spanning several years."""
+
+    start: date
+    end: date
+
+    @classmethod
+    def of_months(cls, start: date, months: int) -> "Horizon":
+        """The ``months`` months starting on ``start``, e.g. Jul 15 to Jan 14 for six."""
+        month = start.month - 1 + months
+        year, month = start.year + month // 12, month % 12 + 1
+        # Clamp the day for shorter months: one month after Jan 31 is Feb 28
+        day = min(start.day, _days_in_month(year, month))
+        return cls(start, date(year, month, day) - timedelta(days=1))
+
+    @property
+    def years(self) -> List[int]:
+        return list(range(self.start.year, self.end.year + 1))
+
+
+def _days_in_month(year: int, month: int) -> int:
+    following = date(year + month // 12, month % 12 + 1, 1)
+    return (following - timedelta(days=1)).day
+
+
+class HorizonBudget(NamedTuple):
+    """Vacation days available in each year of a horizon.
+
+    The first year opens with ``opening`` days. Every following year adds ``accrual`` days
+    to what was left over, up to ``max_balance`` (anything above it is forfeited); None
+    means the balance is not capped.
+    """
+
+    opening: float
+    accrual: float
+    max_balance: Optional[float] = None
+
+    def carry(self, leftover: float) -> float:
+        """Opening balance of a year that starts with ``leftover`` days unused."""
+        balance = leftover + self.accrual
+        return balance if self.max_balance is None else min(balance, self.max_balance)
+
+    def balances(self, spent: List[float]) -> List[float]:
+        """Each year's opening balance given the days ``spent`` per year.
+
+        An overdrawn balance (more days used than accrued) stays negative and is paid back
+        from the following years' accruals.
+        """
+        balances = []
+        balance = self.opening
+        for days in spent:
+            balances.append(balance)
+            balance = self.carry(balance - days)
+        return balances
+
+    def opening_balances(self, spent: List[float]) -> Optional[List[float]]:
+        """Each year's opening balance given the days ``spent`` per year, or None if a
+        year spends more than it has; an overdrawn year has nothing to spend."""
+        balances = self.balances(spent)
+        if any(days > max(balance, 0) for balance, days in zip(balances, spent)):
+            return None
+        return balances
+
+
+class YearSplit(NamedTuple):
+    """Which horizon years (by index) a period starts and ends in and the workdays it
+    spends in each; periods are short enough to span two years at most."""
+
+    start_year: int
+    end_year: int
+    first_cost: int
+    second_cost: int
+
+
+def plan_horizon(
+    horizon: Horizon,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    budget: HorizonBudget,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+) -> Dict:
+    """Optimize a vacation schedule across a multi-year horizon; see :func:`iter_horizon_plans`."""
+    return best_horizon_plan(
+        horizon, holiday_dates, blackout_dates, budget, no_single_days, max_vacations
+    ).result
+
+
+def best_horizon_plan(
+    horizon: Horizon,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    budget: HorizonBudget,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+    time_limit: Optional[float] = None,
+    collect_stats: bool = False,
+) -> PlanUpdate:
+    """Return the best schedule :func:`iter_horizon_plans` finds within ``time_limit``."""
+    update = None
+    for update in iter_horizon_plans(
+        horizon,
+        holiday_dates,
+        blackout_dates,
+        budget,
+        no_single_days,
+        max_vacations,
+        time_limit,
+        collect_stats,
+    ):
+        pass
+    return update
+
+
+def iter_horizon_plans(
+    horizon: Horizon,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    budget: HorizonBudget,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+    time_limit: Optional[float] = None,
+    collect_stats: bool = False,
+) -> Iterator[PlanUpdate]:
+    """Like :func:`~.vacation_optimizer.iter_plans`, but across ``horizon``.
+
+    One calendar covers every year of the horizon, so periods bridging New Year are scored
+    like any other. Each workday counts against the budget of the year it falls in, and
+    unused days carry over as ``budget`` allows. Results gain a ``years`` list with each
+    year's opening balance and the days the schedule uses.
+    """
+    stats = OptimizerStats() if collect_stats else DISABLED_STATS
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    years = horizon.years
+    with stats.phase("calendar"):
+        calendar = get_calendar(years[0], years[-1], holiday_dates, blackout_dates)
+
+    today = datetime.now().date()
+    with stats.phase("scan"):
+        # No single year's balance can exceed the largest one the budget allows, but a
+        # period bridging New Year draws on two of them
+        most_days = _balance_bound(budget, len(years))
+        windows = scan_windows(
+            calendar, max(horizon.start, today), horizon.end, 2 * most_days, no_single_days
+        )
+        rows = [
+            row
+            for row in windows.by_efficiency()
+            if windows.start[row] >= horizon.start.toordinal()
+            and windows.end[row] <= horizon.end.toordinal()
+        ]
+
+    with stats.phase("rank"):
+        periods = [_window_period(windows, row, calendar) for row in rows]
+        splits = {p: _year_split(p, calendar, years) for p in periods}
+        periods = [
+            p
+            for p in periods
+            if splits[p].first_cost <= most_days and splits[p].second_cost <= most_days
+        ]
+    stats.add("candidates_generated", len(periods))
+
+    with stats.phase("greedy"):
+        schedule = _greedy_horizon(periods, splits, budget, len(years), max_vacations)
+    if max_vacations is None:
+        yield PlanUpdate(_format_horizon(schedule, splits, budget, years), True, stats.as_dict())
+        return
+    yield PlanUpdate(_format_horizon(schedule, splits, budget, years), False, stats.as_dict())
+
+    with stats.phase("search"):
+        exact = _select_horizon_periods(
+            periods, splits, max_vacations, budget, len(years), deadline, stats
+        )
+    if exact is None:
+        return
+    if _days_off(exact) > _days_off(schedule):
+        schedule = exact
+    yield PlanUpdate(_format_horizon(schedule, splits, budget, years), True, stats.as_dict())
+
+
+def _balance_bound(budget: HorizonBudget, years: int) -> float:
+    if budget.max_balance is not None:
+        return max(budget.opening, budget.max_balance)
+    return budget.opening + budget.accrual * (years - 1)
+
+
+def _half_days(days) -> int:
+    """``days`` in whole half days, rounding a partial half day down."""
+    # Round first so that e.g. 0.1 + 0.2 days isn't a hair short of its half days
+    return math.floor(round(days * HALF_DAYS_PER_DAY, 6))
+
+
+def _year_split(period: Period, calendar: Calendar, years: List[int]) -> YearSplit:
+    start_year = period.start_date.year - years[0]
+    end_year = period.end_date.year - years[0]
+    if start_year == end_year:
+        return YearSplit(start_year, end_year, period.workdays, 0)
+    new_year = date(years[end_year], 1, 1).toordinal() - calendar.first_ordinal
+    first_cost = calendar.count(WORKDAY, period.start - calendar.first_ordinal, new_year - 1)
+    return YearSplit(start_year, end_year, first_cost, period.workdays - first_cost)
+
+
+def _greedy_horizon(
+    periods: List[Period],
+    splits: Dict[Period, YearSplit],
+    budget: HorizonBudget,
+    years: int,
+    max_vacations: int = None,
+) -> List[Period]:
+    """Take the most efficient periods every year's budget can still afford."""
+    if max_vacations is not None and max_vacations < 1:
+        return []
+    schedule = []
+    spent = [0] * years
+    taken = IntervalSet()
+    for period in periods:
+        if taken.overlaps(period.start, period.end):
+            continue
+        split = splits[period]
+        spent[split.start_year] += split.first_cost
+        spent[split.end_year] += split.second_cost
+        if budget.opening_balances(spent) is None:
+            spent[split.start_year] -= split.first_cost
+            spent[split.end_year] -= split.second_cost
+            continue
+
+        schedule.append(period)
+        taken.add(period.start, period.end)
+        if len(schedule) == max_vacations:
+            break
+    return schedule
+
+
+def _spent_per_year(schedule: List[Period], splits: Dict[Period, YearSplit], years: int):
+    spent = [0] * years
+    for period in schedule:
+        split = splits[period]
+        spent[split.start_year] += split.first_cost
+        spent[split.end_year] += split.second_cost
+    return spent
+
+
+def _format_horizon(
+    schedule: List[Period], splits: Dict[Period, YearSplit], budget: HorizonBudget, years
+) -> Dict:
+    result = _format_schedule(sorted(schedule, key=lambda p: p.start))
+    spent = _spent_per_year(schedule, splits, len(years))
+    balances = budget.balances(spent)
+    result["years"] = [
+        {"year": year, "available_days": balance, "days_used": days}
+        for year, balance, days in zip(years, balances, spent)
+    ]
+    return result
+
+
+def _select_horizon_periods(
+    periods: List[Period],
+    splits: Dict[Period, YearSplit],
+    max_vacations: int,
+    budget: HorizonBudget,
+    years: int,
+    deadline: Optional[float] = None,
+    stats: OptimizerStats = DISABLED_STATS,
+) -> Optional[List[Period]]:
+    """Return the schedule of at most ``max_vacations`` periods with the most days off.
+
+    The single-year search tracks days spent; here a state is the balance left in the year
+    of the candidate's end date, which makes carrying over into the next year a map from
+    one balance to another. Otherwise it is the same weighted interval scheduling, and the
+    table is no larger than a single year's with the largest balance. Balances are counted
+    in half days, so fractional balances and accruals carry over exactly. Returns None if the
+    search is still running at ``deadline``.
+    """
+    amounts = [budget.opening, budget.accrual]
+    if budget.max_balance is not None:
+        amounts.append(budget.max_balance)
+    # Candidates cost whole days, but fractional accruals add up across years, so balances
+    # are searched in half days as soon as any of the budgets holds one
+    unit = math.gcd(HALF_DAYS_PER_DAY, *(_half_days(amount) for amount in amounts))
+    whole = HorizonBudget(*(_half_days(amount) // unit for amount in amounts))
+    if whole.opening < 0 or max_vacations < 1:
+        # The table only holds balances from zero up, so an overdrawn first year keeps the
+        # greedy plan, which pays the overdraft back from later accruals
+        return []
+    top = int(_balance_bound(whole, years))
+    scale = HALF_DAYS_PER_DAY // unit
+    splits = {
+        p: split._replace(
+            first_cost=split.first_cost * scale, second_cost=split.second_cost * scale
+        )
+        for p, split in splits.items()
+    }
+
+    unique = {}
+    for p in periods:
+        unique.setdefault((p.start, p.end), p)
+    candidates = sorted(unique.values(), key=lambda p: p.end)
+    ends = [p.end for p in candidates]
+    stats.add("candidates_pruned", len(periods) - len(candidates))
+
+    max_k = min(max_vacations, len(candidates))
+    width = top + 1
+    search = _BalanceSearch(whole, max_k, width)
+
+    # rows[i][k * width + r] is the most days off reachable with the first i candidates
+    # and at most k vacations, leaving exactly r units in the year of row_years[i].
+    start = [_UNREACHABLE] * whole.opening + [0] + [_UNREACHABLE] * (top - whole.opening)
+    rows = [start * (max_k + 1)]
+    row_years = [0]
+    predecessors = []
+    carried = {}
+
+    def row_at(i: int, year: int) -> List[int]:
+        # Rows are kept in the coordinates of their own year; move them forward on demand
+        if row_years[i] == year:
+            return rows[i]
+        if (i, year) not in carried:
+            carried[(i, year)] = search.carry_row(rows[i], year - row_years[i])
+        return carried[(i, year)]
+
+    for n, p in enumerate(candidates):
+        if deadline is not None and n % 64 == 0 and time.monotonic() > deadline:
+            return None
+        split = splits[p]
+        pred = bisect_left(ends, p.start)
+        predecessors.append(pred)
+        base = row_at(pred, split.start_year)
+        if split.end_year == split.start_year:
+            cost = split.first_cost
+        else:
+            # Bridging New Year: spend this year's days, carry over, spend next year's
+            base = search.spend_row(base, split.first_cost)
+            base = search.carry_row(base, 1)
+            cost = split.second_cost
+        prev = row_at(n, split.end_year)
+        value = p.total_days_off
+        row = prev[:]
+        # A period costing more than any balance can hold never fits; keep the row as is
+        for k in range(1, max_k + 1 if cost < width else 1):
+            lo, src = k * width, (k - 1) * width
+            row[lo : lo + width - cost] = map(
+                max,
+                prev[lo : lo + width - cost],
+                [x + value for x in base[src + cost : src + width]],
+            )
+        rows.append(row)
+        row_years.append(split.end_year)
+    stats.add(
+        "combinations_evaluated",
+        max_k * sum(max(0, width - splits[p].first_cost) for p in candidates),
+    )
+
+    last = rows[-1][max_k * width : (max_k + 1) * width]
+    best = max(last)
+    if best <= 0:
+        return []
+
+    # Walk back through the table, recovering each balance in the coordinates of its row
+    schedule = []
+    i, k, r = len(candidates), max_k, last.index(best)
+    while rows[i][k * width + r] > 0:
+        value = rows[i][k * width + r]
+        p = candidates[i - 1]
+        split = splits[p]
+        gap = split.end_year - row_years[i - 1]
+        if gap == 0:
+            skipped = r if rows[i - 1][k * width + r] == value else None
+        else:
+            skipped = search.find(rows[i - 1], k, value, lambda b: search.carry(b, gap) == r)
+        if skipped is not None:
+            i, r = i - 1, skipped
+            continue
+        pred = predecessors[i - 1]
+        from_year = row_years[pred]
+        r = search.find(
+            rows[pred],
+            k - 1,
+            value - p.total_days_off,
+            lambda b: search.advance(b, from_year, split) == r,
+        )
+        schedule.append(p)
+        i, k = pred, k - 1
+
+    schedule.reverse()
+    return schedule
+
+
+class _BalanceSearch:
+    """Balance arithmetic on whole rows of the horizon search table and on single states."""
+
+    def __init__(self, budget: HorizonBudget, max_k: int, width: int):
+        self.accrual = budget.accrual
+        self.cap = width - 1 if budget.max_balance is None else budget.max_balance
+        self.max_k = max_k
+        self.width = width
+
+    def carry(self, balance: int, years: int) -> int:
+        for _ in range(years):
+            balance = min(balance + self.accrual, self.cap)
+        return balance
+
+    def advance(self, balance: int, from_year: int, split: YearSplit) -> Optional[int]:
+        """The balance left after taking a period from a state, or None if unaffordable."""
+        balance = self.carry(balance, split.start_year - from_year) - split.first_cost
+        if balance < 0:
+            return None
+        if split.end_year != split.start_year:
+            balance = self.carry(balance, 1) - split.second_cost
+        return balance if balance >= 0 else None
+
+    def carry_row(self, row: List[int], years: int) -> List[int]:
+        width = self.width
+        carried = [_UNREACHABLE] * len(row)
+        for lo in range(0, len(row), width):
+            for balance in range(width):
+                value = row[lo + balance]
+                if value >= 0:
+                    cell = lo + self.carry(balance, years)
+                    if value > carried[cell]:
+                        carried[cell] = value
+        return carried
+
+    def spend_row(self, row: List[int], cost: int) -> List[int]:
+        width = self.width
+        spent = [_UNREACHABLE] * len(row)
+        if cost >= width:
+            return spent
+        for lo in range(0, len(row), width):
+            spent[lo : lo + width - cost] = row[lo + cost : lo + width]
+        return spent
+
+    def find(self, row: List[int], k: int, value: int, leads_here) -> Optional[int]:
+        """A balance in ``row`` with ``value`` days off at ``k`` vacations that
+        ``leads_here``, or None."""
+        lo = k * self.width
+        for balance in range(self.width):
+            if row[lo + balance] == value and leads_here(balance):
+                return balance
+        return None
@@ -0,0 +1,166 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from ..utils.settings import bool_setting
+
+# Collect optimizer phase timings and counters for /metrics; requests asking for debug
+# output are measured either way
+OPTIMIZER_METRICS = bool_setting("OPTIMIZER_METRICS", True)
+
+# Upper bounds, in seconds, of the phase duration histogram buckets
+PHASE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# (labels, value) pairs of one metric
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+class OptimizerStats:
+    """Phase timings and counters of one optimizer run.
+
+    Plain data so it survives the trip back from a worker process.
+    """
+
+    __slots__ = ("phases", "counters")
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - started
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def as_dict(self) -> Dict:
+        return {"phases": dict(self.phases), "counters": dict(self.counters)}
+
+
+class _DisabledStats(OptimizerStats):
+    """Stand-in used when nobody reads the stats; every call is a no-op."""
+
+    __slots__ = ()
+    _null_phase = nullcontext()
+
+    def phase(self, name: str):
+        return self._null_phase
+
+    def add(self, counter: str, amount: int = 1) -> None:
+        pass
+
+    def as_dict(self) -> Optional[Dict]:
+        return None
+
+
+DISABLED_STATS = _DisabledStats()
+
+
+class MetricsRegistry:
+    """Process-wide optimizer metrics rendered in the Prometheus text format.
+
+    Runs are folded in with :meth:`observe`; other components contribute point-in-time
+    values through collectors called at scrape time.
+    """
+
+    def __init__(self, buckets: Iterable[float] = PHASE_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.runs = 0
+        self.counters: Dict[str, int] = {}
+        # phase -> (bucket counts, sum of seconds, observations)
+        self.phases: Dict[str, List] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+        self._lock = threading.Lock()
+
+    def observe(self, stats: Optional[Dict]) -> None:
+        """Fold in the ``as_dict()`` of one run's :class:`OptimizerStats`."""
+        if not stats:
+            return
+        with self._lock:
+            self.runs += 1
+            for name, amount in stats["counters"].items():
+                self.counters[name] = self.counters.get(name, 0) + amount
+            for name, seconds in stats["phases"].items():
+                histogram = self.phases.setdefault(name, [[0] * len(self.buckets), 0.0, 0])
+                i = bisect_left(self.buckets, seconds)
+                if i < len(self.buckets):
+                    histogram[0][i] += 1
+                histogram[1] += seconds
+                histogram[2] += 1
+
+    def register_collector(
+        self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]
+    ) -> None:
+        """Add a callable returning ``(name, type, help, samples)`` tuples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, samples: Samples) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+        with self._lock:
+            metric("optimizer_runs_total", "counter", "Optimizer runs.", [({}, self.runs)])
+            for name in sorted(self.counters):
+                metric(
+                    f"optimizer_{name}_total",
+                    "counter",
+                    f"Optimizer {name.replace('_', ' ')}.",
+                    [({}, self.counters[name])],
+                )
+            if self.phases:
+                lines.append("# HELP optimizer_phase_seconds Time spent per optimizer phase.")
+                lines.append("# TYPE optimizer_phase_seconds histogram")
+            for phase in sorted(self.phases):
+                counts, total, observations = self.phases[phase]
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _labels({"phase": phase, "le": _number(bound)})
+                    lines.append(f"optimizer_phase_seconds_bucket{labels} {cumulative}")
+                labels = _labels({"phase": phase, "le": "+Inf"})
+                lines.append(f"optimizer_phase_seconds_bucket{labels} {observations}")
+                labels = _labels({"phase": phase})
+                lines.append(f"optimizer_phase_seconds_sum{labels} {_number(total)}")
+                lines.append(f"optimizer_phase_seconds_count{labels} {observations}")
+
+        for collector in self._collectors:
+            for name, kind, help_text, samples in collector():
+                metric(name, kind, help_text, samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.runs = 0
+            self.counters.clear()
+            self.phases.clear()
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def server_timing(phases_ms: Dict[str, float]) -> str:
+    """Format phase durations in milliseconds as a ``Server-Timing`` header value."""
+    return ", ".join(f"{name};dur={ms:.3f}" for name, ms in phases_ms.items())
+
+
+metrics = MetricsRegistry()
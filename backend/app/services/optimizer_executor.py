@@ -0,0 +1,211 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from ..utils.settings import choice_setting, float_setting, int_setting
+from .calendar import year_calendar
+from .vacation_optimizer import candidate_table
+
+# (year, holiday dates) pairs whose calendars a worker builds before taking jobs
+WarmCalendars = Iterable[Tuple[int, Iterable[date]]]
+
+
+class ExecutorSaturated(Exception):
+    """Raised when the optimizer queue is full; callers should answer 503."""
+
+
+class OptimizerTimeout(Exception):
+    """Raised when an optimizer job does not finish within the executor's timeout."""
+
+
+class Reservation:
+    """A queue slot held by optimizer work that runs outside the executor's pool.
+
+    Releasing it more than once is harmless, so every path that may end the work can.
+    """
+
+    def __init__(self, release: Optional[Callable[[], None]] = None):
+        self._release = release
+
+    def release(self) -> None:
+        release, self._release = self._release, None
+        if release is not None:
+            release()
+
+
+class InlineExecutor:
+    """Runs optimizer jobs on the app's thread pool, in the request's process.
+
+    This is the default and what the tests use: no worker processes, no limits.
+    """
+
+    mode = "inline"
+    # Jobs hold the GIL, so running more than one at a time gains nothing
+    workers = 1
+    timeout = None
+
+    async def start(self, load_warm_calendars: Callable[[], Awaitable[WarmCalendars]]) -> None:
+        pass
+
+    async def run(self, fn: Callable, *args):
+        return await run_in_threadpool(fn, *args)
+
+    def reserve(self) -> Reservation:
+        return Reservation()
+
+    def shutdown(self) -> None:
+        pass
+
+    def stats(self) -> Dict:
+        return {"mode": self.mode}
+
+
+def _warm_worker(calendars: Tuple[Tuple[int, Tuple[date, ...]], ...]) -> None:
+    # Requests then find their candidate table, and without blackout dates their calendar,
+    # already cached
+    for year, holiday_dates in calendars:
+        year_calendar(year, holiday_dates, ())
+        candidate_table(year, holiday_dates)
+
+
+def _ready() -> None:
+    pass
+
+
+class ProcessExecutor:
+    """Runs optimizer jobs on a bounded pool of worker processes.
+
+    At most ``workers`` jobs run at once and at most ``queue_depth`` more wait for a
+    worker; further jobs are rejected with :class:`ExecutorSaturated` instead of piling up.
+    A job that runs past ``timeout`` seconds raises :class:`OptimizerTimeout`. A worker
+    can't be interrupted mid-job, so the timed-out job keeps its slot until it finishes
+    and the queue limit still reflects the real load on the pool. Work that has to run in
+    the request's process, such as streamed plans, takes a slot with :meth:`reserve`.
+    """
+
+    mode = "process"
+
+    def __init__(self, workers: int, queue_depth: int, timeout: float):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._warm_calendars: Tuple = ()
+        self._lock = threading.Lock()
+
+    def _create_pool(self) -> ProcessPoolExecutor:
+        # Spawn rather than fork: forking a process that runs an event loop and database
+        # threads can deadlock the child
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_warm_worker,
+            initargs=(self._warm_calendars,),
+        )
+
+    async def start(self, load_warm_calendars: Callable[[], Awaitable[WarmCalendars]]) -> None:
+        """Start every worker now, with calendars preloaded, so requests never wait on
+        interpreter start-up."""
+        calendars = await load_warm_calendars()
+        self._warm_calendars = tuple((year, tuple(dates)) for year, dates in calendars)
+        self._pool = self._create_pool()
+        await asyncio.gather(
+            *(asyncio.wrap_future(self._pool.submit(_ready)) for _ in range(self.workers))
+        )
+
+    def _submit(self, fn: Callable, *args):
+        if self._pool is None:
+            self._pool = self._create_pool()
+        try:
+            return self._pool.submit(fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); replace the pool and retry once
+            self._pool = self._create_pool()
+            return self._pool.submit(fn, *args)
+
+    def _admit(self) -> None:
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise ExecutorSaturated(f"{self.in_flight} optimizer jobs already queued")
+            self.in_flight += 1
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    def _release_reserved(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+
+    def reserve(self) -> Reservation:
+        """Take a slot for a job run elsewhere, or raise :class:`ExecutorSaturated` like
+        :meth:`run`. The slot counts against the queue limit until it is released."""
+        self._admit()
+        return Reservation(self._release_reserved)
+
+    async def run(self, fn: Callable, *args):
+        self._admit()
+        try:
+            future = self._submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            # Drops the job if it is still queued; a running job finishes in the background
+            future.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise OptimizerTimeout(f"Optimizer job exceeded {self.timeout}s") from None
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "timeout_seconds": self.timeout,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+def create_executor():
+    """Build the executor selected by OPTIMIZER_EXECUTOR ("inline" or "process")."""
+    mode = choice_setting("OPTIMIZER_EXECUTOR", "inline", ("inline", "process"))
+    if mode == "inline":
+        return InlineExecutor()
+    workers = int_setting("OPTIMIZER_WORKERS", os.cpu_count() or 1, 1)
+    return ProcessExecutor(
+        workers,
+        queue_depth=int_setting("OPTIMIZER_QUEUE_DEPTH", workers * 4, 0),
+        timeout=float_setting("OPTIMIZER_TIMEOUT", 10.0, 0.1),
+    )
+
+
+optimizer_executor = create_executor()
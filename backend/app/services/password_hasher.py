@@ -0,0 +1,121 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+from passlib.context import CryptContext
+
+from ..utils.settings import int_setting
+
+
+class HasherSaturated(Exception):
+    """Raised when the password hashing queue is full; callers should answer 503."""
+
+
+class PasswordHasher:
+    """Hashes and verifies passwords on its own bounded thread pool.
+
+    bcrypt takes hundreds of milliseconds per call by design. On the app's shared thread
+    pool a burst of logins would take every thread and stall the other routes, so hashing
+    gets ``workers`` threads of its own. At most ``queue_depth`` more calls wait for one;
+    further calls raise :class:`HasherSaturated` instead of queueing without bound.
+    """
+
+    def __init__(self, rounds: int, workers: int, queue_depth: int):
+        self.rounds = rounds
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        # Pinning the minimum and maximum to the work factor flags every hash made with
+        # another one as needing an update
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.in_flight >= self.workers + self.queue_depth:
+                self.rejected += 1
+                raise HasherSaturated(f"{self.in_flight} password hashes already queued")
+            self.in_flight += 1
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="password-hash"
+                )
+            pool = self._pool
+        try:
+            future = pool.submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self.in_flight -= 1
+            raise
+        # Released when the hash finishes, even if the request gave up waiting for it
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if not future.cancelled():
+                self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> Tuple[bool, Optional[str]]:
+        """Check ``password`` against ``password_hash``.
+
+        Returns whether it matches and, when it does but the hash was made with another
+        work factor, a new hash to store in its place (otherwise None).
+        """
+        valid, new_hash = await self._run(self.context.verify_and_update, password, password_hash)
+        if new_hash is not None:
+            with self._lock:
+                self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict:
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+        }
+
+
+def create_password_hasher() -> PasswordHasher:
+    """Build the hasher configured by BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS/QUEUE_DEPTH.
+
+    BCRYPT_ROUNDS is the bcrypt work factor (log2 of the rounds; each step doubles the cost
+    of a hash). Stored hashes made with another factor are rehashed at their next login.
+    bcrypt releases the GIL, so hashing threads run in parallel, up to one per spare core.
+    """
+    workers = int_setting("PASSWORD_HASH_WORKERS", 2, 1)
+    return PasswordHasher(
+        rounds=int_setting("BCRYPT_ROUNDS", 12, 4),
+        workers=workers,
+        queue_depth=int_setting("PASSWORD_HASH_QUEUE_DEPTH", workers * 8, 0),
+    )
+
+
+password_hasher = create_password_hasher()
@@ -0,0 +1,66 @@
+import threading
+from typing import Dict, NamedTuple, Optional
+
+from ..utils.settings import float_setting, int_setting
+from .suggestion_cache import CacheBackend, MemoryBackend
+
+# Serialized shared plans kept in memory; 0 turns the cache off. Updates and deletes in
+# this process drop entries at once, the TTL bounds how long other processes serve them.
+SHARED_PLAN_CACHE_SIZE = int_setting("SHARED_PLAN_CACHE_SIZE", 1024, 0)
+SHARED_PLAN_CACHE_TTL = float_setting("SHARED_PLAN_CACHE_TTL", 300.0, 0.0)
+
+
+class CachedPlan(NamedTuple):
+    body: bytes
+    etag: str
+
+
+class SharedPlanCache:
+    """Response bodies of shared plans and their ETags, keyed by share token."""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, share_token: str) -> Optional[CachedPlan]:
+        value = self.backend.get(share_token) if self.backend is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, share_token: str, plan: CachedPlan) -> None:
+        if self.backend is not None:
+            self.backend.set(share_token, plan)
+
+    def invalidate(self, share_token: Optional[str]) -> None:
+        """Drop a plan's entry after it changed; plans never shared have none."""
+        if self.backend is not None and share_token is not None:
+            self.backend.delete(share_token)
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.backend) if self.backend is not None else 0,
+        }
+
+
+shared_plan_cache = SharedPlanCache(
+    MemoryBackend(maxsize=SHARED_PLAN_CACHE_SIZE, ttl=SHARED_PLAN_CACHE_TTL)
+    if SHARED_PLAN_CACHE_SIZE
+    else None
+)
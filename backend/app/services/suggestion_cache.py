@@ -0,0 +1,165 @@
+import hashlib
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Protocol
+
+from ..utils.settings import float_setting, int_setting
+
+# Cache settings, overridable per deployment
+SUGGESTION_CACHE_SIZE = int_setting("SUGGESTION_CACHE_SIZE", 1024, 1)
+SUGGESTION_CACHE_TTL = float_setting("SUGGESTION_CACHE_TTL", 300.0, 0.0)
+
+# Backend entry holding the current holidays version, so every process sharing the backend
+# sees the same one
+HOLIDAYS_VERSION_KEY = "holidays-version"
+
+
+class CacheBackend(Protocol):
+    """Storage used by :class:`SuggestionCache`; swap in a shared store (e.g. Redis)."""
+
+    def get(self, key: str) -> Optional[Any]:
+        ...
+
+    def set(self, key: str, value: Any) -> None:
+        ...
+
+    def delete(self, key: str) -> None:
+        ...
+
+    def clear(self) -> None:
+        ...
+
+    def __len__(self) -> int:
+        ...
+
+
+class MemoryBackend:
+    """Thread-safe in-process LRU store whose entries expire after ``ttl`` seconds."""
+
+    def __init__(
+        self, maxsize: int = 1024, ttl: float = 300, clock: Callable[[], float] = time.monotonic
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SuggestionCache:
+    """Content-addressed cache of optimizer results.
+
+    A result depends only on the year's holidays, the user's blackout dates, the days left
+    in their budget, the request flags and today's date (past periods are skipped), so
+    users with identical inputs share one entry. Holidays enter the key through a version
+    kept in the backend itself, which :meth:`invalidate` replaces whenever holidays change,
+    so with a shared backend a change made through one process reaches every process. A
+    changed time budget changes the key by itself.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @property
+    def holidays_version(self) -> str:
+        """The backend's current holidays version, starting a new one if it has none.
+
+        Versions are random rather than counted, so one that was evicted or expired is never
+        reissued and can't revive entries computed from older holidays.
+        """
+        version = self.backend.get(HOLIDAYS_VERSION_KEY)
+        if version is None:
+            version = uuid.uuid4().hex
+            self.backend.set(HOLIDAYS_VERSION_KEY, version)
+        return version
+
+    def key(self, **inputs) -> str:
+        inputs["holidays_version"] = self.holidays_version
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: Dict) -> None:
+        self.backend.set(key, value)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict]) -> Dict:
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def invalidate(self) -> None:
+        """Drop every cached result, e.g. after the holiday calendar changed."""
+        # Dropping the version moves every process to a new one, even if the backend
+        # can't clear entries other processes are still adding
+        self.backend.delete(HOLIDAYS_VERSION_KEY)
+        self.backend.clear()
+
+    def clear(self) -> None:
+        """Reset entries and counters."""
+        self.invalidate()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        version = self.backend.get(HOLIDAYS_VERSION_KEY)
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            # Results only; the version has an entry of its own
+            "size": len(self.backend) - (version is not None),
+            "holidays_version": version,
+        }
+
+
+suggestion_cache = SuggestionCache(
+    MemoryBackend(maxsize=SUGGESTION_CACHE_SIZE, ttl=SUGGESTION_CACHE_TTL)
+)
@@ -0,0 +1,119 @@
+from datetime import date
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models.policy import Policy
+from ..models.time_budget import TimeBudget
+from .holiday_store import DEFAULT_COUNTRY
+
+
+class UserContext(NamedTuple):
+    """Everything the optimizer needs to know about a user for one year."""
+
+    user_id: Optional[int]  # None for inline plans that belong to no stored user
+    year: int
+    available_days: float
+    blackout_dates: List[str]
+    holiday_dates: Tuple[date, ...]
+    # The holiday calendar the dates came from; a None employer means every employer's
+    country: str = DEFAULT_COUNTRY
+    employer_id: Optional[int] = None
+    # Days granted each year and the most a balance may hold once they are added, for
+    # planning across years; None for inline plans
+    annual_days: Optional[float] = None
+    max_balance: Optional[float] = None
+
+
+async def load_user_context(
+    db: AsyncSession,
+    user_id: int,
+    year: int,
+    holiday_dates: Tuple[date, ...],
+    country: str = DEFAULT_COUNTRY,
+    employer_id: Optional[int] = None,
+) -> Optional[UserContext]:
+    """Load a user's budget and policy in a single round trip.
+
+    The user's (first) time budget and policy are joined into one row; the holidays come
+    from the caller, usually the in-process holiday store. Returns None when the user has
+    no budget or policy.
+    """
+    first_budget = (
+        select(func.min(TimeBudget.id)).where(TimeBudget.user_id == user_id).scalar_subquery()
+    )
+    first_policy = select(func.min(Policy.id)).where(Policy.user_id == user_id).scalar_subquery()
+    statement = (
+        select(
+            TimeBudget.accrued_days, TimeBudget.used_days, Policy.blackout_dates, Policy.max_days
+        )
+        .join(Policy, Policy.user_id == TimeBudget.user_id)
+        .where(TimeBudget.id == first_budget, Policy.id == first_policy)
+    )
+    row = (await db.execute(statement)).first()
+    if row is None:
+        return None
+
+    return UserContext(
+        user_id=user_id,
+        year=year,
+        available_days=row.accrued_days - (row.used_days or 0.0),
+        blackout_dates=row.blackout_dates or [],
+        holiday_dates=holiday_dates,
+        country=country,
+        employer_id=employer_id,
+        annual_days=row.accrued_days,
+        max_balance=row.max_days,
+    )
+
+
+async def load_user_contexts(
+    db: AsyncSession,
+    user_ids: Iterable[int],
+    year: int,
+    holiday_dates: Tuple[date, ...],
+    country: str = DEFAULT_COUNTRY,
+    employer_id: Optional[int] = None,
+) -> Dict[int, UserContext]:
+    """Load the contexts of many users, sharing the year's ``holiday_dates``, in one query.
+
+    Users without a budget or policy are left out of the result.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
+    first_budgets = (
+        select(func.min(TimeBudget.id))
+        .where(TimeBudget.user_id.in_(user_ids))
+        .group_by(TimeBudget.user_id)
+    )
+    first_policies = (
+        select(func.min(Policy.id)).where(Policy.user_id.in_(user_ids)).group_by(Policy.user_id)
+    )
+    statement = (
+        select(
+            TimeBudget.user_id,
+            TimeBudget.accrued_days,
+            TimeBudget.used_days,
+            Policy.blackout_dates,
+            Policy.max_days,
+        )
+        .join(Policy, Policy.user_id == TimeBudget.user_id)
+        .where(TimeBudget.id.in_(first_budgets), Policy.id.in_(first_policies))
+    )
+    rows = (await db.execute(statement)).all()
+    return {
+        row.user_id: UserContext(
+            user_id=row.user_id,
+            year=year,
+            available_days=row.accrued_days - (row.used_days or 0.0),
+            blackout_dates=row.blackout_dates or [],
+            holiday_dates=holiday_dates,
+            country=country,
+            employer_id=employer_id,
+            annual_days=row.accrued_days,
+            max_balance=row.max_days,
+        )
+        for row in rows
+    }
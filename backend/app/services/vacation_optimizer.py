@@ -1,123 +1,256 @@
-from datetime import datetime, timedelta
-from itertools import combinations
-from typing import Dict
+import math
+import time
+from bisect import bisect_left
+from datetime import date, datetime
+from functools import lru_cache
+from operator import gt
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 
 from ..models.holiday import Holiday
 from ..models.policy import Policy
 from ..models.time_budget import TimeBudget
+from ..utils.intervals import IntervalSet
+from .calendar import (
+    BLACKOUT,
+    HOLIDAY,
+    MAX_WINDOW_DAYS,
+    WEEKEND,
+    WORKDAY,
+    Calendar,
+    get_calendar,
+    scan_windows,
+    year_calendar,
+)
+from .holiday_store import DEFAULT_COUNTRY, holiday_filter
+from .instrumentation import DISABLED_STATS, OptimizerStats
+
+
+class Period(NamedTuple):
+    """A candidate vacation: inclusive date ordinals plus its day counts.
+
+    Candidates are created by the thousand and most are discarded, so dates and the
+    explanation text are only built on demand for the periods that get scheduled.
+    """
+
+    start: int
+    end: int
+    workdays: int
+    weekends: int
+    holidays: int
+
+    @property
+    def start_date(self) -> date:
+        return date.fromordinal(self.start)
+
+    @property
+    def end_date(self) -> date:
+        return date.fromordinal(self.end)
+
+    @property
+    def days_used(self) -> int:
+        return self.workdays
+
+    @property
+    def total_days_off(self) -> int:
+        return self.workdays + self.weekends + self.holidays
+
+    @property
+    def efficiency(self) -> float:
+        return self.total_days_off / self.workdays
+
+    @property
+    def dates(self) -> List[date]:
+        return [date.fromordinal(o) for o in range(self.start, self.end + 1)]
+
+    @property
+    def explanation(self) -> str:
+        return (
+            f"Take {self.workdays} days off to get {self.total_days_off} days away "
+            f"(includes {self.weekends} weekend days and {self.holidays} holidays)"
+        )
+
+    def to_dict(self) -> Dict:
+        return {
+            "start": self.start_date.strftime("%Y-%m-%d"),
+            "end": self.end_date.strftime("%Y-%m-%d"),
+            "days_used": self.days_used,
+            "total_days_off": self.total_days_off,
+            "efficiency": self.efficiency,
+            "breakdown": {
+                "workdays": self.workdays,
+                "weekends": self.weekends,
+                "holidays": self.holidays,
+            },
+            "explanation": self.explanation,
+        }
 
 
 def optimize_vacation(
-    user_id: int, year: int, db, no_single_days: bool = False, max_vacations: int = None
+    user_id: int,
+    year: int,
+    db,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+    country: str = DEFAULT_COUNTRY,
+    employer_id: Optional[int] = None,
 ) -> Dict:
     policy = db.query(Policy).filter(Policy.user_id == user_id).first()
     time_budget = db.query(TimeBudget).filter(TimeBudget.user_id == user_id).first()
-    holidays = db.query(Holiday).filter(Holiday.year == year).all()
-
-    available_days = time_budget.accrued_days - time_budget.used_days
-    blackout_dates = {datetime.strptime(d, "%Y-%m-%d").date() for d in policy.blackout_dates or []}
-    holiday_dates = {h.date: h for h in holidays}
-
-    # Generate all possible periods
-    all_periods = []
-    for holiday in holidays:
-        holiday_date = holiday.date
-        for offset in range(1, 8):
-            start = holiday_date - timedelta(days=offset)
-            end = holiday_date - timedelta(days=1)
-            all_periods.extend(
-                generate_period(
-                    start, end, holiday_dates, blackout_dates, available_days, no_single_days
-                )
-            )
-
-            start = holiday_date + timedelta(days=1)
-            end = holiday_date + timedelta(days=offset)
-            all_periods.extend(
-                generate_period(
-                    start, end, holiday_dates, blackout_dates, available_days, no_single_days
-                )
-            )
-
-            start = holiday_date - timedelta(days=offset // 2)
-            end = holiday_date + timedelta(days=offset // 2)
-            all_periods.extend(
-                generate_period(
-                    start, end, holiday_dates, blackout_dates, available_days, no_single_days
-                )
-            )
-
-    # Score periods
-    for p in all_periods:
-        p["efficiency"] = p["total_days_off"] / p["days_used"]
-
-    # Filter and sort by efficiency
-    all_periods.sort(key=lambda x: x["efficiency"], reverse=True)
-
-    # Find combinations for max_vacations
+    holidays = db.query(Holiday).filter(*holiday_filter(year, country, employer_id)).all()
+
+    return plan_vacation(
+        year,
+        [h.date for h in holidays],
+        parse_blackout_dates(policy.blackout_dates),
+        time_budget.accrued_days - time_budget.used_days,
+        no_single_days,
+        max_vacations,
+    )
+
+
+def parse_blackout_dates(blackout_dates) -> Set[date]:
+    return {datetime.strptime(d, "%Y-%m-%d").date() for d in blackout_dates or []}
+
+
+class PlanUpdate(NamedTuple):
+    """One schedule yielded by :func:`iter_plans`; ``final`` once the search is complete.
+
+    ``stats`` holds the run's phase timings and counters so far when they were asked for.
+    """
+
+    result: Dict
+    final: bool
+    stats: Optional[Dict] = None
+
+
+def plan_vacation(
+    year: int,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    available_days,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+) -> Dict:
+    """Optimize a vacation schedule from plain data.
+
+    This is the CPU-bound part of :func:`optimize_vacation`; it touches no database session,
+    so callers can load the inputs however they like and run it off the event loop.
+    """
+    return best_plan(
+        year, holiday_dates, blackout_dates, available_days, no_single_days, max_vacations
+    ).result
+
+
+def best_plan(
+    year: int,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    available_days,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+    time_limit: Optional[float] = None,
+    collect_stats: bool = False,
+) -> PlanUpdate:
+    """Return the best schedule :func:`iter_plans` finds within ``time_limit`` seconds."""
+    update = None
+    for update in iter_plans(
+        year,
+        holiday_dates,
+        blackout_dates,
+        available_days,
+        no_single_days,
+        max_vacations,
+        time_limit,
+        collect_stats,
+    ):
+        pass
+    return update
+
+
+def iter_plans(
+    year: int,
+    holiday_dates: Iterable[date],
+    blackout_dates: Iterable[date],
+    available_days,
+    no_single_days: bool = False,
+    max_vacations: int = None,
+    time_limit: Optional[float] = None,
+    collect_stats: bool = False,
+) -> Iterator[PlanUpdate]:
+    """Yield increasingly good schedules, ending with a final one unless time runs out.
+
+    The greedy schedule comes first and takes milliseconds. When ``max_vacations`` is set,
+    the exact search follows and its schedule is yielded if it beats the greedy one. If the
+    search is still running after ``time_limit`` seconds it is abandoned, and the last
+    schedule yielded (never marked final) is the best found in time.
+
+    With ``collect_stats``, every update carries the time spent per phase and how many
+    candidates were generated, pruned and combined.
+    """
+    stats = OptimizerStats() if collect_stats else DISABLED_STATS
+    deadline = None if time_limit is None else time.monotonic() + time_limit
+    with stats.phase("calendar"):
+        calendar = year_calendar(year, holiday_dates, blackout_dates)
+    with stats.phase("table"):
+        table = candidate_table(year, holiday_dates)
+
+    # Keep the candidates that end in the future and suit this user's blackouts and budget
+    today = datetime.now().date()
+    with stats.phase("scan"):
+        all_periods = table.select(
+            calendar, max(date(year, 1, 1), today), available_days, no_single_days
+        )
+    stats.add("candidates_generated", len(all_periods))
+
+    with stats.phase("greedy"):
+        schedule = _greedy_periods(all_periods, available_days, max_vacations)
+    if max_vacations is None:
+        yield PlanUpdate(_format_schedule(schedule), True, stats.as_dict())
+        return
+    yield PlanUpdate(_format_schedule(schedule), False, stats.as_dict())
+
+    # Find the best schedule for max_vacations
+    with stats.phase("search"):
+        exact = _select_periods(all_periods, max_vacations, available_days, deadline, stats)
+    if exact is None:
+        return
+    if _days_off(exact) > _days_off(schedule):
+        schedule = exact
+    yield PlanUpdate(_format_schedule(schedule), True, stats.as_dict())
+
+
+def _greedy_periods(
+    all_periods: List[Period], available_days, max_vacations: int = None
+) -> List[Period]:
+    """Take the most efficient periods that fit, up to ``max_vacations`` of them."""
+    if max_vacations is not None and max_vacations < 1:
+        return []
     schedule = []
-    used_days_total = 0
-    used_dates = set()
-
-    if max_vacations is not None:
-        for r in range(1, min(max_vacations + 1, len(all_periods) + 1)):
-            for combo in combinations(all_periods, r):
-                total_used = sum(p["days_used"] for p in combo)
-                if total_used == available_days:
-                    # Check if periods overlap
-                    all_dates = set()
-                    for p in combo:
-                        p_dates = set(p["dates"])
-                        if any(d in all_dates for d in p_dates):
-                            # Periods overlap, skip
-                            continue
-                        all_dates.update(p_dates)
-
-                    # Calculate total days off
-                    total_days_off = sum(p["total_days_off"] for p in combo)
-
-                    # If better than current best, update
-                    if not schedule or total_days_off > sum(p["total_days_off"] for p in schedule):
-                        schedule = combo
-                        used_days_total = total_used
-                        used_dates = all_dates
-                        break
-    else:
-        # Greedy approach for no max_vacations
-        remaining_days = available_days
-        for period in all_periods:
-            if period["days_used"] <= remaining_days:
-                # Check if period overlaps with used dates
-                p_dates = set(period["dates"])
-                if any(d in used_dates for d in p_dates):
-                    continue
-
-                schedule.append(period)
-                remaining_days -= period["days_used"]
-                used_days_total += period["days_used"]
-                used_dates.update(p_dates)
-
-                if remaining_days == 0:
-                    break
-
-    # Format the result
+    remaining_days = available_days
+    taken = IntervalSet()
+    for period in all_periods:
+        if period.days_used <= remaining_days:
+            # Check if period overlaps with the periods already taken
+            if taken.overlaps(period.start, period.end):
+                continue
+
+            schedule.append(period)
+            taken.add(period.start, period.end)
+            remaining_days -= period.days_used
+
+            if remaining_days == 0 or len(schedule) == max_vacations:
+                break
+
+    return schedule
+
+
+def _days_off(schedule: List[Period]) -> int:
+    return sum(p.total_days_off for p in schedule)
+
+
+def _format_schedule(schedule: List[Period]) -> Dict:
     result = {
-        "schedule": [
-            {
-                "start": p["start_date"].strftime("%Y-%m-%d"),
-                "end": p["end_date"].strftime("%Y-%m-%d"),
-                "days_used": p["days_used"],
-                "total_days_off": p["total_days_off"],
-                "efficiency": p["efficiency"],
-                "breakdown": {
-                    "workdays": p["workdays"],
-                    "weekends": p["weekends"],
-                    "holidays": p["holidays"],
-                },
-                "explanation": p["explanation"],
-            }
-            for p in schedule
-        ],
+        "schedule": [p.to_dict() for p in schedule],
         "warning": None,
     }
 
@@ -129,6 +262,227 @@ def optimize_vacation(
     return result
 
 
+# Most vacations the exact search plans in one year; its work grows with this times the
+# days in the budget, so it bounds how long a request can keep a worker busy
+MAX_VACATIONS = 10
+
+# Sentinel for unreachable DP states; far enough below zero that adding days off never
+# makes an unreachable state look feasible.
+_UNREACHABLE = -(10**9)
+
+
+def _select_periods(
+    periods: List[Period],
+    max_vacations: int,
+    available_days,
+    deadline: Optional[float] = None,
+    stats: OptimizerStats = DISABLED_STATS,
+) -> Optional[List[Period]]:
+    """Return the best schedule of at most ``max_vacations`` non-overlapping periods.
+
+    The schedule spends exactly ``available_days`` and maximizes the total days off. This is
+    weighted interval scheduling with two extra dimensions (vacations used, days spent):
+    candidates are sorted by end date and each one either extends the best schedule ending
+    before it starts or is skipped, so the run time is O(n * max_vacations * available_days).
+    Returns None if the search is still running at ``deadline`` (a time.monotonic() value).
+
+    Every candidate window covers whole workdays, so a fractional balance such as 10.5 is
+    searched as its whole days and the fraction is left over.
+    """
+    if available_days <= 0 or max_vacations < 1:
+        return []
+    # Candidates only ever cost whole days, so only the whole days of a balance can be spent.
+    # Round first so that e.g. 0.1 + 0.2 days isn't a hair short of its whole days.
+    budget = math.floor(round(available_days, 6))
+    costs = {p: p.days_used for p in periods}
+
+    # Identical windows around different holidays are interchangeable; keep one of each.
+    unique = {}
+    for p in periods:
+        if costs[p] <= budget:
+            unique.setdefault((p.start, p.end), p)
+    candidates = sorted(unique.values(), key=lambda p: p.end)
+    ends = [p.end for p in candidates]
+    stats.add("candidates_pruned", len(periods) - len(candidates))
+
+    # Every period costs at least one day, so more vacations than days can never be used,
+    # nor more than the most candidates that fit in the year without overlapping
+    max_k = min(max_vacations, budget, _most_disjoint(candidates))
+    if budget > sum(sorted((costs[p] for p in candidates), reverse=True)[:max_k]):
+        # Not even the longest candidates, as many as allowed, can spend the whole balance
+        return []
+    width = budget + 1
+    predecessors = [bisect_left(ends, p.start) for p in candidates]
+    # keep_from[n]: the oldest row candidate n or any later one extends; rows before it
+    # are never read again
+    keep_from = predecessors + [len(candidates)]
+    for n in range(len(candidates) - 1, -1, -1):
+        keep_from[n] = min(keep_from[n], keep_from[n + 1])
+
+    # rows[i][k * width + b] is the most days off reachable with the first i candidates,
+    # at most k vacations and exactly b days spent. Only the rows later candidates extend
+    # are kept; taken[i] marks the cells where candidate i beat skipping it, which is all
+    # the walk back needs.
+    rows = {0: ([0] + [_UNREACHABLE] * budget) * (max_k + 1)}
+    taken = []
+    oldest = 0
+    for n, p in enumerate(candidates):
+        if deadline is not None and n % 64 == 0 and time.monotonic() > deadline:
+            stats.add("combinations_evaluated", _cells_updated(candidates[:n], costs, max_k, width))
+            return None
+        prev, base = rows[n], rows[predecessors[n]]
+        cost, value = costs[p], p.total_days_off
+        row = prev[:]
+        flags = bytearray(len(row))
+        for k in range(1, max_k + 1):
+            lo, src = k * width, (k - 1) * width
+            kept = prev[lo + cost : lo + width]
+            extended = [x + value for x in base[src : src + width - cost]]
+            row[lo + cost : lo + width] = map(max, kept, extended)
+            flags[lo + cost : lo + width] = map(gt, extended, kept)
+        rows[n + 1] = row
+        taken.append(flags)
+        while oldest < keep_from[n + 1]:
+            del rows[oldest]
+            oldest += 1
+    stats.add("combinations_evaluated", _cells_updated(candidates, costs, max_k, width))
+
+    if rows[len(candidates)][max_k * width + budget] < 0:
+        return []
+
+    # Walk back through the decisions to recover which candidates were taken.
+    schedule = []
+    i, k, b = len(candidates), max_k, budget
+    while b > 0:
+        if not taken[i - 1][k * width + b]:
+            i -= 1
+            continue
+        p = candidates[i - 1]
+        schedule.append(p)
+        b -= costs[p]
+        k -= 1
+        i = predecessors[i - 1]
+
+    schedule.reverse()
+    return schedule
+
+
+def _most_disjoint(candidates: List[Period]) -> int:
+    """How many of ``candidates`` (sorted by end date) fit without overlapping."""
+    count, free_from = 0, None
+    for p in candidates:
+        if free_from is None or p.start >= free_from:
+            count += 1
+            free_from = p.end + 1
+    return count
+
+
+def _cells_updated(
+    candidates: List[Period], costs: Dict[Period, int], max_k: int, width: int
+) -> int:
+    # Each candidate updates the cells of every vacation count it can afford
+    return max_k * sum(width - costs[p] for p in candidates)
+
+
+def _window_period(windows, row, calendar) -> Period:
+    start, end = windows.start[row], windows.end[row]
+    i = start - calendar.first_ordinal
+    j = end - calendar.first_ordinal
+    return Period(
+        start,
+        end,
+        windows.days_used[row],
+        calendar.count(WEEKEND, i, j),
+        calendar.count(HOLIDAY, i, j),
+    )
+
+
+class CandidateTable:
+    """Every candidate window of a year, most efficient first, before any user's blackout
+    dates and budget are applied.
+
+    Users of one holiday calendar differ only in those, so the table is built once per
+    (year, holiday set) and each plan filters it instead of scanning the year. It keeps the
+    windows that could still grow for free too, since a blackout date next to one stops it
+    from growing for that user.
+    """
+
+    __slots__ = ("periods", "maximal")
+
+    def __init__(self, year: int, holiday_dates: Iterable[date]):
+        calendar = year_calendar(year, holiday_dates, ())
+        windows = scan_windows(
+            calendar,
+            date(year, 1, 1),
+            date(year, 12, 31),
+            MAX_WINDOW_DAYS,
+            maximal_only=False,
+        )
+        self.periods = [_window_period(windows, row, calendar) for row in windows.by_efficiency()]
+        # Which windows are maximal for a user without blackout dates
+        closed = _closed_days(calendar)
+        first = calendar.first_ordinal
+        self.maximal = bytes(
+            closed[p.start - first] and closed[p.end - first + 2] for p in self.periods
+        )
+
+    def __len__(self) -> int:
+        return len(self.periods)
+
+    def select(
+        self, calendar: Calendar, earliest_end: date, max_days, no_single_days: bool = False
+    ) -> List[Period]:
+        """The periods :func:`scan_windows` finds on ``calendar``, this table's holidays
+        plus a user's blackout dates, in the same order."""
+        earliest = earliest_end.toordinal()
+        min_span = 1 if no_single_days else 0
+        blackouts = calendar.prefix[BLACKOUT]
+        if not blackouts[-1]:
+            return [
+                p
+                for p, maximal in zip(self.periods, self.maximal)
+                if maximal
+                and p.end >= earliest
+                and p.workdays <= max_days
+                and p.end - p.start >= min_span
+            ]
+
+        closed = _closed_days(calendar)
+        first = calendar.first_ordinal
+        return [
+            p
+            for p in self.periods
+            if p.end >= earliest
+            and p.workdays <= max_days
+            and p.end - p.start >= min_span
+            and closed[p.start - first]
+            and closed[p.end - first + 2]
+            and blackouts[p.end - first + 1] == blackouts[p.start - first]
+        ]
+
+
+def _closed_days(calendar: Calendar) -> List[bool]:
+    # closed[i + 1] says whether day i stops a window from growing for free; the days
+    # beyond the calendar do too
+    return [True] + [k == WORKDAY or k == BLACKOUT for k in calendar.kinds] + [True]
+
+
+@lru_cache(maxsize=32)
+def _candidate_table(year: int, holiday_dates: frozenset) -> CandidateTable:
+    return CandidateTable(year, holiday_dates)
+
+
+def candidate_table(year: int, holiday_dates: Iterable[date]) -> CandidateTable:
+    """Return the shared candidate table of ``year``'s holidays, building it on first use."""
+    return _candidate_table(year, frozenset(holiday_dates))
+
+
+def refresh_candidate_tables(calendars: Iterable[Tuple[int, Iterable[date]]]) -> None:
+    """Build the candidate tables of changed holiday calendars ahead of their requests."""
+    for year, holiday_dates in calendars:
+        candidate_table(year, holiday_dates)
+
+
 def generate_period(
     start_date,
     end_date,
@@ -137,6 +491,7 @@ def generate_period(
     available_days,
     no_single_days,
     skip_date_check=False,
+    calendar=None,
 ):
     periods = []
 
@@ -154,32 +509,10 @@ def generate_period(
     if no_single_days and (end_date - start_date).days < 1:
         return periods
 
-    # Calculate workdays, holidays, and weekends
-    workdays = 0
-    holidays_count = 0
-    weekends = 0
-    dates = []
-
-    current_date = start_date
-    while current_date <= end_date:
-        dates.append(current_date)
-
-        # Skip blackout dates
-        if current_date in blackout_dates:
-            current_date += timedelta(days=1)
-            continue
-
-        # Check if weekend
-        if current_date.weekday() >= 5:  # 5=Saturday, 6=Sunday
-            weekends += 1
-        # Check if holiday
-        elif current_date in holiday_dates:
-            holidays_count += 1
-        # Otherwise it's a workday
-        else:
-            workdays += 1
-
-        current_date += timedelta(days=1)
+    # Count workdays, holidays and weekends from the calendar's prefix sums
+    if calendar is None or not calendar.covers(start_date, end_date):
+        calendar = get_calendar(start_date.year, end_date.year, holiday_dates, blackout_dates)
+    workdays, weekends, holidays_count = calendar.counts(start_date, end_date)
 
     # Skip if no workdays (nothing to take off)
     if workdays == 0:
@@ -189,34 +522,25 @@ def generate_period(
     if workdays > available_days:
         return periods
 
-    # Calculate total days off (workdays + holidays + weekends)
-    total_days_off = workdays + holidays_count + weekends
-
-    # Create period object
-    period = {
-        "start_date": start_date,
-        "end_date": end_date,
-        "days_used": workdays,
-        "total_days_off": total_days_off,
-        "workdays": workdays,
-        "holidays": holidays_count,
-        "weekends": weekends,
-        "dates": dates,
-        "explanation": (
-            f"Take {workdays} days off to get {total_days_off} days away "
-            f"(includes {weekends} weekend days and {holidays_count} holidays)"
-        ),
-    }
-
+    period = Period(
+        start_date.toordinal(), end_date.toordinal(), workdays, weekends, holidays_count
+    )
     periods.append(period)
     return periods
 
 
-def regenerate_period(period, holiday_dates, blackout_dates):
+def regenerate_period(period, holiday_dates, blackout_dates, calendar=None):
     start = datetime.strptime(period["start"], "%Y-%m-%d").date()
     end = datetime.strptime(period["end"], "%Y-%m-%d").date()
     return generate_period(
-        start, end, holiday_dates, blackout_dates, float("inf"), False, skip_date_check=True
+        start,
+        end,
+        holiday_dates,
+        blackout_dates,
+        float("inf"),
+        False,
+        skip_date_check=True,
+        calendar=calendar,
     )[
         0
     ]  # No constraints for merging
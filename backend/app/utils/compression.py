@@ -0,0 +1,115 @@
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .settings import bool_setting, int_setting
+
+try:
+    import brotli
+except ImportError:  # Optional; without it responses are only gzipped
+    brotli = None
+
+# Compress response bodies of at least this many bytes; smaller ones gain too little
+COMPRESSION = bool_setting("COMPRESSION", True)
+COMPRESSION_MIN_SIZE = int_setting("COMPRESSION_MIN_SIZE", 1024, 0)
+
+# Cheap settings suited to compressing every response on the fly
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    codings = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        codings[coding.strip().lower()] = quality
+    return codings
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """The coding to compress with: brotli when installed and accepted, else gzip."""
+    codings = _accepted(accept_encoding)
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        if codings.get(coding, codings.get("*", 0.0)) > 0:
+            return coding
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies with brotli or gzip.
+
+    Only whole bodies of at least ``minimum_size`` bytes are compressed. Streamed responses
+    (such as NDJSON plan updates) pass through as they are produced, so clients keep seeing
+    each line as soon as it is ready. Every response that could be compressed, and every
+    304, varies on Accept-Encoding, and clients accepting compression get weak ETags: the
+    compressed bytes differ from the uncompressed representation's, and a 304 has to
+    answer with the same ETag as the 200 it revalidates.
+    """
+
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the first body part shows whether to compress
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            headers = MutableHeaders(scope=held)
+            not_modified = held["status"] == 304
+            if not not_modified and (
+                "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+            ):
+                await send(held)
+                await send(message)
+                return
+            headers.add_vary_header("Accept-Encoding")
+            if encoding is not None:
+                etag = headers.get("etag")
+                if etag is not None and not etag.startswith("W/"):
+                    headers["ETag"] = f"W/{etag}"
+            body = message.get("body", b"")
+            if (
+                encoding is None
+                or not_modified
+                or message.get("more_body", False)
+                or len(body) < self.minimum_size
+            ):
+                await send(held)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            await send(held)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
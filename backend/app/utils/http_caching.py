@@ -0,0 +1,31 @@
+import hashlib
+from typing import Optional
+
+from fastapi import Request, Response
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag of a response body: equal bodies, and only those, share one."""
+    return f'"{hashlib.sha256(body).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header lists ``etag``.
+
+    If-None-Match uses the weak comparison, so a ``W/`` prefix is ignored.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(",")
+    )
+
+
+def conditional_response(request: Request, body: bytes, etag: str, cache_control: str) -> Response:
+    """The JSON ``body``, or 304 Not Modified when the client already holds it."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
@@ -0,0 +1,35 @@
+from bisect import bisect_right
+from typing import Iterator, List, Tuple
+
+
+class IntervalSet:
+    """Sorted set of disjoint, inclusive integer intervals (e.g. date ordinals).
+
+    Overlap checks are a binary search on the interval starts, so testing a candidate
+    against the intervals already chosen costs O(log n) and allocates nothing.
+    """
+
+    __slots__ = ("_starts", "_ends")
+
+    def __init__(self):
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def __iter__(self) -> Iterator[Tuple[int, int]]:
+        return zip(self._starts, self._ends)
+
+    def overlaps(self, start: int, end: int) -> bool:
+        # Intervals are disjoint, so the one with the last start <= end also has the
+        # latest end among all intervals that start in time to overlap.
+        i = bisect_right(self._starts, end)
+        return i > 0 and self._ends[i - 1] >= start
+
+    def add(self, start: int, end: int) -> None:
+        if self.overlaps(start, end):
+            raise ValueError(f"Interval [{start}, {end}] overlaps an existing interval")
+        i = bisect_right(self._starts, start)
+        self._starts.insert(i, start)
+        self._ends.insert(i, end)
@@ -0,0 +1,243 @@
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi.concurrency import run_in_threadpool
+
+from .settings import bool_setting, choice_setting, float_setting
+
+# (leaf file name, function) of frames where a thread is idle rather than working
+_IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of every other thread at a fixed interval.
+
+    Unlike cProfile, which only sees the thread it was enabled on, this also catches work
+    the request hands to the thread pool (such as the optimizer). Samples cover the whole
+    process, so work from concurrent requests shows up too.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+class RouteProfile:
+    """Samples and request timings aggregated over every profiled request of one route."""
+
+    def __init__(self):
+        self.stacks: Counter = Counter()
+        self.requests = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def add(self, stacks: Counter, seconds: float) -> None:
+        self.stacks.update(stacks)
+        self.requests += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed stack format, for flamegraph.pl or speedscope."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self.stacks.items())
+
+    def speedscope(self, name: str, interval: float) -> Dict:
+        frames: Dict[str, int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * interval * 1000)
+        return {
+            "$schema": SPEEDSCOPE_SCHEMA,
+            "shared": {"frames": [{"name": frame} for frame in frames]},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": name,
+                    "unit": "milliseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": samples,
+                    "weights": weights,
+                }
+            ],
+        }
+
+
+class RequestProfiler:
+    """Decides which requests to profile and writes per-route profiles to ``directory``.
+
+    Each route gets one file, rewritten after every profiled request, holding the samples
+    of all its profiled requests so far; ``index.json`` lists request counts and timings.
+    Only one request is profiled at a time, since samples cover the whole process.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        sample_rate: float = 0.0,
+        header: str = "x-profile",
+        interval: float = 0.005,
+        output_format: str = "collapsed",
+        rng: Optional[random.Random] = None,
+    ):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.header = header.lower().encode()
+        self.interval = interval
+        self.output_format = output_format
+        self.routes: Dict[str, RouteProfile] = {}
+        self._random = rng or random.Random()
+        self._busy = threading.Lock()
+        self._write_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> Optional["RequestProfiler"]:
+        """Build the profiler from the environment, or return None when profiling is off."""
+        if not bool_setting("PROFILING", False):
+            return None
+        sample_rate = float_setting("PROFILE_SAMPLE_RATE", 0.0, 0.0)
+        if sample_rate > 1:
+            raise RuntimeError(f"PROFILE_SAMPLE_RATE must be at most 1, got {sample_rate}")
+        return cls(
+            directory=os.environ.get("PROFILE_DIR", "./profiles"),
+            sample_rate=sample_rate,
+            header=os.environ.get("PROFILE_HEADER", "X-Profile"),
+            interval=float_setting("PROFILE_INTERVAL_MS", 5.0, 0.1) / 1000,
+            output_format=choice_setting(
+                "PROFILE_FORMAT", "collapsed", ("collapsed", "speedscope")
+            ),
+        )
+
+    def wants(self, scope) -> bool:
+        for name, value in scope.get("headers", ()):
+            if name == self.header:
+                return value.lower() in (b"1", b"true", b"yes")
+        return self.sample_rate > 0 and self._random.random() < self.sample_rate
+
+    def start(self) -> Optional[StackSampler]:
+        """Start sampling, or return None if another request is being profiled."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        sampler = StackSampler(self.interval)
+        sampler.start()
+        return sampler
+
+    def finish(self, sampler: StackSampler, scope, seconds: float) -> None:
+        try:
+            stacks = sampler.stop()
+        finally:
+            self._busy.release()
+        route = scope.get("route")
+        name = f"{scope['method']} {getattr(route, 'path', scope['path'])}"
+        with self._write_lock:
+            profile = self.routes.setdefault(name, RouteProfile())
+            profile.add(stacks, seconds)
+            self._write(name, profile)
+
+    def _file_name(self, name: str) -> str:
+        slug = re.sub(r"[^A-Za-z0-9-]+", "_", name).strip("_")
+        return (
+            f"{slug}.speedscope.json" if self.output_format == "speedscope" else f"{slug}.collapsed"
+        )
+
+    def _write(self, name: str, profile: RouteProfile) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        if self.output_format == "speedscope":
+            content = json.dumps(profile.speedscope(name, self.interval))
+        else:
+            content = profile.collapsed()
+        _replace(os.path.join(self.directory, self._file_name(name)), content)
+
+        index = {
+            route: {
+                "file": self._file_name(route),
+                "requests": p.requests,
+                "samples": sum(p.stacks.values()),
+                "mean_ms": p.total_seconds / p.requests * 1000,
+                "max_ms": p.max_seconds * 1000,
+            }
+            for route, p in self.routes.items()
+        }
+        _replace(os.path.join(self.directory, "index.json"), json.dumps(index, indent=2))
+
+
+def _replace(path: str, content: str) -> None:
+    # Write then rename so a reader never sees a half-written profile
+    partial = f"{path}.tmp"
+    with open(partial, "w") as f:
+        f.write(content)
+    os.replace(partial, path)
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling sampled requests, or those sending the profile header.
+
+    The profile spans the whole response, including streamed bodies. Stopping the sampler
+    and writing the profile happen in the thread pool, so they never stall the event loop.
+    """
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.wants(scope):
+            await self.app(scope, receive, send)
+            return
+        sampler = self.profiler.start()
+        if sampler is None:
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await run_in_threadpool(
+                self.profiler.finish, sampler, scope, time.perf_counter() - started
+            )
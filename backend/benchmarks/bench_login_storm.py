@@ -0,0 +1,166 @@
+"""Login storm benchmark: login throughput and other routes' latency during a burst of logins.
+
+Runs the app in-process (via httpx's ASGI transport, on a throwaway SQLite database) with
+``--logins`` clients logging in back to back while ``--requests`` clients keep fetching
+uncached suggestions. Run from the backend directory:
+
+    python -m benchmarks.bench_login_storm --rounds 12 --hash-workers 2
+    python -m benchmarks.bench_login_storm --rounds 12 --shared-threadpool
+
+``--shared-threadpool`` hashes on the app's shared thread pool, as before hashing got its
+own executor, for comparison. Logins the hasher turns away (503) are counted separately.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from typing import List
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.models.database import Base, get_async_db
+from app.models.holiday import Holiday
+from app.models.policy import Policy
+from app.models.time_budget import TimeBudget
+from app.models.user import User
+from app.routes import auth
+from app.services.password_hasher import PasswordHasher
+from app.services.suggestion_cache import suggestion_cache
+
+YEAR = date.today().year + 1
+PASSWORD = "storm-password"
+
+
+def setup_database(path: str, hasher: PasswordHasher, logins: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    password_hash = hasher.context.hash(PASSWORD)
+    with sessionmaker(bind=engine)() as db:
+        planner = User(email="planner@example.com", password_hash=password_hash)
+        db.add(planner)
+        db.add_all(
+            User(email=f"user{i}@example.com", password_hash=password_hash) for i in range(logins)
+        )
+        db.flush()
+        db.add(Policy(user_id=planner.id, max_days=30, blackout_dates=[]))
+        db.add(TimeBudget(user_id=planner.id, accrued_days=20, used_days=0))
+        db.add_all(
+            Holiday(date=d, name="Holiday", year=YEAR, country="US", type="public")
+            for d in (date(YEAR, 5, 25), date(YEAR, 7, 3), date(YEAR, 12, 25))
+        )
+        db.commit()
+    engine.dispose()
+
+
+async def login_loop(client, index: int, deadline: float, latencies: List[float], rejected):
+    form = {"username": f"user{index}@example.com", "password": PASSWORD}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post("/api/auth/token", data=form)
+        if response.status_code == 503:
+            rejected.append(1)
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+            continue
+        assert response.status_code == 200, response.text
+        latencies.append(time.perf_counter() - started)
+
+
+async def request_loop(client, deadline: float, latencies: List[float]):
+    while time.perf_counter() < deadline:
+        suggestion_cache.clear()
+        started = time.perf_counter()
+        response = await client.get(f"/api/suggestions?user_id=1&year={YEAR}")
+        assert response.status_code == 200, response.text
+        latencies.append(time.perf_counter() - started)
+
+
+async def storm(logins: int, requests: int, duration: float):
+    login_latencies, request_latencies, rejected = [], [], []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        await client.get(f"/api/suggestions?user_id=1&year={YEAR}")  # Warm up
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(login_loop(client, i, deadline, login_latencies, rejected) for i in range(logins)),
+            *(request_loop(client, deadline, request_latencies) for _ in range(requests)),
+        )
+    return login_latencies, request_latencies, len(rejected)
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def report(label: str, latencies: List[float], duration: float) -> None:
+    if not latencies:
+        print(f"{label:<12} no requests completed")
+        return
+    latencies = sorted(latencies)
+    print(
+        f"{label:<12} {len(latencies) / duration:7.1f} req/s  "
+        f"mean {statistics.mean(latencies) * 1000:7.1f} ms  "
+        f"p50 {percentile(latencies, 0.50) * 1000:7.1f} ms  "
+        f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+    )
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50, help="clients logging in")
+    parser.add_argument("--requests", type=int, default=2, help="clients fetching suggestions")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run")
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt work factor")
+    parser.add_argument("--hash-workers", type=int, default=2, help="hashing threads")
+    parser.add_argument("--hash-queue-depth", type=int, default=16, help="hashes that may wait")
+    parser.add_argument(
+        "--shared-threadpool",
+        action="store_true",
+        help="hash on the app's shared thread pool instead of the dedicated executor",
+    )
+    args = parser.parse_args(argv)
+
+    hasher = PasswordHasher(args.rounds, args.hash_workers, args.hash_queue_depth)
+    if args.shared_threadpool:
+        hasher._run = lambda fn, *fn_args: run_in_threadpool(fn, *fn_args)
+    auth.password_hasher = hasher
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.db")
+        setup_database(path, hasher, args.logins)
+        async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+        sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+        async def override_get_async_db():
+            async with sessions() as db:
+                yield db
+
+        app.dependency_overrides[get_async_db] = override_get_async_db
+        try:
+            logins, requests, rejected = asyncio.run(
+                storm(args.logins, args.requests, args.duration)
+            )
+        finally:
+            app.dependency_overrides.clear()
+            hasher.shutdown()
+            asyncio.run(async_engine.dispose())
+
+    mode = "shared thread pool" if args.shared_threadpool else f"{args.hash_workers} hash workers"
+    print(f"bcrypt rounds {args.rounds}, {mode}, {args.logins} login clients, {args.duration}s")
+    report("logins", logins, args.duration)
+    report("suggestions", requests, args.duration)
+    print(f"rejected     {rejected} logins (503)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
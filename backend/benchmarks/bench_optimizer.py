@@ -0,0 +1,351 @@
+"""Optimizer benchmark suite on synthetic calendars, with JSON baselines.
+
+Covers ``generate_period``, the optimizer's greedy and ``max_vacations`` modes, 18-month
+horizons and the full ``GET /api/suggestions`` route (via TestClient, on a throwaway SQLite
+database) across 10-200 holidays, large blackout lists and budgets of 5-60 days. Run from
+the backend directory:
+
+    python -m benchmarks.bench_optimizer run --output benchmarks/baselines/main.json
+    # ... change the code ...
+    python -m benchmarks.bench_optimizer run --output /tmp/current.json
+    python -m benchmarks.bench_optimizer compare benchmarks/baselines/main.json /tmp/current.json
+
+``compare`` exits with status 1 when any case got slower or allocates more than the
+tolerances allow. Timings only compare within one machine, so record the baseline on the
+machine that runs the comparison.
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from contextlib import ExitStack
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, NamedTuple
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.main import app
+from app.models.database import Base, get_async_db
+from app.models.holiday import Holiday
+from app.models.policy import Policy
+from app.models.time_budget import TimeBudget
+from app.models.user import User
+from app.services.calendar import year_calendar
+from app.services.horizon_optimizer import Horizon, HorizonBudget, plan_horizon
+from app.services.suggestion_cache import suggestion_cache
+from app.services.vacation_optimizer import generate_period, plan_vacation
+
+# Plan for next year so no window is skipped as being in the past
+YEAR = date.today().year + 1
+SEED = 2025
+
+HOLIDAY_COUNTS = (10, 50, 200)
+BLACKOUT_COUNTS = (0, 100)
+BUDGETS = (5, 20, 60)
+# (budget, max_vacations) pairs for the exact search
+MAX_VACATION_CASES = ((5, 2), (20, 5), (60, 10))
+
+# Months planned by the horizon cases, starting mid-year to span a New Year
+HORIZON_MONTHS = 18
+
+# Each timing sample runs the case for at least this long
+MIN_SAMPLE_SECONDS = 0.05
+
+
+class Case(NamedTuple):
+    name: str
+    # Does the untimed setup and returns the function to time
+    make: Callable[[ExitStack], Callable[[], object]]
+
+
+def synthetic_dates(count: int, seed: int) -> List[date]:
+    """``count`` distinct random dates in YEAR, the same ones for the same seed."""
+    first = date(YEAR, 1, 1)
+    days = (date(YEAR, 12, 31) - first).days + 1
+    return sorted(first + timedelta(days=d) for d in random.Random(seed).sample(range(days), count))
+
+
+def _inputs(holidays: int, blackouts: int):
+    holiday_dates = synthetic_dates(holidays, SEED)
+    blackout_dates = set(synthetic_dates(blackouts, SEED + 1)) - set(holiday_dates)
+    return holiday_dates, blackout_dates
+
+
+def _generate_period_case(holidays: int, blackouts: int) -> Case:
+    def make(stack):
+        holiday_dates, blackout_dates = _inputs(holidays, blackouts)
+        calendar = year_calendar(YEAR, holiday_dates, blackout_dates)
+        windows = [
+            (date(YEAR, 1, 1) + timedelta(days=offset), length)
+            for offset in range(0, 365, 7)
+            for length in range(16)
+        ]
+
+        def run():
+            for start, length in windows:
+                generate_period(
+                    start,
+                    start + timedelta(days=length),
+                    holiday_dates,
+                    blackout_dates,
+                    20,
+                    False,
+                    calendar=calendar,
+                )
+
+        return run
+
+    return Case(f"generate_period[holidays={holidays},blackouts={blackouts}]", make)
+
+
+def _plan_case(holidays: int, blackouts: int, budget: int, max_vacations=None) -> Case:
+    def make(stack):
+        holiday_dates, blackout_dates = _inputs(holidays, blackouts)
+        return lambda: plan_vacation(
+            YEAR, holiday_dates, blackout_dates, budget, max_vacations=max_vacations
+        )
+
+    mode = "greedy" if max_vacations is None else f"max_vacations={max_vacations}"
+    return Case(
+        f"plan_vacation[{mode},holidays={holidays},blackouts={blackouts},budget={budget}]", make
+    )
+
+
+def _horizon_case(holidays: int, budget: int, max_vacations=None) -> Case:
+    def make(stack):
+        # The same synthetic dates a year later, give or take a day
+        holiday_dates, _ = _inputs(holidays, 0)
+        holiday_dates += sorted({d + timedelta(days=365) for d in holiday_dates})
+        horizon = Horizon.of_months(date(YEAR, 7, 1), HORIZON_MONTHS)
+        horizon_budget = HorizonBudget(budget, budget, budget * 3 // 2)
+        return lambda: plan_horizon(
+            horizon, holiday_dates, set(), horizon_budget, max_vacations=max_vacations
+        )
+
+    mode = "greedy" if max_vacations is None else f"max_vacations={max_vacations}"
+    return Case(
+        f"plan_horizon[{mode},months={HORIZON_MONTHS},holidays={holidays},budget={budget}]", make
+    )
+
+
+def _route_client(stack: ExitStack, holidays: int, blackouts: int, budget: int):
+    """Start the app on a throwaway SQLite database holding one user; return the client."""
+    path = os.path.join(stack.enter_context(tempfile.TemporaryDirectory()), "bench.db")
+    engine = create_engine(f"sqlite:///{path}")
+    stack.callback(engine.dispose)
+    Base.metadata.create_all(bind=engine)
+
+    holiday_dates, blackout_dates = _inputs(holidays, blackouts)
+    with sessionmaker(bind=engine)() as db:
+        user = User(email="bench@example.com", password_hash="unused")
+        db.add(user)
+        db.flush()
+        db.add(
+            Policy(
+                user_id=user.id,
+                max_days=60,
+                blackout_dates=[d.isoformat() for d in sorted(blackout_dates)],
+            )
+        )
+        db.add(TimeBudget(user_id=user.id, accrued_days=budget, used_days=0))
+        db.add_all(
+            Holiday(date=d, name=f"Holiday {i}", year=YEAR, country="US", type="public")
+            for i, d in enumerate(holiday_dates)
+        )
+        db.commit()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{path}", poolclass=NullPool)
+    sessions = async_sessionmaker(async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with sessions() as db:
+            yield db
+
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    stack.callback(app.dependency_overrides.clear)
+    return stack.enter_context(TestClient(app))
+
+
+def _route_case(holidays: int, blackouts: int, budget: int, max_vacations=None, cached=False):
+    def make(stack):
+        client = _route_client(stack, holidays, blackouts, budget)
+        url = f"/api/suggestions?user_id=1&year={YEAR}"
+        if max_vacations is not None:
+            url += f"&max_vacations={max_vacations}"
+
+        def run():
+            if not cached:
+                suggestion_cache.clear()
+            response = client.get(url)
+            assert response.status_code == 200, response.text
+
+        return run
+
+    mode = "greedy" if max_vacations is None else f"max_vacations={max_vacations}"
+    if cached:
+        mode += ",cached"
+    return Case(
+        f"route_suggestions[{mode},holidays={holidays},blackouts={blackouts},budget={budget}]",
+        make,
+    )
+
+
+def all_cases() -> List[Case]:
+    cases = [
+        _generate_period_case(holidays, blackouts)
+        for holidays in (10, 200)
+        for blackouts in BLACKOUT_COUNTS
+    ]
+    cases += [
+        _plan_case(holidays, blackouts, budget)
+        for holidays in HOLIDAY_COUNTS
+        for blackouts in BLACKOUT_COUNTS
+        for budget in BUDGETS
+    ]
+    cases += [
+        _plan_case(holidays, 0, budget, max_vacations)
+        for holidays in (10, 200)
+        for budget, max_vacations in MAX_VACATION_CASES
+    ]
+    cases += [
+        _horizon_case(50, budget, max_vacations)
+        for budget, max_vacations in ((20, None),) + MAX_VACATION_CASES[1:]
+    ]
+    cases += [
+        _route_case(50, 100, 20),
+        _route_case(50, 100, 20, max_vacations=5),
+        _route_case(50, 100, 20, cached=True),
+    ]
+    return cases
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict:
+    """Time ``fn`` in ``repeat`` samples and record the peak memory of one call."""
+    started = time.perf_counter()
+    fn()  # Warm up caches, as a long-running server would be
+    single = max(time.perf_counter() - started, 1e-6)
+    number = max(1, min(1000, int(MIN_SAMPLE_SECONDS / single)))
+    samples = [t / number for t in timeit.repeat(fn, number=number, repeat=repeat)]
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "median_ms": statistics.median(samples) * 1000,
+        "min_ms": min(samples) * 1000,
+        "peak_kib": peak / 1024,
+        "calls": number * repeat,
+    }
+
+
+def run(args) -> int:
+    results = {}
+    for case in all_cases():
+        if args.filter and args.filter not in case.name:
+            continue
+        with ExitStack() as stack:
+            results[case.name] = measure(case.make(stack), args.repeat)
+        result = results[case.name]
+        print(
+            f"{case.name:<78} {result['median_ms']:9.3f} ms  {result['peak_kib']:9.1f} KiB",
+            flush=True,
+        )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.platform(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "year": YEAR,
+        },
+        "cases": results,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Wrote {len(results)} results to {args.output}")
+    return 0
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f:
+        baseline = json.load(f)["cases"]
+    with open(args.current) as f:
+        current = json.load(f)["cases"]
+
+    regressions = 0
+    for name in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[name], current[name]
+        problems = []
+        # Ignore differences too small to measure reliably
+        slower = after["median_ms"] - before["median_ms"]
+        if slower > args.min_ms and slower > before["median_ms"] * args.latency_tolerance:
+            problems.append(f"latency {before['median_ms']:.3f} -> {after['median_ms']:.3f} ms")
+        grown = after["peak_kib"] - before["peak_kib"]
+        if grown > args.min_kib and grown > before["peak_kib"] * args.memory_tolerance:
+            problems.append(f"memory {before['peak_kib']:.1f} -> {after['peak_kib']:.1f} KiB")
+        status = "REGRESSED " + ", ".join(problems) if problems else "ok"
+        regressions += bool(problems)
+        print(f"{name:<78} {status}")
+
+    for name in sorted(baseline.keys() - current.keys()):
+        print(f"{name:<78} missing from current run")
+    for name in sorted(current.keys() - baseline.keys()):
+        print(f"{name:<78} new, no baseline")
+
+    if regressions:
+        print(f"{regressions} case(s) regressed")
+        return 1
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="run the benchmarks")
+    run_parser.add_argument("--output", help="write results to this JSON file")
+    run_parser.add_argument("--filter", help="only run cases whose name contains this")
+    run_parser.add_argument("--repeat", type=int, default=5, help="timing samples per case")
+    run_parser.set_defaults(handler=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument(
+        "--latency-tolerance", type=float, default=0.25, help="allowed slowdown (0.25 = 25%%)"
+    )
+    compare_parser.add_argument(
+        "--memory-tolerance", type=float, default=0.10, help="allowed peak memory growth"
+    )
+    compare_parser.add_argument(
+        "--min-ms", type=float, default=0.05, help="ignore slowdowns smaller than this"
+    )
+    compare_parser.add_argument(
+        "--min-kib", type=float, default=16.0, help="ignore memory growth smaller than this"
+    )
+    compare_parser.set_defaults(handler=compare)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+"""Microbenchmark: greedy schedule assembly with date sets vs. an IntervalSet.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_overlap
+"""
+import random
+import timeit
+from datetime import date
+
+from app.utils.intervals import IntervalSet
+
+FIRST_ORDINAL = date(2025, 1, 1).toordinal()
+
+
+def make_candidates(count, seed=0):
+    rng = random.Random(seed)
+    span = max(365, count // 3)
+    candidates = []
+    for _ in range(count):
+        start = FIRST_ORDINAL + rng.randrange(span)
+        candidates.append((start, start + rng.randrange(1, 16)))
+    return candidates
+
+
+def assemble_with_sets(candidates):
+    used_dates = set()
+    schedule = []
+    for start, end in candidates:
+        p_dates = set(range(start, end + 1))
+        if any(d in used_dates for d in p_dates):
+            continue
+        schedule.append((start, end))
+        used_dates.update(p_dates)
+    return schedule
+
+
+def assemble_with_intervals(candidates):
+    taken = IntervalSet()
+    schedule = []
+    for start, end in candidates:
+        if taken.overlaps(start, end):
+            continue
+        schedule.append((start, end))
+        taken.add(start, end)
+    return schedule
+
+
+def main():
+    for count in (1_000, 10_000):
+        candidates = make_candidates(count)
+        assert assemble_with_sets(candidates) == assemble_with_intervals(candidates)
+        for name, fn in (("sets", assemble_with_sets), ("intervals", assemble_with_intervals)):
+            runs = 20
+            seconds = min(timeit.repeat(lambda: fn(candidates), number=runs, repeat=3)) / runs
+            print(f"{count:>6} candidates  {name:<9}  {seconds * 1000:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
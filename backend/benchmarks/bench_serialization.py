@@ -0,0 +1,101 @@
+"""Serialization benchmark: response rendering time and bytes on the wire for large schedules.
+
+Compares the stdlib JSON path (jsonable_encoder + json) with orjson for suggestion results,
+and the saved plan response paths, then reports response sizes uncompressed, gzipped and
+(when installed) brotli-compressed at the middleware's settings. Run from the backend
+directory:
+
+    python -m benchmarks.bench_serialization
+"""
+
+import timeit
+from datetime import date, datetime, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from app.models.saved_plan import SavedPlan
+from app.routes.saved_plans import SavedPlanResponse
+from app.services.vacation_optimizer import best_plan
+from app.utils import compression
+
+YEAR = date.today().year + 1
+HOLIDAYS = [(1, 1), (5, 25), (7, 3), (9, 7), (11, 26), (12, 25)]
+
+
+def make_result(periods):
+    """An optimizer result whose schedule gathers ``periods`` periods of real plans.
+
+    The periods come from plans for successive years and budgets, so they differ the way
+    stored schedules do and compress no better than real ones.
+    """
+    result, schedule = None, []
+    for i in range(periods):
+        year = YEAR + i
+        holidays = [date(year, month, day) for month, day in HOLIDAYS]
+        result = best_plan(year, holidays, [], 10 + i % 30).result
+        schedule.extend(result["schedule"])
+        if len(schedule) >= periods:
+            break
+    return {**result, "schedule": schedule[:periods]}
+
+
+def make_plan(result):
+    return SavedPlan(
+        id=1,
+        name="Benchmark",
+        user_id=1,
+        year=YEAR,
+        schedule=result,
+        is_public=1,
+        share_token="token",
+        created_at=datetime.now(timezone.utc),
+        updated_at=datetime.now(timezone.utc),
+    )
+
+
+def timed(fn, runs):
+    return min(timeit.repeat(fn, number=runs, repeat=3)) / runs
+
+
+def main():
+    encodings = ["gzip"] + (["br"] if compression.brotli is not None else [])
+    for periods in (10, 100, 1_000):
+        result = make_result(periods)
+        plan = make_plan(result)
+        runs = max(10, 20_000 // periods)
+        paths = (
+            ("suggestions  stdlib", lambda: JSONResponse(jsonable_encoder(result)).body),
+            ("suggestions  orjson", lambda: ORJSONResponse(result).body),
+            (
+                "saved plan   stdlib",
+                lambda: JSONResponse(
+                    SavedPlanResponse.model_validate(plan).model_dump(mode="json")
+                ).body,
+            ),
+            (
+                "saved plan   orjson",
+                lambda: ORJSONResponse(
+                    SavedPlanResponse.model_validate(plan).model_dump(mode="json")
+                ).body,
+            ),
+            (
+                "saved plan   pydantic",
+                lambda: SavedPlanResponse.model_validate(plan).model_dump_json().encode(),
+            ),
+        )
+        print(f"{periods} periods")
+        for name, fn in paths:
+            print(f"  {name:<22} {timed(fn, runs) * 1000:8.3f} ms")
+
+        body = ORJSONResponse(result).body
+        sizes = [f"raw {len(body):>9,} B"]
+        for encoding in encodings:
+            seconds = timed(lambda: compression.compress(body, encoding), runs)
+            compressed = compression.compress(body, encoding)
+            sizes.append(f"{encoding} {len(compressed):>8,} B ({seconds * 1000:.3f} ms)")
+        print("  bytes on the wire      " + "  ".join(sizes))
+
+
+if __name__ == "__main__":
+    main()
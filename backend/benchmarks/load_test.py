@@ -0,0 +1,64 @@
+"""Closed-loop HTTP load test for a running API server.
+
+Start the server first (e.g. ``uvicorn app.main:app --workers 1``), then run from the
+backend directory:
+
+    python -m benchmarks.load_test --url "http://localhost:8000/api/suggestions?user_id=1"
+
+Each of ``--concurrency`` clients sends requests back to back for ``--duration`` seconds;
+the script reports throughput and latency percentiles.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def worker(client, url, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        try:
+            response = await client.get(url)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+        except httpx.HTTPError as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - started)
+
+
+async def run(url, concurrency, duration):
+    latencies, errors = [], []
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        await client.get(url)  # Warm up
+        deadline = time.perf_counter() + duration
+        await asyncio.gather(
+            *(worker(client, url, deadline, latencies, errors) for _ in range(concurrency))
+        )
+    return latencies, errors
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", required=True)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args()
+
+    latencies, errors = asyncio.run(run(args.url, args.concurrency, args.duration))
+    latencies.sort()
+    print(f"requests:   {len(latencies)} ({len(errors)} errors)")
+    print(f"throughput: {len(latencies) / args.duration:.1f} req/s")
+    print(f"latency:    mean {statistics.mean(latencies) * 1000:.1f} ms, "
+          f"p50 {percentile(latencies, 0.50) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
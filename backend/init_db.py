@@ -1,4 +1,4 @@
-from app.models.database import init_db, Base, engine
+from app.models.database import init_db
 # Import all models to ensure they are registered with SQLAlchemy
 from app.models.user import User
 from app.models.time_budget import TimeBudget
@@ -7,6 +7,6 @@ from app.models.saved_plan import SavedPlan
 from app.models.policy import Policy
 
 if __name__ == "__main__":
-    # Create all tables
-    Base.metadata.create_all(bind=engine)
+    # Create all tables and any missing indexes
+    init_db()
     print("Database tables created successfully!")
@@ -0,0 +1,131 @@
+"""Bulk import public holidays from the ``holidays`` package.
+
+Generates the holidays of many countries and years in one run, countries in parallel
+worker processes, and upserts them keyed on (date, country, employer), so re-running an
+import renames existing holidays instead of duplicating them. Run from the backend
+directory:
+
+    python -m scripts.import_holidays --countries US,GB,DE --years 2025-2027
+    python -m scripts.import_holidays --countries all --years 2026
+
+Holidays stored before (date, country, employer) was unique may repeat it; the import
+stops and reports them unless ``--dedupe`` is given, which keeps the first of each and
+deletes the rest.
+
+Running servers pick the new holidays up once their holiday store entries expire
+(``HOLIDAY_STORE_TTL``).
+"""
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import List
+
+from sqlalchemy import create_engine
+
+from app.models.database import DATABASE_URL
+from app.services.holiday_import import (
+    DuplicateHolidays,
+    country_holiday_rows,
+    prepare_holidays_table,
+    supported_countries,
+    upsert_holidays,
+)
+
+
+def parse_years(value: str) -> List[int]:
+    """Parse ``2025``, ``2025,2027`` or ``2025-2027`` into a list of years."""
+    years = []
+    for part in value.split(","):
+        first, _, last = part.partition("-")
+        years.extend(range(int(first), int(last or first) + 1))
+    return sorted(set(years))
+
+
+def parse_countries(value: str) -> List[str]:
+    supported = supported_countries()
+    if value.lower() == "all":
+        return supported
+    countries = [code.strip().upper() for code in value.split(",") if code.strip()]
+    unknown = sorted(set(countries) - set(supported))
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unsupported countries: {', '.join(unknown)}")
+    return countries
+
+
+def import_holidays(
+    engine, countries: List[str], years: List[int], workers: int, dedupe: bool = False
+) -> int:
+    """Import the holidays of ``countries`` in ``years`` and return the rows written."""
+    started = time.perf_counter()
+    removed = prepare_holidays_table(engine, dedupe)
+    if dedupe:
+        print(f"Removed {removed} duplicate holidays")
+
+    total = 0
+    write_seconds = 0.0
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(country_holiday_rows, country, years): country for country in countries
+        }
+        # Writes stay in this process, one transaction per country as each one is ready
+        for future in as_completed(futures):
+            rows = future.result()
+            write_started = time.perf_counter()
+            with engine.begin() as connection:
+                written = upsert_holidays(connection, rows)
+            write_seconds += time.perf_counter() - write_started
+            total += written
+            print(f"{futures[future]:<4} {written:6d} holidays", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"Imported {total} holidays for {len(countries)} countries and {len(years)} years "
+        f"in {elapsed:.2f}s ({total / elapsed:.0f} rows/s; "
+        f"writes {write_seconds:.2f}s, {total / max(write_seconds, 1e-9):.0f} rows/s)"
+    )
+    return total
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--countries",
+        type=parse_countries,
+        required=True,
+        help='comma-separated ISO 3166-1 alpha-2 codes, or "all"',
+    )
+    parser.add_argument(
+        "--years", type=parse_years, required=True, help="e.g. 2025, 2025,2027 or 2025-2027"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="processes generating holidays (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--database-url", default=DATABASE_URL, help="defaults to the app's database"
+    )
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="delete stored holidays repeating another's date, country and employer",
+    )
+    args = parser.parse_args(argv)
+
+    engine = create_engine(args.database_url)
+    try:
+        import_holidays(engine, args.countries, args.years, max(1, args.workers), args.dedupe)
+    except DuplicateHolidays as error:
+        print(f"{error}; re-run with --dedupe to keep the first of each", file=sys.stderr)
+        return 1
+    finally:
+        engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
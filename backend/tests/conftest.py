@@ -1,21 +1,35 @@
+import os
+import tempfile
+
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 from app.main import app
-from app.models.database import Base, get_db
+from app.models.database import Base, get_async_db, get_db
+from app.services.holiday_store import holiday_store
+from app.services.instrumentation import metrics
+from app.services.suggestion_cache import suggestion_cache
 
-# Create in-memory SQLite database for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
+# Use a throwaway SQLite file so the sync session the tests arrange data with and the
+# async sessions the routes use see the same database
+TEST_DB_PATH = os.path.join(tempfile.mkdtemp(), "test.db")
+SQLALCHEMY_DATABASE_URL = f"sqlite:///{TEST_DB_PATH}"
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# NullPool so no connection outlives a request and blocks drop_all between tests
+async_engine = create_async_engine(f"sqlite+aiosqlite:///{TEST_DB_PATH}", poolclass=NullPool)
+TestingAsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
 
 @pytest.fixture(scope="function")
 def db_session():
@@ -42,7 +56,18 @@ def client(db_session):
         finally:
             pass
 
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+
+    # Cached suggestions, holidays and metrics from one test's data must not leak into the
+    # next
+    suggestion_cache.clear()
+    holiday_store.clear()
+    metrics.reset()
 
     # Create a test client using the FastAPI app
     with TestClient(app) as test_client:
@@ -0,0 +1,308 @@
+# pytest is used implicitly by the fixtures
+from datetime import timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models.user import User
+from app.routes.auth import create_access_token
+from app.services.password_hasher import PasswordHasher, password_hasher
+
+SCHEDULE = {"schedule": [{"start": "2025-07-03", "end": "2025-07-06"}], "warning": None}
+
+
+def register_and_login(client: TestClient, email: str = "planner@example.com"):
+    response = client.post("/api/auth/register", json={"email": email, "password": "secret"})
+    assert response.status_code == 200
+
+    response = client.post("/api/auth/token", data={"username": email, "password": "secret"})
+    assert response.status_code == 200
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_auth_flow(client: TestClient, db_session: Session):
+    """Test registering, logging in and reading the current user."""
+    headers = register_and_login(client)
+
+    response = client.get("/api/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["email"] == "planner@example.com"
+
+    bad_login = {"username": "planner@example.com", "password": "wrong"}
+    assert client.post("/api/auth/token", data=bad_login).status_code == 401
+    assert client.get("/api/auth/me").status_code == 401
+
+
+def test_login_rehashes_with_the_configured_work_factor(client: TestClient, db_session: Session):
+    """Test that logging in upgrades a password hashed with another work factor."""
+    old_hash = PasswordHasher(rounds=4, workers=1, queue_depth=0).context.hash("secret")
+    db_session.add(User(email="legacy@example.com", password_hash=old_hash))
+    db_session.commit()
+
+    login = {"username": "legacy@example.com", "password": "secret"}
+    assert client.post("/api/auth/token", data=login).status_code == 200
+
+    db_session.expire_all()
+    user = db_session.query(User).filter(User.email == "legacy@example.com").one()
+    assert user.password_hash != old_hash
+    assert user.password_hash.startswith(f"$2b${password_hasher.rounds:02d}$")
+    assert client.post("/api/auth/token", data=login).status_code == 200
+
+
+def test_saved_plan_lifecycle(client: TestClient, db_session: Session):
+    """Test creating, listing, updating, sharing and deleting a saved plan."""
+    headers = register_and_login(client)
+    plan = {"name": "Summer", "year": 2025, "schedule": SCHEDULE}
+
+    response = client.post("/api/saved-plans/", json=plan, headers=headers)
+    assert response.status_code == 200
+    plan_id = response.json()["id"]
+
+    response = client.get("/api/saved-plans/", headers=headers)
+    assert [p["id"] for p in response.json()] == [plan_id]
+
+    plan["name"] = "Summer (final)"
+    response = client.put(f"/api/saved-plans/{plan_id}", json=plan, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Summer (final)"
+
+    # Private plans are hidden from anonymous users until shared
+    assert client.get(f"/api/saved-plans/{plan_id}").status_code == 403
+    share_token = client.post(f"/api/saved-plans/{plan_id}/share", headers=headers).json()[
+        "share_token"
+    ]
+    response = client.get(f"/api/saved-plans/shared/{share_token}")
+    assert response.status_code == 200
+    assert response.json()["schedule"] == SCHEDULE
+
+    assert client.delete(f"/api/saved-plans/{plan_id}", headers=headers).status_code == 204
+    assert client.get(f"/api/saved-plans/{plan_id}", headers=headers).status_code == 404
+
+
+def test_saved_plans_are_per_user(client: TestClient, db_session: Session):
+    """Test that users can't modify each other's plans."""
+    owner = register_and_login(client, "owner@example.com")
+    other = register_and_login(client, "other@example.com")
+    plan = {"name": "Mine", "year": 2025, "schedule": SCHEDULE}
+    plan_id = client.post("/api/saved-plans/", json=plan, headers=owner).json()["id"]
+
+    assert client.get("/api/saved-plans/", headers=other).json() == []
+    assert client.put(f"/api/saved-plans/{plan_id}", json=plan, headers=other).status_code == 403
+    assert client.delete(f"/api/saved-plans/{plan_id}", headers=other).status_code == 403
+
+
+def test_saved_plan_reads_resolve_the_user_from_the_token(client: TestClient, db_session: Session):
+    """Test that listing plans runs one query, with no lookup of the user."""
+    headers = register_and_login(client)
+    plan = {"name": "Summer", "year": 2025, "schedule": SCHEDULE}
+    assert client.post("/api/saved-plans/", json=plan, headers=headers).status_code == 200
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/api/saved-plans/", headers=headers)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert len(statements) == 1
+    assert "saved_plans" in statements[0]
+
+
+def test_logout_revokes_the_token(client: TestClient, db_session: Session):
+    """Test that a token stops working once logged out, and other tokens don't."""
+    headers = register_and_login(client)
+    other = client.post(
+        "/api/auth/token", data={"username": "planner@example.com", "password": "secret"}
+    ).json()["access_token"]
+
+    assert client.post("/api/auth/logout", headers=headers).status_code == 204
+
+    assert client.get("/api/auth/me", headers=headers).status_code == 401
+    assert client.get("/api/saved-plans/", headers=headers).status_code == 401
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {other}"})
+    assert response.status_code == 200
+
+
+def test_tokens_without_a_user_id_are_still_accepted(client: TestClient, db_session: Session):
+    """Test that tokens issued before they carried the user id resolve by email."""
+    register_and_login(client)
+    token = create_access_token({"sub": "planner@example.com"}, timedelta(minutes=5))
+
+    response = client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+
+    assert response.status_code == 200
+    assert response.json()["email"] == "planner@example.com"
+
+
+def test_saved_plans_list_in_pages(client: TestClient, db_session: Session):
+    """Test that the listing pages through plans by last modification, newest first."""
+    headers = register_and_login(client)
+    plan_ids = [
+        client.post(
+            "/api/saved-plans/",
+            json={"name": f"Plan {i}", "year": 2025, "schedule": SCHEDULE},
+            headers=headers,
+        ).json()["id"]
+        for i in range(5)
+    ]
+    # Editing a plan moves it to the front
+    edited = {"name": "Plan 1 (edited)", "year": 2025, "schedule": SCHEDULE}
+    assert (
+        client.put(f"/api/saved-plans/{plan_ids[1]}", json=edited, headers=headers).status_code
+        == 200
+    )
+
+    pages = []
+    url = "/api/saved-plans/?limit=2"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        pages.append([plan["id"] for plan in response.json()])
+        url = response.links.get("next", {}).get("url")
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert sum(pages, []) == [plan_ids[1], plan_ids[4], plan_ids[3], plan_ids[2], plan_ids[0]]
+
+
+def test_saved_plans_list_legacy_rows_in_pages(client: TestClient, db_session: Session):
+    """Test paging through plans saved before updated_at was set, with whole-second times."""
+    headers = register_and_login(client)
+    user = db_session.query(User).filter(User.email == "planner@example.com").one()
+    for i, created_at in enumerate(["2025-01-01 10:00:00"] * 3 + ["2025-01-02 09:00:00"]):
+        db_session.execute(
+            text(
+                "INSERT INTO saved_plans (name, user_id, year, schedule, created_at, is_public)"
+                " VALUES (:name, :user_id, 2025, '{}', :created_at, 0)"
+            ),
+            {"name": f"Legacy {i}", "user_id": user.id, "created_at": created_at},
+        )
+    db_session.commit()
+    new_id = client.post(
+        "/api/saved-plans/",
+        json={"name": "New", "year": 2025, "schedule": SCHEDULE},
+        headers=headers,
+    ).json()["id"]
+
+    listed = []
+    url = "/api/saved-plans/?limit=1&fields=name"
+    while url:
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        listed.extend(plan["id"] for plan in response.json())
+        url = response.links.get("next", {}).get("url")
+        assert len(listed) <= 5
+
+    # Newest first; the three saved in the same second by descending id
+    assert listed == [new_id, 4, 3, 2, 1]
+
+
+def test_saved_plans_summary_and_fields(client: TestClient, db_session: Session):
+    """Test that the summary view leaves out schedules and fields picks what's returned."""
+    headers = register_and_login(client)
+    plan = {"name": "Summer", "year": 2025, "schedule": SCHEDULE}
+    plan_id = client.post("/api/saved-plans/", json=plan, headers=headers).json()["id"]
+
+    (summary,) = client.get("/api/saved-plans/?view=summary", headers=headers).json()
+    assert "schedule" not in summary
+    assert summary["name"] == "Summer"
+    response = client.get(f"/api/saved-plans/{plan_id}", headers=headers)
+    assert response.json()["schedule"] == SCHEDULE
+
+    response = client.get("/api/saved-plans/?fields=name,year", headers=headers)
+    assert response.json() == [{"id": plan_id, "name": "Summer", "year": 2025}]
+
+    assert client.get("/api/saved-plans/?fields=name,owner", headers=headers).status_code == 400
+    assert client.get("/api/saved-plans/?cursor=not-a-cursor", headers=headers).status_code == 400
+
+
+def test_shared_plans_are_cached_and_revalidated(client: TestClient, db_session: Session):
+    """Test ETags, 304s and the shared plan cache, and that updates and deletes show."""
+    headers = register_and_login(client)
+    plan = {"name": "Summer", "year": 2025, "schedule": SCHEDULE}
+    plan_id = client.post("/api/saved-plans/", json=plan, headers=headers).json()["id"]
+    share_token = client.post(f"/api/saved-plans/{plan_id}/share", headers=headers).json()[
+        "share_token"
+    ]
+    url = f"/api/saved-plans/shared/{share_token}"
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"].startswith("public, max-age=")
+    etag = response.headers["ETag"]
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url, headers={"If-None-Match": etag})
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert statements == []
+
+    plan.update(name="Summer (final)", is_public=1)
+    assert client.put(f"/api/saved-plans/{plan_id}", json=plan, headers=headers).status_code == 200
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["name"] == "Summer (final)"
+    assert response.headers["ETag"] != etag
+
+    assert client.delete(f"/api/saved-plans/{plan_id}", headers=headers).status_code == 204
+    assert client.get(url).status_code == 404
+
+
+def test_saved_plan_conditional_get(client: TestClient, db_session: Session):
+    """Test that a saved plan is revalidated by ETag and kept out of shared caches."""
+    headers = register_and_login(client)
+    plan = {"name": "Summer", "year": 2025, "schedule": SCHEDULE}
+    plan_id = client.post("/api/saved-plans/", json=plan, headers=headers).json()["id"]
+
+    response = client.get(f"/api/saved-plans/{plan_id}", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["schedule"] == SCHEDULE
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    etag = response.headers["ETag"]
+    response = client.get(f"/api/saved-plans/{plan_id}", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+
+def test_large_plans_are_compressed(client: TestClient, db_session: Session):
+    """Test that a large shared plan is gzipped and still revalidates by its ETag."""
+    headers = register_and_login(client)
+    periods = [{"start": f"2025-01-{day:02d}", "end": f"2025-01-{day:02d}"} for day in range(1, 29)]
+    plan = {"name": "Every day", "year": 2025, "schedule": {"periods": periods * 5}}
+    plan_id = client.post("/api/saved-plans/", json=plan, headers=headers).json()["id"]
+    share_token = client.post(f"/api/saved-plans/{plan_id}/share", headers=headers).json()[
+        "share_token"
+    ]
+    url = f"/api/saved-plans/shared/{share_token}"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.json()["schedule"] == plan["schedule"]
+    etag = response.headers["ETag"]
+    assert etag.startswith("W/")
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.headers["Vary"] == "Accept-Encoding"
+
+    response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"] == etag[2:]
+    assert response.headers["Vary"] == "Accept-Encoding"
@@ -1,13 +1,21 @@
+import json
 from datetime import date
 
 # pytest is used implicitly by the fixtures
 from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import Session
 
+from app.models.employer import Employer
 from app.models.holiday import Holiday
 from app.models.policy import Policy
 from app.models.time_budget import TimeBudget
 from app.models.user import User
+from app.routes import suggestions
+from app.services.holiday_store import holiday_store
+from app.services.optimizer_executor import ProcessExecutor
+from app.services.vacation_optimizer import MAX_VACATIONS, _candidate_table, candidate_table
 
 
 def test_get_suggestions(client: TestClient, db_session: Session):
@@ -166,3 +174,388 @@ def test_suggestions_with_invalid_user(client: TestClient, db_session: Session):
 
     # Should return an error
     assert response.status_code == 404
+
+
+def test_suggestions_are_cached_until_holidays_change(client: TestClient, db_session: Session):
+    """Test that identical requests hit the cache and adding a holiday invalidates it."""
+    user = User(email="test4@example.com", password_hash="hashed_password")
+    employer = Employer(name="Test Employer")
+    db_session.add_all([user, employer])
+    db_session.commit()
+
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.commit()
+
+    year = date.today().year + 1
+    url = f"/api/suggestions?user_id={user.id}&year={year}"
+
+    first = client.get(url)
+    second = client.get(url)
+
+    assert first.json() == second.json()
+    stats = client.get("/api/suggestions/cache-stats").json()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 1
+
+    response = client.post(
+        "/api/holidays",
+        json={
+            "date": f"{year}-07-03",
+            "name": "Company Day",
+            "employer_id": employer.id,
+            "year": year,
+        },
+    )
+    assert response.status_code == 200
+
+    client.get(url)
+    stats = client.get("/api/suggestions/cache-stats").json()
+    assert stats["misses"] == 2
+    assert stats["hits"] == 1
+
+
+def test_suggestions_load_inputs_in_one_query(client: TestClient, db_session: Session):
+    """Test that a warm request loads budget and policy in one query and no holidays."""
+    user = User(email="test5@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+
+    year = date.today().year + 1
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[f"{year}-08-01"]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=2))
+    db_session.add(
+        Holiday(
+            date=date(year, 7, 4),
+            name="Independence Day",
+            year=year,
+            country="US",
+            type="public",
+        )
+    )
+    db_session.commit()
+    url = f"/api/suggestions?user_id={user.id}&year={year}"
+    # The first request loads the year's holidays into the holiday store
+    assert client.get(url).status_code == 200
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url)
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+
+    assert response.status_code == 200
+    assert len(statements) == 1
+    schedule = response.json()["schedule"]
+    assert sum(period["days_used"] for period in schedule) <= 8
+    assert all(not (p["start"] <= f"{year}-08-01" <= p["end"]) for p in schedule)
+
+
+def test_batch_suggestions_stream_ndjson(client: TestClient, db_session: Session):
+    """Test that the batch endpoint streams one line per user and inline plan."""
+    year = date.today().year + 1
+    users = [User(email=f"team{i}@example.com", password_hash="hashed_password") for i in range(3)]
+    db_session.add_all(users)
+    db_session.commit()
+    user_ids = [user.id for user in users]
+    for user_id, days in zip(user_ids, (5, 10, 10)):
+        db_session.add(Policy(user_id=user_id, max_days=30, blackout_dates=[]))
+        db_session.add(TimeBudget(user_id=user_id, accrued_days=days, used_days=0))
+    db_session.add(
+        Holiday(
+            date=date(year, 7, 4),
+            name="Independence Day",
+            year=year,
+            country="US",
+            type="public",
+        )
+    )
+    db_session.commit()
+
+    response = client.post(
+        "/api/suggestions/batch",
+        json={
+            "year": year,
+            "user_ids": user_ids + [999],
+            "plans": [{"id": "contractor", "available_days": 3, "blackout_dates": []}],
+            "max_vacations": 2,
+        },
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 5
+    by_user = {line["user_id"]: line for line in lines if "user_id" in line}
+    assert by_user[999]["status"] == 404
+    for user_id, days in zip(user_ids, (5, 10, 10)):
+        assert sum(period["days_used"] for period in by_user[user_id]["schedule"]) == days
+    # Users with identical inputs share one cached plan
+    assert by_user[user_ids[1]]["schedule"] == by_user[user_ids[2]]["schedule"]
+    contractor = next(line for line in lines if line.get("id") == "contractor")
+    assert sum(period["days_used"] for period in contractor["schedule"]) == 3
+
+
+def test_suggestions_stream_ends_with_final_plan(client: TestClient, db_session: Session):
+    """Test that the streaming mode sends improving plans and marks the last one final."""
+    user = User(email="test6@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.commit()
+
+    year = date.today().year + 1
+    url = f"/api/suggestions?user_id={user.id}&year={year}&max_vacations=3"
+
+    response = client.get(f"{url}&stream=true&deadline_ms=5000")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 2
+    assert [line["final"] for line in lines] == [False, True]
+    # The completed plan was cached and matches the non-streaming response
+    final = lines[-1]
+    del final["final"]
+    assert client.get(url).json() == final
+
+
+def test_suggestions_stream_takes_an_executor_slot(
+    client: TestClient, db_session: Session, monkeypatch
+):
+    """Test that streams hold an optimizer slot and stop at the executor's timeout."""
+    user = User(email="test-stream-slot@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.commit()
+    executor = ProcessExecutor(workers=1, queue_depth=0, timeout=5)
+    monkeypatch.setattr(suggestions, "optimizer_executor", executor)
+    url = f"/api/suggestions?user_id={user.id}&year={date.today().year + 1}&stream=true"
+
+    reservation = executor.reserve()
+    busy = client.get(url)
+    reservation.release()
+    response = client.get(url)
+
+    assert busy.status_code == 503
+    assert busy.headers["retry-after"] == "1"
+    assert response.status_code == 200
+    assert json.loads(response.text.splitlines()[-1])["final"]
+    assert executor.stats()["in_flight"] == 0
+
+    executor.timeout = 0
+    cut_short = client.get(f"{url}&max_vacations=3")
+
+    assert not json.loads(cut_short.text.splitlines()[-1])["final"]
+
+
+def test_suggestions_debug_timings_and_metrics(client: TestClient, db_session: Session):
+    """Test the debug breakdown, the Server-Timing header and the /metrics endpoint."""
+    user = User(email="test7@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.commit()
+
+    year = date.today().year + 1
+    response = client.get(f"/api/suggestions?user_id={user.id}&year={year}&debug=true")
+
+    assert response.status_code == 200
+    debug = response.json()["debug"]
+    assert debug["cache"] == "miss"
+    assert {"db", "scan", "greedy"} <= set(debug["phases_ms"])
+    assert debug["counters"]["candidates_generated"] > 0
+    assert "scan;dur=" in response.headers["Server-Timing"]
+    # The cached result stays free of debug output
+    assert "debug" not in client.get(f"/api/suggestions?user_id={user.id}&year={year}").json()
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert metrics.headers["content-type"].startswith("text/plain")
+    lines = metrics.text.splitlines()
+    assert "optimizer_runs_total 1" in lines
+    assert "suggestion_cache_hits_total 1" in lines
+    assert any(line.startswith('optimizer_phase_seconds_count{phase="scan"}') for line in lines)
+
+
+def test_holiday_calendars_are_stored_per_country_and_employer(
+    client: TestClient, db_session: Session
+):
+    """Test that calendars load once per (year, country, employer) until holidays change."""
+    user = User(email="test8@example.com", password_hash="hashed_password")
+    employer = Employer(name="Calendar Employer")
+    other_employer = Employer(name="Other Employer")
+    db_session.add_all([user, employer, other_employer])
+    db_session.commit()
+
+    year = date.today().year + 1
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.add_all(
+        [
+            Holiday(
+                date=date(year, 7, 4),
+                name="Independence Day",
+                year=year,
+                country="US",
+                type="public",
+            ),
+            Holiday(
+                date=date(year, 10, 3), name="Unity Day", year=year, country="DE", type="public"
+            ),
+            Holiday(
+                date=date(year, 3, 13),
+                name="Other Company Day",
+                year=year,
+                country="US",
+                type="employer",
+                employer_id=other_employer.id,
+            ),
+        ]
+    )
+    db_session.commit()
+    url = f"/api/suggestions?user_id={user.id}&year={year}&country=US&employer_id={employer.id}"
+
+    assert client.get(url).status_code == 200
+    assert client.get(url + "&no_single_days=true").status_code == 200
+    # Without a country the US calendar is used, rather than every country's holidays
+    assert client.get(url.replace("&country=US", "")).status_code == 200
+
+    stats = holiday_store.stats()
+    assert stats["loads"] == 1
+    assert stats["hits"] == 2
+    assert holiday_store.get(year, "US", employer.id) == (date(year, 7, 4),)
+
+    response = client.post(
+        "/api/holidays",
+        json={
+            "date": f"{year}-07-03",
+            "name": "Company Day",
+            "employer_id": employer.id,
+            "year": year,
+        },
+    )
+    assert response.status_code == 200
+    assert holiday_store.stats()["version"] == stats["version"] + 1
+    assert holiday_store.get(year, "US", employer.id) is None
+    # The changed calendar's candidate table was rebuilt in the background
+    tables = _candidate_table.cache_info()
+    candidate_table(year, [date(year, 7, 3), date(year, 7, 4)])
+    assert _candidate_table.cache_info().hits == tables.hits + 1
+
+    assert client.get(url).status_code == 200
+    assert holiday_store.get(year, "US", employer.id) == (date(year, 7, 3), date(year, 7, 4))
+
+
+def test_adding_a_holiday_twice_conflicts(client: TestClient, db_session: Session):
+    """Test that a second holiday for the same date, country and employer is a 409."""
+    employer = Employer(name="Acme Corp")
+    db_session.add(employer)
+    db_session.commit()
+    year = date.today().year + 1
+    holiday = {
+        "date": f"{year}-07-03",
+        "name": "Company Day",
+        "employer_id": employer.id,
+        "year": year,
+    }
+
+    assert client.post("/api/holidays", json=holiday).status_code == 200
+    response = client.post("/api/holidays", json={**holiday, "name": "Renamed"})
+
+    assert response.status_code == 409
+    assert db_session.query(Holiday).filter(Holiday.employer_id == employer.id).count() == 1
+
+
+def test_suggestions_across_a_horizon(client: TestClient, db_session: Session):
+    """Test that a horizon plans with each year's holidays and reports per-year budgets."""
+    user = User(email="test9@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+
+    year = date.today().year + 1
+    db_session.add(Policy(user_id=user.id, max_days=25, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=20, used_days=5))
+    db_session.add_all(
+        Holiday(date=day, name=name, year=day.year, country="US", type="public")
+        for day, name in [
+            (date(year, 7, 4), "Independence Day"),
+            (date(year + 1, 7, 4), "Independence Day"),
+        ]
+    )
+    db_session.commit()
+
+    response = client.get(
+        f"/api/suggestions?user_id={user.id}&country=US&start={year}-07-01&horizon_months=18"
+    )
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [entry["year"] for entry in data["years"]] == [year, year + 1]
+    assert [entry["available_days"] for entry in data["years"]][0] == 15
+    assert data["years"][1]["available_days"] <= 25
+    assert all(entry["days_used"] <= entry["available_days"] for entry in data["years"])
+    assert max(period["end"] for period in data["schedule"]) <= f"{year + 1}-12-31"
+    assert holiday_store.get(year + 1, "US", None) == (date(year + 1, 7, 4),)
+
+    response = client.get(f"/api/suggestions?user_id={user.id}&horizon_months=37")
+    assert response.status_code == 422
+
+
+def test_suggestions_reject_max_vacations_out_of_range(client: TestClient, db_session: Session):
+    """Test that max_vacations must allow at least one vacation and at most the cap."""
+    user = User(email="test-max-vacations@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Policy(user_id=user.id, max_days=30, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=0))
+    db_session.commit()
+
+    for max_vacations in (0, -1, MAX_VACATIONS + 1):
+        response = client.get(f"/api/suggestions?user_id={user.id}&max_vacations={max_vacations}")
+        assert response.status_code == 422
+        response = client.post(
+            "/api/suggestions/batch", json={"user_ids": [user.id], "max_vacations": max_vacations}
+        )
+        assert response.status_code == 422
+
+
+def test_suggestions_reject_years_out_of_range(client: TestClient):
+    """Test that years whose padded calendars don't fit in a date are rejected, not a 500."""
+    for year in (1, 9999):
+        assert client.get(f"/api/suggestions?user_id=1&year={year}").status_code == 422
+        response = client.post("/api/suggestions/batch", json={"year": year, "user_ids": [1]})
+        assert response.status_code == 422
+    for start in ("0001-01-01", "9999-06-01"):
+        response = client.get(f"/api/suggestions?user_id=1&start={start}&horizon_months=12")
+        assert response.status_code == 422
+
+
+def test_suggestions_horizon_for_an_overdrawn_user(client: TestClient, db_session: Session):
+    """Test that a user who used more days than they accrued still gets a horizon plan."""
+    user = User(email="test-overdrawn@example.com", password_hash="hashed_password")
+    db_session.add(user)
+    db_session.commit()
+    db_session.add(Policy(user_id=user.id, max_days=25, blackout_dates=[]))
+    db_session.add(TimeBudget(user_id=user.id, accrued_days=10, used_days=13))
+    db_session.commit()
+    year = date.today().year + 1
+    url = f"/api/suggestions?user_id={user.id}&start={year}-07-01&horizon_months=18"
+
+    for query in ("", "&max_vacations=3"):
+        response = client.get(url + query)
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["years"][0] == {"year": year, "available_days": -3, "days_used": 0}
+        assert data["years"][1]["available_days"] == 7
+        assert all(period["start"] >= f"{year + 1}-01-01" for period in data["schedule"])
@@ -0,0 +1,39 @@
+# pytest is used implicitly by the fixtures
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from app.models.time_budget import TimeBudget
+
+
+def test_get_time_budget_creates_default(client: TestClient, db_session: Session):
+    """Test that reading a missing time budget creates an empty one."""
+    response = client.get("/api/time-budget?user_id=1")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["user_id"] == 1
+    assert data["accrued_days"] == 0.0
+    assert db_session.query(TimeBudget).filter(TimeBudget.user_id == 1).count() == 1
+
+
+def test_update_time_budget(client: TestClient, db_session: Session):
+    """Test creating and then updating a time budget."""
+    payload = {"user_id": 1, "accrued_days": 15, "used_days": 2}
+    assert client.post("/api/time-budget", json=payload).status_code == 200
+
+    payload["used_days"] = 5
+    response = client.post("/api/time-budget", json=payload)
+
+    assert response.status_code == 200
+    assert response.json()["used_days"] == 5
+    assert client.get("/api/time-budget?user_id=1").json()["used_days"] == 5
+
+
+def test_db_pool_metrics(client: TestClient):
+    """Test that pool statistics are exposed for both engines."""
+    response = client.get("/api/metrics/db-pool")
+
+    assert response.status_code == 200
+    data = response.json()
+    for engine in ("sync", "async"):
+        assert {"pool_size", "checked_out", "overflow", "wait_seconds_max"} <= set(data[engine])
@@ -0,0 +1,61 @@
+from app.services.auth_tokens import TokenCache, TokenRevocations
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestTokenCache:
+    def test_entries_expire_with_their_token(self):
+        """Test that cached claims are dropped once the token itself expires."""
+        clock = FakeClock()
+        cache = TokenCache(maxsize=2, ttl=600, clock=clock)
+        cache.set("token", {"sub": "a@example.com", "exp": 1010})
+
+        assert cache.get("token")["sub"] == "a@example.com"
+        clock.now = 1010
+        assert cache.get("token") is None
+
+    def test_bounded(self):
+        """Test that the least recently used tokens are evicted beyond maxsize."""
+        cache = TokenCache(maxsize=2, ttl=600)
+        for token in ("a", "b", "c"):
+            cache.set(token, {"exp": float("inf")})
+
+        assert len(cache) == 2
+        assert cache.get("a") is None
+
+
+class TestTokenRevocations:
+    def test_revoke_one_token(self):
+        """Test that revoking a token ID rejects that token only."""
+        revocations = TokenRevocations()
+        revocations.revoke("abc", expires_at=float("inf"))
+
+        assert revocations.is_revoked({"jti": "abc", "uid": 1, "iat": 0})
+        assert not revocations.is_revoked({"jti": "def", "uid": 1, "iat": 0})
+
+    def test_revoke_user_rejects_earlier_tokens(self):
+        """Test that revoking a user rejects tokens issued up to then, not after."""
+        clock = FakeClock()
+        revocations = TokenRevocations(clock=clock)
+        revocations.revoke_user(7)
+
+        assert revocations.is_revoked({"jti": "a", "uid": 7, "iat": 999})
+        assert not revocations.is_revoked({"jti": "b", "uid": 7, "iat": 1001})
+        assert not revocations.is_revoked({"jti": "c", "uid": 8, "iat": 999})
+
+    def test_expired_revocations_are_forgotten(self):
+        """Test that revoked tokens are dropped once they would have expired."""
+        clock = FakeClock()
+        revocations = TokenRevocations(clock=clock)
+        revocations.revoke("old", expires_at=1005)
+        clock.now = 1010
+        revocations.revoke("new", expires_at=2000)
+
+        assert not revocations.is_revoked({"jti": "old"})
+        assert revocations.is_revoked({"jti": "new"})
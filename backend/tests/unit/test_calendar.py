@@ -0,0 +1,98 @@
+from datetime import date
+
+from app.services.calendar import (
+    BLACKOUT,
+    HOLIDAY,
+    WEEKEND,
+    WORKDAY,
+    Calendar,
+    get_calendar,
+    scan_windows,
+    year_calendar,
+)
+
+
+class TestCalendar:
+    def test_day_kinds(self):
+        """Test that days are classified like generate_period classifies them."""
+        holidays = {date(2025, 1, 1), date(2025, 1, 4)}  # Wednesday and a Saturday
+        blackouts = {date(2025, 1, 2)}
+        calendar = Calendar(date(2025, 1, 1), date(2025, 1, 6), holidays, blackouts)
+
+        assert list(calendar.kinds) == [HOLIDAY, BLACKOUT, WORKDAY, WEEKEND, WEEKEND, WORKDAY]
+
+    def test_counts(self):
+        """Test window counts against a hand-counted week."""
+        calendar = Calendar(date(2025, 1, 1), date(2025, 1, 31), {date(2025, 1, 1)}, set())
+
+        # Wednesday Jan 1 (holiday) through Monday Jan 6
+        assert calendar.counts(date(2025, 1, 1), date(2025, 1, 6)) == (3, 2, 1)
+        # A single Saturday
+        assert calendar.counts(date(2025, 1, 4), date(2025, 1, 4)) == (0, 1, 0)
+        assert calendar.count(BLACKOUT, 0, len(calendar) - 1) == 0
+
+    def test_year_calendar_is_shared_and_padded(self):
+        """Test that equal inputs reuse one calendar that covers the year boundaries."""
+        holidays = {date(2025, 1, 1): "New Year's Day"}
+
+        calendar = year_calendar(2025, holidays, set())
+
+        assert calendar is year_calendar(2025, dict(holidays), set())
+        assert calendar.covers(date(2024, 12, 25), date(2026, 1, 5))
+        assert get_calendar(2025, 2026, holidays, set()).covers(
+            date(2025, 1, 1), date(2026, 12, 31)
+        )
+
+    def test_with_blackouts(self):
+        """Test that adding blackouts to a calendar matches building it with them."""
+        holidays = {date(2025, 1, 1), date(2025, 1, 4)}
+        blackouts = {date(2025, 1, 1), date(2025, 1, 2)}
+        base = Calendar(date(2025, 1, 1), date(2025, 1, 6), holidays, set())
+
+        derived = base.with_blackouts(blackouts)
+        built = Calendar(date(2025, 1, 1), date(2025, 1, 6), holidays, blackouts)
+
+        assert list(derived.kinds) == list(built.kinds)
+        assert derived.prefix == built.prefix
+        assert list(base.kinds)[:2] == [HOLIDAY, WORKDAY]
+
+
+class TestScanWindows:
+    def test_scan_windows_bridges_holiday(self):
+        """Test that one-day windows grow over the adjacent holiday and weekend."""
+        # Friday July 4 is a holiday; calendar runs Monday June 30 to Sunday July 13
+        calendar = Calendar(date(2025, 6, 30), date(2025, 7, 13), {date(2025, 7, 4)}, set())
+
+        windows = scan_windows(calendar, date(2025, 6, 30), date(2025, 7, 13), max_days=1)
+        rows = {
+            (date.fromordinal(windows.start[i]), date.fromordinal(windows.end[i]))
+            for i in range(len(windows))
+        }
+
+        # Thursday and Monday each buy a four-day weekend
+        assert (date(2025, 7, 3), date(2025, 7, 6)) in rows
+        assert (date(2025, 7, 4), date(2025, 7, 7)) in rows
+        # Midweek days stand alone
+        assert (date(2025, 7, 2), date(2025, 7, 2)) in rows
+        # Windows that could grow over the weekend for free are not kept
+        assert (date(2025, 7, 7), date(2025, 7, 7)) not in rows
+
+        best = windows.by_efficiency()[0]
+        assert windows.days_used[best] == 1
+        assert windows.total_days_off[best] == 4
+        assert windows.efficiency[best] == 4.0
+
+    def test_scan_windows_constraints(self):
+        """Test the budget, blackout and no_single_days filters."""
+        blackouts = {date(2025, 7, 9)}
+        calendar = Calendar(date(2025, 6, 30), date(2025, 7, 13), set(), blackouts)
+
+        windows = scan_windows(
+            calendar, date(2025, 6, 30), date(2025, 7, 13), max_days=3, no_single_days=True
+        )
+
+        assert len(windows) > 0
+        for i in range(len(windows)):
+            assert 1 <= windows.days_used[i] <= 3
+            assert windows.end[i] > windows.start[i]
+            assert not windows.start[i] <= date(2025, 7, 9).toordinal() <= windows.end[i]
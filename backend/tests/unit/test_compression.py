@@ -0,0 +1,137 @@
+import asyncio
+import gzip
+from functools import partial
+
+import pytest
+
+from app.utils import compression
+from app.utils.compression import CompressionMiddleware, choose_encoding
+
+
+def run(middleware, accept_encoding, messages):
+    """Send ``messages`` through the middleware and collect what reaches the client."""
+
+    async def app(scope, receive, send):
+        for message in messages:
+            await send(message)
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", accept_encoding.encode())]}
+    asyncio.run(middleware(app)(scope, None, send))
+    return sent
+
+
+def json_start(**headers):
+    raw = [(b"content-type", b"application/json")]
+    raw += [(name.encode(), value.encode()) for name, value in headers.items()]
+    return {"type": "http.response.start", "status": 200, "headers": raw}
+
+
+class TestChooseEncoding:
+    def test_prefers_brotli_then_gzip(self, monkeypatch):
+        """Test that brotli wins when installed and gzip is the fallback."""
+        monkeypatch.setattr(compression, "brotli", object())
+        assert choose_encoding("gzip, deflate, br") == "br"
+        assert choose_encoding("gzip, br;q=0") == "gzip"
+        assert choose_encoding("*") == "br"
+
+        monkeypatch.setattr(compression, "brotli", None)
+        assert choose_encoding("gzip, br") == "gzip"
+
+    def test_nothing_acceptable(self):
+        """Test that clients not accepting gzip or brotli get uncompressed responses."""
+        assert choose_encoding("") is None
+        assert choose_encoding("identity") is None
+        assert choose_encoding("gzip;q=0, br;q=0") is None
+
+
+class TestCompressionMiddleware:
+    def test_compresses_large_bodies(self, monkeypatch):
+        """Test that bodies over the threshold are gzipped with a weak ETag."""
+        monkeypatch.setattr(compression, "brotli", None)
+        body = b'{"schedule": []}' * 100
+        middleware = partial(CompressionMiddleware, minimum_size=500)
+
+        start, message = run(
+            middleware,
+            "gzip",
+            [json_start(etag='"abc"'), {"type": "http.response.body", "body": body}],
+        )
+
+        headers = dict(start["headers"])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert headers[b"etag"] == b'W/"abc"'
+        assert b"Accept-Encoding" in headers[b"vary"]
+        assert gzip.decompress(message["body"]) == body
+        assert int(headers[b"content-length"]) == len(message["body"])
+
+    @pytest.mark.parametrize(
+        "messages",
+        [
+            # Too small
+            [json_start(), {"type": "http.response.body", "body": b"{}"}],
+            # Streamed
+            [
+                json_start(),
+                {"type": "http.response.body", "body": b"x" * 1000, "more_body": True},
+                {"type": "http.response.body", "body": b""},
+            ],
+        ],
+    )
+    def test_passes_through(self, messages):
+        """Test that small and streamed bodies are sent as they are, varying on encoding."""
+        middleware = partial(CompressionMiddleware, minimum_size=500)
+
+        sent = run(middleware, "gzip, br", messages)
+
+        assert sent[1:] == messages[1:]
+        headers = dict(sent[0]["headers"])
+        assert b"content-encoding" not in headers
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    def test_uncompressed_clients_keep_strong_etags(self):
+        """Test that a client not accepting compression still sees the response vary."""
+        body = b'{"schedule": []}' * 100
+        middleware = partial(CompressionMiddleware, minimum_size=500)
+
+        start, message = run(
+            middleware,
+            "identity",
+            [json_start(etag='"abc"'), {"type": "http.response.body", "body": body}],
+        )
+
+        headers = dict(start["headers"])
+        assert message["body"] == body
+        assert headers[b"etag"] == b'"abc"'
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    def test_not_modified_matches_the_compressed_etag(self):
+        """Test that a 304 carries the weak ETag and Vary of the compressed 200."""
+        middleware = partial(CompressionMiddleware, minimum_size=500)
+        not_modified = {
+            "type": "http.response.start",
+            "status": 304,
+            "headers": [(b"etag", b'"abc"')],
+        }
+
+        start, _ = run(middleware, "gzip", [not_modified, {"type": "http.response.body"}])
+
+        headers = dict(start["headers"])
+        assert headers[b"etag"] == b'W/"abc"'
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    def test_leaves_other_content_types_alone(self):
+        """Test that responses never compressed don't vary on Accept-Encoding."""
+        start = {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"image/png")],
+        }
+        messages = [start, {"type": "http.response.body", "body": b"x" * 1000}]
+        middleware = partial(CompressionMiddleware, minimum_size=500)
+
+        assert run(middleware, "gzip", messages) == messages
@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, select
+
+from app.models.holiday import Holiday
+from app.services.holiday_import import (
+    DuplicateHolidays,
+    country_holiday_rows,
+    employer_holiday_rows,
+    prepare_holidays_table,
+    upsert_holidays,
+)
+
+
+def stored(engine):
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(Holiday.date, Holiday.name, Holiday.employer_id).order_by(Holiday.id)
+        )
+        return [tuple(row) for row in rows]
+
+
+class TestHolidayImport:
+    def test_country_holiday_rows(self):
+        """Test that the holidays package is turned into public holiday rows per year."""
+        rows = country_holiday_rows("US", [2025, 2026])
+
+        assert {row["year"] for row in rows} == {2025, 2026}
+        independence_day = next(row for row in rows if row["date"] == date(2025, 7, 4))
+        assert independence_day == {
+            "date": date(2025, 7, 4),
+            "name": "Independence Day",
+            "country": "US",
+            "year": 2025,
+            "type": "public",
+            "employer_id": None,
+        }
+
+    def test_upsert_updates_instead_of_duplicating(self):
+        """Test that re-importing a key renames the holiday and keys include the employer."""
+        engine = create_engine("sqlite://")
+        prepare_holidays_table(engine)
+        day = date(2025, 7, 3)
+        rows = [
+            {
+                "date": day,
+                "name": "Bridge Day",
+                "country": "US",
+                "year": 2025,
+                "type": "public",
+                "employer_id": None,
+            }
+        ]
+        rows += employer_holiday_rows(7, "US", {day: "Company Day"})
+
+        with engine.begin() as connection:
+            assert upsert_holidays(connection, rows) == 2
+        with engine.begin() as connection:
+            upsert_holidays(connection, [dict(rows[0], name="Renamed Bridge Day")])
+
+        assert stored(engine) == [(day, "Renamed Bridge Day", None), (day, "Company Day", 7)]
+
+    def test_prepare_removes_duplicates_only_when_asked(self):
+        """Test that rows stored before the key was unique are only deleted with dedupe."""
+        engine = create_engine("sqlite://")
+        Holiday.__table__.create(engine)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("DROP INDEX uq_holidays_date_country_employer")
+            for name in ("First", "Second"):
+                connection.execute(
+                    Holiday.__table__.insert().values(
+                        date=date(2025, 1, 1), name=name, country="US", year=2025, type="public"
+                    )
+                )
+
+        with pytest.raises(DuplicateHolidays) as raised:
+            prepare_holidays_table(engine)
+        assert raised.value.count == 1
+        assert len(stored(engine)) == 2
+
+        assert prepare_holidays_table(engine, dedupe=True) == 1
+        assert stored(engine) == [(date(2025, 1, 1), "First", None)]
+        with engine.begin() as connection:
+            upsert_holidays(connection, country_holiday_rows("US", [2025]))
+        assert stored(engine)[0] == (date(2025, 1, 1), "New Year's Day", None)
@@ -0,0 +1,86 @@
+import asyncio
+from datetime import date
+
+from app.services.holiday_store import HolidayStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeResult:
+    def __init__(self, dates):
+        self.dates = dates
+
+    def scalars(self):
+        return iter(self.dates)
+
+
+class FakeSession:
+    """Stands in for an AsyncSession, returning the same dates for every statement."""
+
+    def __init__(self, dates, on_execute=None):
+        self.dates = dates
+        self.on_execute = on_execute
+        self.statements = []
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        if self.on_execute is not None:
+            self.on_execute()
+        return FakeResult(self.dates)
+
+
+def load(store, db, *key):
+    return asyncio.run(store.holiday_dates(db, *key))
+
+
+class TestHolidayStore:
+    def test_loads_each_calendar_once(self):
+        """Test that a calendar is loaded on first use and then served from memory."""
+        store = HolidayStore(ttl=0)
+        db = FakeSession([date(2025, 7, 4)])
+
+        assert load(store, db, 2025, "US", 1) == (date(2025, 7, 4),)
+        assert load(store, db, 2025, "US", 1) == (date(2025, 7, 4),)
+        assert load(store, db, 2025, "US", 2) == (date(2025, 7, 4),)
+
+        assert len(db.statements) == 2
+        assert store.stats() == {"calendars": 2, "hits": 1, "loads": 2, "version": 0}
+
+    def test_invalidate_drops_the_year_and_bumps_the_version(self):
+        """Test that invalidation only drops the calendars of the changed year."""
+        store = HolidayStore(ttl=0)
+        db = FakeSession([])
+        load(store, db, 2025)
+        load(store, db, 2026)
+
+        store.invalidate(2025)
+
+        assert store.version == 1
+        assert store.get(2025) is None
+        assert store.get(2026) == ()
+
+    def test_load_racing_an_invalidation_is_not_kept(self):
+        """Test that a calendar loaded while holidays changed is returned but not stored."""
+        store = HolidayStore(ttl=0)
+        db = FakeSession([date(2025, 7, 4)], on_execute=lambda: store.invalidate(2025))
+
+        assert load(store, db, 2025) == (date(2025, 7, 4),)
+        assert store.get(2025) is None
+
+    def test_ttl_expiry(self):
+        """Test that calendars are reloaded once the TTL has passed."""
+        clock = FakeClock()
+        store = HolidayStore(ttl=30, clock=clock)
+        db = FakeSession([])
+        load(store, db, 2025)
+
+        clock.now = 29
+        assert store.get(2025) == ()
+        clock.now = 30
+        assert store.get(2025) is None
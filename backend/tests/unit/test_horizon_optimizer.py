@@ -0,0 +1,156 @@
+from datetime import date, timedelta
+from itertools import combinations
+
+from app.services.calendar import get_calendar, scan_windows
+from app.services.horizon_optimizer import (
+    Horizon,
+    HorizonBudget,
+    _select_horizon_periods,
+    _year_split,
+    iter_horizon_plans,
+    plan_horizon,
+)
+from app.services.vacation_optimizer import _window_period
+
+
+class TestHorizon:
+    def test_of_months(self):
+        """Test that a horizon ends the day before the same date months later."""
+        assert Horizon.of_months(date(2026, 7, 1), 18) == Horizon(
+            date(2026, 7, 1), date(2027, 12, 31)
+        )
+        assert Horizon.of_months(date(2027, 1, 31), 1).end == date(2027, 2, 27)
+        assert Horizon.of_months(date(2026, 11, 15), 3).years == [2026, 2027]
+
+
+class TestHorizonBudget:
+    def test_opening_balances_carry_over_up_to_the_cap(self):
+        """Test that unused days carry over and balances above the cap are forfeited."""
+        budget = HorizonBudget(opening=10, accrual=20, max_balance=25)
+
+        assert budget.opening_balances([4, 0, 0]) == [10, 25, 25]
+        assert budget.opening_balances([8, 0]) == [10, 22]
+        assert budget.opening_balances([10, 26]) is None
+
+    def test_uncapped_balances(self):
+        """Test that without a cap every unused day carries over."""
+        budget = HorizonBudget(opening=5, accrual=20)
+
+        assert budget.opening_balances([0, 0, 0]) == [5, 25, 45]
+
+    def test_overdrawn_balance_is_paid_back(self):
+        """Test that days used beyond the accrual leave nothing to spend until repaid."""
+        budget = HorizonBudget(opening=-3, accrual=10)
+
+        assert budget.opening_balances([0, 0]) == [-3, 7]
+        assert budget.opening_balances([1, 0]) is None
+        assert budget.opening_balances([0, 7]) == [-3, 7]
+
+
+class TestPlanHorizon:
+    def test_bridge_spends_each_years_own_days(self):
+        """Test that a New Year bridge is planned with its workdays split between years."""
+        year = date.today().year + 1
+        horizon = Horizon(date(year, 12, 1), date(year + 1, 1, 31))
+        # Only a period taking two days on either side of the closure uses both budgets
+        holidays = [date(year, 12, 30) + timedelta(days=n) for n in range(4)]
+
+        result = plan_horizon(horizon, holidays, set(), HorizonBudget(2, 2, 2), max_vacations=1)
+
+        (period,) = result["schedule"]
+        assert period["start"] < f"{year + 1}-01-01" <= period["end"]
+        used = {entry["year"]: entry["days_used"] for entry in result["years"]}
+        assert used[year] + used[year + 1] == period["days_used"]
+        assert used == {year: 2, year + 1: 2}
+
+    def test_overdrawn_first_year(self):
+        """Test that an overdrawn user is planned from the year their balance recovers."""
+        year = date.today().year + 1
+        horizon = Horizon.of_months(date(year, 7, 1), 18)
+        holidays = [date(year, 7, 4), date(year + 1, 7, 4)]
+
+        for max_vacations in (None, 3):
+            result = plan_horizon(
+                horizon, holidays, set(), HorizonBudget(-3, 10, 25), max_vacations=max_vacations
+            )
+
+            assert result["years"][0] == {"year": year, "available_days": -3, "days_used": 0}
+            assert result["years"][1]["available_days"] == 7
+            assert 0 < result["years"][1]["days_used"] <= 7
+            assert all(period["start"] >= f"{year + 1}-01-01" for period in result["schedule"])
+
+    def test_no_vacations_allowed(self):
+        """Test that a max_vacations below one plans nothing rather than without a limit."""
+        year = date.today().year + 1
+        horizon = Horizon.of_months(date(year, 7, 1), 18)
+
+        result = plan_horizon(horizon, [], set(), HorizonBudget(10, 20), max_vacations=0)
+
+        assert result["schedule"] == []
+
+    def test_half_days_add_up_across_years(self):
+        """Test that half days left in one year make up a whole day in the next."""
+        year = date.today().year + 1
+        horizon = Horizon(date(year, 12, 1), date(year + 1, 1, 31))
+
+        result = plan_horizon(horizon, [], set(), HorizonBudget(1.5, 1.5), max_vacations=1)
+
+        # 1.5 + 1.5 days buy three workdays; planning with each year's whole days only buys two
+        (period,) = result["schedule"]
+        assert period["days_used"] == 3
+
+    def test_exact_search_matches_exhaustive_search(self):
+        """Test that the cross-year search finds the best plan the budgets allow."""
+        year = date.today().year + 1
+        horizon = Horizon(date(year, 12, 10), date(year + 1, 1, 20))
+        holidays = [date(year, 12, 25), date(year + 1, 1, 1)]
+        calendar = get_calendar(year, year + 1, holidays, ())
+        windows = scan_windows(calendar, horizon.start, horizon.end, 6)
+        periods = [
+            _window_period(windows, row, calendar)
+            for row in windows.by_efficiency()
+            if horizon.start.toordinal() <= windows.start[row]
+            and windows.end[row] <= horizon.end.toordinal()
+        ]
+        splits = {p: _year_split(p, calendar, horizon.years) for p in periods}
+
+        budgets = (
+            HorizonBudget(3, 2, 3),
+            HorizonBudget(1, 4, None),
+            HorizonBudget(6, 0),
+            HorizonBudget(1.5, 2.5, 4),
+        )
+        for budget in budgets:
+            best = 0
+            for count in (1, 2):
+                for combo in combinations(periods, count):
+                    if any(
+                        a.start <= b.end and b.start <= a.end for a, b in combinations(combo, 2)
+                    ):
+                        continue
+                    spent = [0, 0]
+                    for p in combo:
+                        spent[splits[p].start_year] += splits[p].first_cost
+                        spent[splits[p].end_year] += splits[p].second_cost
+                    if budget.opening_balances(spent) is not None:
+                        best = max(best, sum(p.total_days_off for p in combo))
+
+            schedule = _select_horizon_periods(periods, splits, 2, budget, 2)
+            assert sum(p.total_days_off for p in schedule) == best
+
+    def test_iter_horizon_plans_improves_to_final(self):
+        """Test that the greedy preview comes first and each year stays within budget."""
+        year = date.today().year + 1
+        horizon = Horizon.of_months(date(year, 7, 1), 18)
+        holidays = [date(year, 7, 4), date(year, 12, 25), date(year + 1, 1, 1)]
+        budget = HorizonBudget(10, 20, 25)
+
+        updates = list(iter_horizon_plans(horizon, holidays, set(), budget, max_vacations=4))
+
+        assert [update.final for update in updates] == [False, True]
+        preview, final = (update.result for update in updates)
+        days_off = [sum(p["total_days_off"] for p in r["schedule"]) for r in (preview, final)]
+        assert days_off[1] >= days_off[0]
+        assert len(final["schedule"]) <= 4
+        for entry in final["years"]:
+            assert entry["days_used"] <= entry["available_days"]
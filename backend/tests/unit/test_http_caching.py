@@ -0,0 +1,19 @@
+from app.utils.http_caching import etag_for, etag_matches
+
+
+class TestEtags:
+    def test_etag_follows_the_body(self):
+        """Test that equal bodies share an ETag and different ones don't."""
+        assert etag_for(b'{"a":1}') == etag_for(b'{"a":1}')
+        assert etag_for(b'{"a":1}') != etag_for(b'{"a":2}')
+        assert etag_for(b"").startswith('"') and etag_for(b"").endswith('"')
+
+    def test_if_none_match(self):
+        """Test that lists, weak validators and * match, and other ETags don't."""
+        etag = etag_for(b"body")
+
+        assert etag_matches(etag, etag)
+        assert etag_matches(f'"other", W/{etag}', etag)
+        assert etag_matches("*", etag)
+        assert not etag_matches('"other"', etag)
+        assert not etag_matches(None, etag)
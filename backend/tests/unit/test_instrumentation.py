@@ -0,0 +1,71 @@
+from datetime import date
+
+from app.services.instrumentation import (
+    DISABLED_STATS,
+    MetricsRegistry,
+    OptimizerStats,
+    server_timing,
+)
+from app.services.vacation_optimizer import best_plan
+
+
+class TestOptimizerStats:
+    def test_phases_and_counters(self):
+        """Test that phases accumulate time and counters add up."""
+        stats = OptimizerStats()
+
+        with stats.phase("scan"):
+            pass
+        with stats.phase("scan"):
+            pass
+        stats.add("candidates_generated", 5)
+        stats.add("candidates_generated")
+
+        snapshot = stats.as_dict()
+        assert snapshot["counters"] == {"candidates_generated": 6}
+        assert snapshot["phases"]["scan"] >= 0
+
+    def test_disabled_stats_record_nothing(self):
+        """Test that the disabled stand-in is a no-op."""
+        with DISABLED_STATS.phase("scan"):
+            DISABLED_STATS.add("candidates_generated", 5)
+
+        assert DISABLED_STATS.as_dict() is None
+
+    def test_optimizer_reports_phases(self):
+        """Test that the optimizer fills in its phases and counters when asked."""
+        year = date.today().year + 1
+
+        update = best_plan(year, [date(year, 7, 4)], set(), 10, max_vacations=2, collect_stats=True)
+
+        assert set(update.stats["phases"]) == {"calendar", "table", "scan", "greedy", "search"}
+        counters = update.stats["counters"]
+        assert counters["candidates_generated"] > 0
+        assert counters["combinations_evaluated"] > 0
+        assert best_plan(year, [date(year, 7, 4)], set(), 10).stats is None
+
+
+class TestMetricsRegistry:
+    def test_render_prometheus_text(self):
+        """Test the exposition format of counters and phase histograms."""
+        registry = MetricsRegistry(buckets=(0.01, 0.1))
+        registry.observe({"phases": {"scan": 0.05}, "counters": {"candidates_generated": 7}})
+        registry.observe({"phases": {"scan": 0.5}, "counters": {"candidates_generated": 3}})
+        registry.register_collector(
+            lambda: [("cache_entries", "gauge", "Entries.", [({"kind": "memory"}, 2)])]
+        )
+
+        lines = registry.render().splitlines()
+
+        assert "optimizer_runs_total 2" in lines
+        assert "optimizer_candidates_generated_total 10" in lines
+        assert 'optimizer_phase_seconds_bucket{phase="scan",le="0.01"} 0' in lines
+        assert 'optimizer_phase_seconds_bucket{phase="scan",le="0.1"} 1' in lines
+        assert 'optimizer_phase_seconds_bucket{phase="scan",le="+Inf"} 2' in lines
+        assert 'optimizer_phase_seconds_count{phase="scan"} 2' in lines
+        assert "# TYPE cache_entries gauge" in lines
+        assert 'cache_entries{kind="memory"} 2' in lines
+
+    def test_server_timing(self):
+        """Test the Server-Timing header format."""
+        assert server_timing({"db": 1.5, "scan": 0.25}) == "db;dur=1.500, scan;dur=0.250"
@@ -0,0 +1,30 @@
+import pytest
+
+from app.utils.intervals import IntervalSet
+
+
+class TestIntervalSet:
+    def test_overlaps(self):
+        """Test overlap checks against disjoint inclusive intervals."""
+        intervals = IntervalSet()
+        intervals.add(10, 14)
+        intervals.add(1, 3)
+        intervals.add(20, 20)
+
+        assert list(intervals) == [(1, 3), (10, 14), (20, 20)]
+        assert intervals.overlaps(3, 5)  # Touches the end of [1, 3]
+        assert intervals.overlaps(8, 10)  # Touches the start of [10, 14]
+        assert intervals.overlaps(0, 30)  # Contains everything
+        assert intervals.overlaps(12, 12)  # Inside [10, 14]
+        assert not intervals.overlaps(4, 9)
+        assert not intervals.overlaps(15, 19)
+        assert not intervals.overlaps(21, 25)
+
+    def test_add_rejects_overlap(self):
+        """Test that adding an overlapping interval raises."""
+        intervals = IntervalSet()
+        intervals.add(1, 5)
+
+        with pytest.raises(ValueError):
+            intervals.add(5, 7)
+        assert len(intervals) == 1
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from datetime import date
+
+import pytest
+
+from app.services.optimizer_executor import (
+    ExecutorSaturated,
+    InlineExecutor,
+    OptimizerTimeout,
+    ProcessExecutor,
+    create_executor,
+)
+from app.services.vacation_optimizer import plan_vacation
+
+
+async def _no_warm_calendars():
+    return []
+
+
+class TestCreateExecutor:
+    def test_inline_by_default(self, monkeypatch):
+        """Test that the optimizer runs inline unless process mode is configured."""
+        monkeypatch.delenv("OPTIMIZER_EXECUTOR", raising=False)
+
+        assert isinstance(create_executor(), InlineExecutor)
+
+    def test_process_settings(self, monkeypatch):
+        """Test that process mode reads its limits from the environment."""
+        monkeypatch.setenv("OPTIMIZER_EXECUTOR", "process")
+        monkeypatch.setenv("OPTIMIZER_WORKERS", "3")
+        monkeypatch.setenv("OPTIMIZER_TIMEOUT", "2.5")
+
+        executor = create_executor()
+
+        assert isinstance(executor, ProcessExecutor)
+        assert executor.workers == 3
+        assert executor.queue_depth == 12
+        assert executor.timeout == 2.5
+
+    def test_rejects_unknown_mode(self, monkeypatch):
+        """Test that a misspelled mode fails loudly."""
+        monkeypatch.setenv("OPTIMIZER_EXECUTOR", "threads")
+
+        with pytest.raises(RuntimeError):
+            create_executor()
+
+
+class TestProcessExecutor:
+    def test_runs_optimizer_in_worker(self):
+        """Test that a warm worker returns the same plan as the inline path."""
+        year = date.today().year + 1
+        holidays = (date(year, 7, 4), date(year, 12, 25))
+        args = (year, holidays, set(), 5, False, 2)
+
+        async def scenario():
+            async def warm_calendars():
+                return [(year, holidays)]
+
+            executor = ProcessExecutor(workers=1, queue_depth=1, timeout=30)
+            await executor.start(warm_calendars)
+            try:
+                return await executor.run(plan_vacation, *args), executor.stats()
+            finally:
+                executor.shutdown()
+
+        result, stats = asyncio.run(scenario())
+
+        assert result == plan_vacation(*args)
+        assert stats["completed"] == 1
+        assert stats["in_flight"] == 0
+
+    def test_rejects_when_saturated_and_times_out(self):
+        """Test the queue-depth limit and the per-job timeout."""
+
+        async def scenario():
+            executor = ProcessExecutor(workers=1, queue_depth=0, timeout=0.5)
+            await executor.start(_no_warm_calendars)
+            try:
+                slow = asyncio.ensure_future(executor.run(time.sleep, 2))
+                await asyncio.sleep(0.1)
+                with pytest.raises(ExecutorSaturated):
+                    await executor.run(time.sleep, 0)
+                with pytest.raises(OptimizerTimeout):
+                    await slow
+                return executor.stats()
+            finally:
+                executor.shutdown()
+
+        stats = asyncio.run(scenario())
+
+        assert stats["rejected"] == 1
+        assert stats["timed_out"] == 1
+
+    def test_reservations_count_against_the_queue(self):
+        """Test that reserved slots reject further work until released, once each."""
+        executor = ProcessExecutor(workers=1, queue_depth=0, timeout=1)
+
+        reservation = executor.reserve()
+        with pytest.raises(ExecutorSaturated):
+            executor.reserve()
+        reservation.release()
+        reservation.release()
+
+        assert executor.stats()["in_flight"] == 0
+        executor.reserve().release()
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["completed"] == 2
@@ -0,0 +1,80 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.services.password_hasher import HasherSaturated, PasswordHasher, create_password_hasher
+
+
+class TestCreatePasswordHasher:
+    def test_settings(self, monkeypatch):
+        """Test that the work factor and pool sizes come from the environment."""
+        monkeypatch.setenv("BCRYPT_ROUNDS", "5")
+        monkeypatch.setenv("PASSWORD_HASH_WORKERS", "3")
+        monkeypatch.delenv("PASSWORD_HASH_QUEUE_DEPTH", raising=False)
+
+        hasher = create_password_hasher()
+
+        assert (hasher.rounds, hasher.workers, hasher.queue_depth) == (5, 3, 24)
+
+    def test_rejects_too_few_rounds(self, monkeypatch):
+        """Test that a work factor bcrypt doesn't accept fails loudly."""
+        monkeypatch.setenv("BCRYPT_ROUNDS", "3")
+
+        with pytest.raises(RuntimeError):
+            create_password_hasher()
+
+
+class TestPasswordHasher:
+    def test_hash_and_verify(self):
+        """Test that a hash verifies its password only and needs no update."""
+        hasher = PasswordHasher(rounds=4, workers=1, queue_depth=1)
+
+        async def scenario():
+            password_hash = await hasher.hash("secret")
+            return (
+                password_hash,
+                await hasher.verify_and_update("secret", password_hash),
+                await hasher.verify_and_update("wrong", password_hash),
+            )
+
+        password_hash, right, wrong = asyncio.run(scenario())
+        hasher.shutdown()
+
+        assert password_hash.startswith("$2b$04$")
+        assert right == (True, None)
+        assert wrong == (False, None)
+        assert hasher.stats()["completed"] == 3
+
+    def test_rehash_when_work_factor_changes(self):
+        """Test that a hash made with another work factor comes back upgraded."""
+        old_hash = PasswordHasher(rounds=4, workers=1, queue_depth=0).context.hash("secret")
+        hasher = PasswordHasher(rounds=5, workers=1, queue_depth=0)
+
+        valid, new_hash = asyncio.run(hasher.verify_and_update("secret", old_hash))
+        hasher.shutdown()
+
+        assert valid
+        assert new_hash.startswith("$2b$05$")
+        assert hasher.context.verify("secret", new_hash)
+        assert hasher.stats()["rehashed"] == 1
+
+    def test_rejects_when_queue_is_full(self):
+        """Test that hashes beyond the workers and queue are turned away, not queued."""
+        hasher = PasswordHasher(rounds=4, workers=1, queue_depth=1)
+        release = threading.Event()
+        hasher.context = type("BlockingContext", (), {"hash": lambda self, p: release.wait()})()
+
+        async def scenario():
+            running = [asyncio.ensure_future(hasher.hash("secret")) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            with pytest.raises(HasherSaturated):
+                await hasher.hash("secret")
+            release.set()
+            await asyncio.gather(*running)
+
+        asyncio.run(scenario())
+        hasher.shutdown()
+
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["in_flight"] == 0
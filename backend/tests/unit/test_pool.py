@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from app.models.pool import InstrumentedQueuePool, pool_settings
+
+
+class TestPoolSettings:
+    def test_defaults(self, monkeypatch):
+        """Test the pool defaults when nothing is configured."""
+        for name in ("DB_POOL_SIZE", "DB_MAX_OVERFLOW", "DB_POOL_PRE_PING"):
+            monkeypatch.delenv(name, raising=False)
+
+        settings = pool_settings()
+
+        assert settings["pool_size"] == 5
+        assert settings["max_overflow"] == 10
+        assert settings["pool_pre_ping"] is True
+
+    def test_overrides(self, monkeypatch):
+        """Test that environment variables override the defaults."""
+        monkeypatch.setenv("DB_POOL_SIZE", "20")
+        monkeypatch.setenv("DB_POOL_PRE_PING", "false")
+
+        settings = pool_settings()
+
+        assert settings["pool_size"] == 20
+        assert settings["pool_pre_ping"] is False
+
+    @pytest.mark.parametrize(
+        "name,value",
+        [("DB_POOL_SIZE", "0"), ("DB_POOL_SIZE", "ten"), ("DB_POOL_PRE_PING", "maybe")],
+    )
+    def test_invalid_values_fail_fast(self, monkeypatch, name, value):
+        """Test that bad settings are rejected at startup."""
+        monkeypatch.setenv(name, value)
+
+        with pytest.raises(RuntimeError):
+            pool_settings()
+
+
+class TestInstrumentedQueuePool:
+    def test_checkout_stats(self):
+        """Test that checkouts and in-use connections are counted."""
+        engine = create_engine("sqlite://", poolclass=InstrumentedQueuePool, pool_size=2)
+
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            status = engine.pool.status_dict()
+            assert status["checked_out"] == 1
+        with engine.connect():
+            pass
+
+        status = engine.pool.status_dict()
+        assert status["checked_out"] == 0
+        assert status["checkouts"] == 2
+        assert status["wait_seconds_total"] >= status["wait_seconds_max"] >= 0
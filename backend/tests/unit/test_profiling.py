@@ -0,0 +1,118 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+
+import pytest
+
+from app.utils.profiling import ProfilingMiddleware, RequestProfiler, RouteProfile, StackSampler
+
+
+class TestRouteProfile:
+    def test_output_formats(self):
+        """Test the collapsed stack and speedscope renderings of aggregated samples."""
+        profile = RouteProfile()
+        profile.add(Counter({("main", "plan"): 3, ("main", "load"): 1}), 0.02)
+        profile.add(Counter({("main", "plan"): 1}), 0.04)
+
+        assert sorted(profile.collapsed().splitlines()) == ["main;load 1", "main;plan 4"]
+        speedscope = profile.speedscope("GET /api/suggestions", interval=0.005)
+        frames = [frame["name"] for frame in speedscope["shared"]["frames"]]
+        assert frames == ["main", "plan", "load"]
+        assert speedscope["profiles"][0]["samples"] == [[0, 1], [0, 2]]
+        assert speedscope["profiles"][0]["weights"] == [20.0, 5.0]
+        assert profile.requests == 2
+        assert profile.max_seconds == 0.04
+
+
+class TestStackSampler:
+    def test_samples_busy_threads(self):
+        """Test that a busy thread's stack is captured."""
+        sampler = StackSampler(interval=0.001)
+        sampler.start()
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        stacks = sampler.stop()
+
+        assert any("test_samples_busy_threads" in frame for stack in stacks for frame in stack)
+
+
+class TestRequestProfiler:
+    def test_header_and_sample_rate(self):
+        """Test that the debug header forces or suppresses profiling regardless of the rate."""
+        profiler = RequestProfiler("unused", sample_rate=0.0)
+        header = {"type": "http", "headers": [(b"x-profile", b"1")]}
+
+        assert profiler.wants(header)
+        assert not profiler.wants({"type": "http", "headers": []})
+        always = RequestProfiler("unused", sample_rate=1.0, rng=random.Random(0))
+        assert always.wants({"type": "http", "headers": []})
+        assert not always.wants({"type": "http", "headers": [(b"x-profile", b"0")]})
+
+    def test_from_env(self, monkeypatch):
+        """Test that profiling stays off unless enabled, and bad rates are rejected."""
+        monkeypatch.delenv("PROFILING", raising=False)
+        assert RequestProfiler.from_env() is None
+
+        monkeypatch.setenv("PROFILING", "true")
+        monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0.01")
+        assert RequestProfiler.from_env().sample_rate == 0.01
+
+        monkeypatch.setenv("PROFILE_SAMPLE_RATE", "2")
+        with pytest.raises(RuntimeError):
+            RequestProfiler.from_env()
+
+    def test_middleware_writes_per_route_profiles(self, tmp_path):
+        """Test that profiled requests are aggregated into one file per route."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        api = FastAPI()
+
+        @api.get("/items/{item_id}")
+        def read_item(item_id: int):
+            deadline = time.perf_counter() + 0.02
+            while time.perf_counter() < deadline:
+                pass
+            return {"id": item_id}
+
+        profiler = RequestProfiler(str(tmp_path), interval=0.001)
+        client = TestClient(ProfilingMiddleware(api, profiler))
+
+        client.get("/items/1", headers={"X-Profile": "1"})
+        client.get("/items/2", headers={"X-Profile": "1"})
+        client.get("/items/3")
+
+        index = json.loads((tmp_path / "index.json").read_text())
+        assert list(index) == ["GET /items/{item_id}"]
+        assert index["GET /items/{item_id}"]["requests"] == 2
+        collapsed = (tmp_path / index["GET /items/{item_id}"]["file"]).read_text()
+        assert "read_item" in collapsed
+
+    def test_middleware_finishes_off_the_event_loop(self, tmp_path):
+        """Test that stopping the sampler and writing files don't run on the event loop."""
+        from fastapi import FastAPI
+        from fastapi.testclient import TestClient
+
+        api = FastAPI()
+        threads = {}
+
+        @api.get("/")
+        async def root():
+            threads["loop"] = threading.get_ident()
+            return {}
+
+        profiler = RequestProfiler(str(tmp_path), interval=0.001)
+        finish = profiler.finish
+
+        def record_finish(*args):
+            threads["finish"] = threading.get_ident()
+            finish(*args)
+
+        profiler.finish = record_finish
+        TestClient(ProfilingMiddleware(api, profiler)).get("/", headers={"X-Profile": "1"})
+
+        assert threads["finish"] != threads["loop"]
+        assert (tmp_path / "index.json").exists()
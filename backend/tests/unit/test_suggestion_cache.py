@@ -0,0 +1,83 @@
+from app.services.suggestion_cache import MemoryBackend, SuggestionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoryBackend:
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        backend = MemoryBackend(maxsize=2, ttl=60)
+        backend.set("a", 1)
+        backend.set("b", 2)
+        assert backend.get("a") == 1  # "b" is now the oldest
+
+        backend.set("c", 3)
+
+        assert backend.get("b") is None
+        assert backend.get("a") == 1
+        assert backend.get("c") == 3
+
+    def test_ttl_expiry(self):
+        """Test that entries expire after the TTL."""
+        clock = FakeClock()
+        backend = MemoryBackend(maxsize=10, ttl=30, clock=clock)
+        backend.set("a", 1)
+
+        clock.now = 29
+        assert backend.get("a") == 1
+        clock.now = 30
+        assert backend.get("a") is None
+        assert len(backend) == 0
+
+
+class TestSuggestionCache:
+    def test_key_is_content_addressed(self):
+        """Test that equal inputs share a key regardless of argument order."""
+        cache = SuggestionCache()
+
+        key = cache.key(year=2025, available_days=10.0, blackout_dates=["2025-06-01"])
+
+        assert key == cache.key(blackout_dates=["2025-06-01"], available_days=10.0, year=2025)
+        assert key != cache.key(year=2025, available_days=9.0, blackout_dates=["2025-06-01"])
+
+    def test_hits_misses_and_invalidation(self):
+        """Test the counters and that invalidation changes keys and drops entries."""
+        cache = SuggestionCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"schedule": [], "warning": None}
+
+        key = cache.key(year=2025)
+        cache.get_or_compute(key, compute)
+        cache.get_or_compute(key, compute)
+
+        assert len(calls) == 1
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+        cache.invalidate()
+
+        assert cache.key(year=2025) != key
+        assert cache.stats()["size"] == 0
+
+    def test_invalidation_reaches_caches_sharing_the_backend(self):
+        """Test that invalidating through one process changes every process's keys."""
+        backend = MemoryBackend()
+        first, second = SuggestionCache(backend), SuggestionCache(backend)
+        key = second.key(year=2025)
+        assert first.key(year=2025) == key
+        second.set(key, {"schedule": [], "warning": None})
+
+        first.invalidate()
+
+        assert second.key(year=2025) != key
+        assert second.key(year=2025) == first.key(year=2025)
+        assert second.get(second.key(year=2025)) is None
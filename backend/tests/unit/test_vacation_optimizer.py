@@ -1,9 +1,23 @@
+import time
 from datetime import date, datetime, timedelta
+from itertools import combinations
 
 from app.models.holiday import Holiday
 from app.models.policy import Policy
 from app.models.time_budget import TimeBudget
-from app.services.vacation_optimizer import generate_period, optimize_vacation
+from app.services.calendar import scan_windows, year_calendar
+from app.services.instrumentation import OptimizerStats
+from app.services.vacation_optimizer import (
+    MAX_VACATIONS,
+    Period,
+    _select_periods,
+    _window_period,
+    candidate_table,
+    generate_period,
+    iter_plans,
+    optimize_vacation,
+    plan_vacation,
+)
 
 # pytest is used implicitly by the fixtures
 
@@ -30,14 +44,14 @@ class TestGeneratePeriod:
 
         assert len(periods) == 1
         period = periods[0]
-        assert period["start_date"] == start_date
-        assert period["end_date"] == end_date
-        assert period["days_used"] == 5  # 5 workdays
-        assert period["total_days_off"] == 5  # No weekends or holidays
-        assert period["workdays"] == 5
-        assert period["holidays"] == 0
-        assert period["weekends"] == 0
-        assert len(period["dates"]) == 5
+        assert period.start_date == start_date
+        assert period.end_date == end_date
+        assert period.days_used == 5  # 5 workdays
+        assert period.total_days_off == 5  # No weekends or holidays
+        assert period.workdays == 5
+        assert period.holidays == 0
+        assert period.weekends == 0
+        assert len(period.dates) == 5
 
     def test_generate_period_with_weekend(self):
         """Test period generation that includes a weekend."""
@@ -60,11 +74,11 @@ class TestGeneratePeriod:
 
         assert len(periods) == 1
         period = periods[0]
-        assert period["days_used"] == 2  # Friday and Monday
-        assert period["total_days_off"] == 4  # 2 workdays + 2 weekend days
-        assert period["workdays"] == 2
-        assert period["holidays"] == 0
-        assert period["weekends"] == 2
+        assert period.days_used == 2  # Friday and Monday
+        assert period.total_days_off == 4  # 2 workdays + 2 weekend days
+        assert period.workdays == 2
+        assert period.holidays == 0
+        assert period.weekends == 2
 
     def test_generate_period_with_holiday(self):
         """Test period generation that includes a holiday."""
@@ -87,11 +101,11 @@ class TestGeneratePeriod:
 
         assert len(periods) == 1
         period = periods[0]
-        assert period["days_used"] == 2  # Thursday and Friday
-        assert period["total_days_off"] == 3  # 2 workdays + 1 holiday
-        assert period["workdays"] == 2
-        assert period["holidays"] == 1
-        assert period["weekends"] == 0
+        assert period.days_used == 2  # Thursday and Friday
+        assert period.total_days_off == 3  # 2 workdays + 1 holiday
+        assert period.workdays == 2
+        assert period.holidays == 1
+        assert period.weekends == 0
 
     def test_generate_period_with_blackout_date(self):
         """Test period generation with a blackout date."""
@@ -114,8 +128,8 @@ class TestGeneratePeriod:
 
         assert len(periods) == 1
         period = periods[0]
-        assert period["days_used"] == 4  # 4 workdays (excluding Wednesday)
-        assert period["total_days_off"] == 4
+        assert period.days_used == 4  # 4 workdays (excluding Wednesday)
+        assert period.total_days_off == 4
 
     def test_generate_period_no_single_days(self):
         """Test period generation with no_single_days constraint."""
@@ -156,7 +170,7 @@ class TestGeneratePeriod:
 
         # Should return a period
         assert len(periods) == 1
-        assert periods[0]["days_used"] == 2
+        assert periods[0].days_used == 2
 
     def test_generate_period_too_many_days(self):
         """Test period generation when more workdays than available days."""
@@ -181,6 +195,25 @@ class TestGeneratePeriod:
         assert len(periods) == 0
 
 
+class TestPeriod:
+    def test_period_to_dict(self):
+        """Test that a period formats into a schedule entry on demand."""
+        period = Period(date(2025, 7, 3).toordinal(), date(2025, 7, 6).toordinal(), 1, 2, 1)
+
+        assert period.dates == [date(2025, 7, d) for d in range(3, 7)]
+        assert period.to_dict() == {
+            "start": "2025-07-03",
+            "end": "2025-07-06",
+            "days_used": 1,
+            "total_days_off": 4,
+            "efficiency": 4.0,
+            "breakdown": {"workdays": 1, "weekends": 2, "holidays": 1},
+            "explanation": (
+                "Take 1 days off to get 4 days away (includes 2 weekend days and 1 holidays)"
+            ),
+        }
+
+
 # Mock classes for testing optimize_vacation
 class MockDB:
     def __init__(self, policy, time_budget, holidays):
@@ -335,3 +368,190 @@ class TestOptimizeVacation:
             while current <= end:
                 assert current not in blackout_dates
                 current += timedelta(days=1)
+
+    def test_optimize_vacation_max_vacations_many_holidays(self):
+        """Test that max_vacations stays fast and exact on a full holiday calendar."""
+        user_id = 1
+        year = date.today().year + 1
+
+        policy = Policy(id=1, user_id=user_id, max_days=30, blackout_dates=[])
+
+        time_budget = TimeBudget(id=1, user_id=user_id, accrued_days=15, used_days=0)
+
+        holiday_days = [(1, 1), (1, 20), (2, 17), (5, 26), (6, 19), (7, 4)]
+        holiday_days += [(9, 1), (10, 13), (11, 11), (11, 27), (12, 25)]
+        holidays = [
+            Holiday(id=i, date=date(year, m, d), name=f"Holiday {i}", year=year)
+            for i, (m, d) in enumerate(holiday_days, start=1)
+        ]
+
+        db = MockDB(policy, time_budget, holidays)
+
+        started = time.perf_counter()
+        result = optimize_vacation(user_id, year, db, max_vacations=4)
+        elapsed = time.perf_counter() - started
+
+        # The old exhaustive search could take minutes here
+        assert elapsed < 1.0
+        assert 0 < len(result["schedule"]) <= 4
+        assert sum(period["days_used"] for period in result["schedule"]) == 15
+
+
+class TestCandidateTable:
+    def test_select_matches_a_scan_of_the_users_calendar(self):
+        """Test that filtering the shared table finds the periods a full scan would."""
+        year = date.today().year + 1
+        holidays = [date(year, 7, 3), date(year, 12, 25), date(year, 12, 26)]
+        # A blacked-out weekend stops the week and weekend before it from growing
+        saturday = date(year, 6, 1) + timedelta(days=(5 - date(year, 6, 1).weekday()) % 7)
+        blackout_cases = [set(), {saturday, saturday + timedelta(days=1), date(year, 12, 24)}]
+        table = candidate_table(year, holidays)
+
+        for blackouts in blackout_cases:
+            calendar = year_calendar(year, holidays, blackouts)
+            for budget, no_single_days in ((3, False), (10.5, True)):
+                for earliest in (date(year, 1, 1), date(year, 6, 15)):
+                    windows = scan_windows(
+                        calendar, earliest, date(year, 12, 31), budget, no_single_days
+                    )
+                    expected = [
+                        _window_period(windows, row, calendar) for row in windows.by_efficiency()
+                    ]
+
+                    assert table.select(calendar, earliest, budget, no_single_days) == expected
+
+        week_before = (saturday - timedelta(days=7)).toordinal(), saturday.toordinal() - 1
+        calendar = year_calendar(year, holidays, blackout_cases[1])
+        selected = table.select(calendar, date(year, 1, 1), 5)
+        assert week_before in {(p.start, p.end) for p in selected}
+
+    def test_table_is_shared_per_holiday_set(self):
+        """Test that one table serves every request with the same year and holidays."""
+        year = date.today().year + 1
+
+        table = candidate_table(year, [date(year, 7, 3)])
+
+        assert candidate_table(year, (date(year, 7, 3),)) is table
+        assert candidate_table(year, []) is not table
+
+
+def make_period(start, end, days_used, total_days_off):
+    return Period(start.toordinal(), end.toordinal(), days_used, total_days_off - days_used, 0)
+
+
+class TestSelectPeriods:
+    def test_select_periods_matches_exhaustive_search(self):
+        """Test that the DP solver finds the same optimum as trying every combination."""
+        base = date(2025, 3, 3)
+        periods = []
+        for start in range(0, 30, 3):
+            for length in (1, 2, 4, 6):
+                days_used = max(1, length - (start % 4))
+                periods.append(
+                    make_period(
+                        base + timedelta(days=start),
+                        base + timedelta(days=start + length - 1),
+                        days_used,
+                        length + (start % 5),
+                    )
+                )
+
+        def overlaps(a, b):
+            return a.start <= b.end and b.start <= a.end
+
+        for max_vacations in (1, 2, 3):
+            for budget in (3, 5, 8):
+                best = None
+                for r in range(1, max_vacations + 1):
+                    for combo in combinations(periods, r):
+                        if sum(p.days_used for p in combo) != budget:
+                            continue
+                        if any(overlaps(a, b) for a, b in combinations(combo, 2)):
+                            continue
+                        total = sum(p.total_days_off for p in combo)
+                        best = total if best is None else max(best, total)
+
+                schedule = _select_periods(periods, max_vacations, budget)
+                if best is None:
+                    assert schedule == []
+                    continue
+                assert len(schedule) <= max_vacations
+                assert sum(p.days_used for p in schedule) == budget
+                assert sum(p.total_days_off for p in schedule) == best
+                for a, b in combinations(schedule, 2):
+                    assert not overlaps(a, b)
+
+    def test_select_periods_fractional_budget(self):
+        """Test that a fractional budget spends its whole days instead of yielding nothing."""
+        two_days = make_period(date(2025, 3, 3), date(2025, 3, 4), 2, 2)
+        three_days = make_period(date(2025, 3, 10), date(2025, 3, 12), 3, 3)
+
+        assert _select_periods([two_days, three_days], 2, 2.5) == [two_days]
+        assert _select_periods([two_days, three_days], 2, 5.5) == [two_days, three_days]
+        assert _select_periods([two_days], 2, 1.5) == []
+
+    def test_select_periods_searches_no_more_vacations_than_fit(self):
+        """Test that the search is sized by the vacations that fit, not the one asked for."""
+        overlapping = [
+            make_period(date(2025, 3, 3), date(2025, 3, 3 + length), length + 1, length + 1)
+            for length in range(4)
+        ]
+        later = make_period(date(2025, 4, 7), date(2025, 4, 8), 2, 2)
+        stats = OptimizerStats()
+
+        schedule = _select_periods(overlapping + [later], MAX_VACATIONS, 5, stats=stats)
+
+        assert schedule == [overlapping[2], later]
+        # Two vacations fit, so only two levels of the table are filled in
+        width = 5 + 1
+        cells = 2 * sum(width - p.days_used for p in overlapping + [later])
+        assert stats.as_dict()["counters"]["combinations_evaluated"] == cells
+        # No two candidates can spend more than 4 + 2 days
+        assert _select_periods(overlapping + [later], MAX_VACATIONS, 7) == []
+
+
+class TestIterPlans:
+    def test_iter_plans_improves_to_final(self):
+        """Test that the greedy preview comes first and the final plan is the best."""
+        year = date.today().year + 1
+        holidays = [date(year, 5, 26), date(year, 7, 4), date(year, 11, 26)]
+
+        updates = list(iter_plans(year, holidays, set(), 10, max_vacations=2))
+
+        assert [update.final for update in updates] == [False, True]
+        preview, final = (update.result for update in updates)
+        assert len(preview["schedule"]) <= 2
+        days_off = [sum(p["total_days_off"] for p in r["schedule"]) for r in (preview, final)]
+        assert days_off[1] >= days_off[0]
+        assert final == plan_vacation(year, holidays, set(), 10, max_vacations=2)
+
+    def test_iter_plans_stops_at_deadline(self):
+        """Test that an expired deadline leaves the preview as the best plan found."""
+        year = date.today().year + 1
+
+        updates = list(iter_plans(year, [], set(), 30, max_vacations=10, time_limit=0))
+
+        assert len(updates) == 1
+        assert not updates[0].final
+        assert updates[0].result["schedule"]
+
+    def test_no_vacations_allowed(self):
+        """Test that a max_vacations below one plans nothing rather than without a limit."""
+        year = date.today().year + 1
+        holidays = [date(year, 5, 26), date(year, 7, 4)]
+
+        for max_vacations in (0, -1):
+            result = plan_vacation(year, holidays, set(), 10, max_vacations=max_vacations)
+
+            assert result["schedule"] == []
+            assert result["warning"]
+
+    def test_fractional_budget_plans_like_its_whole_days(self):
+        """Test that a fractional balance plans exactly like its whole days."""
+        year = date.today().year + 1
+        holidays = [date(year, 5, 26), date(year, 7, 4), date(year, 11, 26)]
+
+        fractional = plan_vacation(year, holidays, set(), 10.5, max_vacations=2)
+
+        assert fractional["schedule"]
+        assert fractional == plan_vacation(year, holidays, set(), 10, max_vacations=2)
@@ -55,23 +55,35 @@ export async function addHoliday(holiday) {
 
 // Saved Plans API Functions
 
-// Get user's saved plans (requires authentication)
+// Get user's saved plans without their schedules (requires authentication)
 export async function getSavedPlans() {
   const headers = {
     ...getAuthHeader(),
     'Content-Type': 'application/json',
   };
 
-  const response = await fetch(`${API_BASE_URL}/saved-plans`, {
-    headers,
-  });
-
-  if (!response.ok) {
-    if (response.status === 401) throw new Error('Authentication required');
-    throw new Error('Failed to fetch saved plans');
+  // The API returns a page at a time, with the next page's URL in the Link header
+  const plans = [];
+  const seen = new Set();
+  let url = `${API_BASE_URL}/saved-plans?view=summary`;
+  // Stop rather than loop should the server ever link back to a page already fetched
+  while (url && !seen.has(url)) {
+    seen.add(url);
+    const response = await fetch(url, {
+      headers,
+    });
+
+    if (!response.ok) {
+      if (response.status === 401) throw new Error('Authentication required');
+      throw new Error('Failed to fetch saved plans');
+    }
+
+    plans.push(...(await response.json()));
+    const next = /<([^>]+)>;\s*rel="next"/.exec(response.headers.get('Link') || '');
+    url = next ? next[1] : null;
   }
 
-  return response.json();
+  return plans;
 }
 
 // Get a specific saved plan (may be public or private)